@@ -0,0 +1,137 @@
+"""Amortização de dívidas (Price e SAC) e simulação de estratégias de quitação.
+
+Os cronogramas são calculados em forma fechada com NumPy: o saldo depois de
+k pagamentos é uma soma acumulada de pagamentos descontados, então um
+cronograma inteiro (com amortizações extras) sai sem laço em Python.
+
+A simulação de quitação (bola de neve x avalanche) anda mês a mês, mas cada
+passo é uma operação sobre a matriz cenários x dívidas: centenas de valores
+de pagamento extra são simulados de uma vez.
+"""
+import numpy as np
+import pandas as pd
+
+SISTEMAS = ["Price", "SAC"]
+ESTRATEGIAS = {"Bola de neve": "menor saldo primeiro", "Avalanche": "maior juro primeiro"}
+TOLERANCIA = 0.005  # meio centavo: saldo considerado quitado
+
+
+def parcela_price(saldo, taxa_mensal, parcelas):
+    """Parcela constante da Tabela Price (taxa em fração ao mês: 0.02 = 2% a.m.)."""
+    if taxa_mensal == 0:
+        return saldo / parcelas
+    return saldo * taxa_mensal / (1 - (1 + taxa_mensal) ** -parcelas)
+
+
+def cronograma(saldo, taxa_mensal, parcelas, sistema="Price", entrada=0.0, extras=None):
+    """Cronograma mês a mês de um financiamento.
+
+    `extras` são amortizações extraordinárias por mês (sequência ou dict
+    {mês: valor}, com mês começando em 1); elas reduzem o prazo, mantendo a
+    parcela (Price) ou a amortização (SAC). A `entrada` é abatida antes da
+    primeira parcela. Retorna um DataFrame com uma linha por mês até a quitação.
+    """
+    principal = max(float(saldo) - float(entrada), 0.0)
+    n = int(parcelas)
+    meses = np.arange(1, n + 1)
+    extra = np.zeros(n)
+    if isinstance(extras, dict):
+        for mes, valor in extras.items():
+            if 1 <= int(mes) <= n:
+                extra[int(mes) - 1] += float(valor)
+    elif extras is not None:
+        valores = np.asarray(extras, dtype=float)[:n]
+        extra[:len(valores)] = valores
+
+    if sistema == "SAC":
+        # Amortização constante: saldo_k = P - k * A - extras acumulados
+        amortizacao_fixa = principal / n
+        saldo_final = principal - meses * amortizacao_fixa - np.cumsum(extra)
+    else:
+        # Price: saldo_k = (1 + i)^k * (P - soma_{j<=k} pagamento_j / (1 + i)^j)
+        pmt = parcela_price(principal, taxa_mensal, n)
+        fator = (1 + taxa_mensal) ** meses
+        saldo_final = fator * (principal - np.cumsum((pmt + extra) / fator))
+
+    # Mês da quitação: o último pagamento é só o que restava
+    quitados = np.flatnonzero(saldo_final <= TOLERANCIA)
+    fim = quitados[0] + 1 if len(quitados) else n
+    saldo_final = np.clip(saldo_final[:fim], 0, None)
+    saldo_inicial = np.concatenate([[principal], saldo_final[:-1]])
+    juros = saldo_inicial * taxa_mensal
+    pagamento = saldo_inicial + juros - saldo_final
+    extra = np.minimum(extra[:fim], pagamento)
+    return pd.DataFrame({
+        "mes": meses[:fim],
+        "saldo_inicial": saldo_inicial,
+        "juros": juros,
+        "amortizacao": pagamento - juros,
+        "parcela": pagamento - extra,
+        "extra": extra,
+        "pagamento": pagamento,
+        "saldo": saldo_final,
+    })
+
+
+# --- ESTRATÉGIAS DE QUITAÇÃO ---
+
+def _ordem(saldos, taxas, estrategia):
+    """Prioridade das dívidas para o dinheiro que sobra dos mínimos."""
+    if estrategia == "Avalanche":
+        return np.lexsort((saldos, -taxas))
+    return np.lexsort((-taxas, saldos))
+
+
+def simular_quitacao(saldos, taxas, minimos, extras, estrategia="Avalanche", meses_max=600):
+    """Simula a quitação de todas as dívidas para cada valor de pagamento extra.
+
+    O orçamento mensal de cada cenário é a soma dos mínimos mais o extra; o que
+    sobra após os mínimos vai para as dívidas na ordem da estratégia, e o
+    mínimo de uma dívida quitada passa para a próxima. Retorna um dict com,
+    por cenário: meses até zerar tudo (NaN se não zera em `meses_max`),
+    juros e total pagos, e o mês de quitação de cada dívida.
+    """
+    ordem = _ordem(np.asarray(saldos, float), np.asarray(taxas, float), estrategia)
+    # Colunas já na ordem de prioridade: a alocação vira uma soma acumulada
+    taxas = np.asarray(taxas, float)[ordem]
+    minimos = np.asarray(minimos, float)[ordem]
+    extras = np.asarray(extras, float)
+    saldo = np.tile(np.asarray(saldos, float)[ordem], (len(extras), 1))
+    orcamento = minimos.sum() + extras
+
+    juros_total = np.zeros(len(extras))
+    pago_total = np.zeros(len(extras))
+    quitacao = np.full(saldo.shape, np.nan)
+    quitacao[saldo <= TOLERANCIA] = 0
+    for mes in range(1, meses_max + 1):
+        ativos = saldo > TOLERANCIA
+        if not ativos.any():
+            break
+        juros = saldo * taxas
+        saldo = saldo + juros
+        pagamento_minimo = np.minimum(minimos, saldo) * ativos
+        restante = saldo - pagamento_minimo
+        sobra = np.maximum(orcamento - pagamento_minimo.sum(axis=1), 0)[:, None]
+        # Preenche as dívidas em ordem: cada uma recebe o que sobrou depois das anteriores
+        antes = np.cumsum(restante, axis=1) - restante
+        adicional = np.clip(sobra - antes, 0, restante)
+        pago = pagamento_minimo + adicional
+        saldo = restante - adicional
+        juros_total += juros.sum(axis=1)
+        pago_total += pago.sum(axis=1)
+        quitacao[np.isnan(quitacao) & (saldo <= TOLERANCIA)] = mes
+
+    meses = np.where(np.isnan(quitacao).any(axis=1), np.nan, np.nanmax(np.nan_to_num(quitacao, nan=0), axis=1))
+    desfazer = np.argsort(ordem)
+    return {"meses": meses, "juros": juros_total, "pago": pago_total, "quitacao": quitacao[:, desfazer]}
+
+
+def comparar_estrategias(dividas, extras, meses_max=600):
+    """Meses e juros até quitar as `dividas` (colunas saldo, taxa, minimo) para cada extra e estratégia."""
+    resultados = []
+    for estrategia in ESTRATEGIAS:
+        r = simular_quitacao(dividas["saldo"].to_numpy(), dividas["taxa"].to_numpy(), dividas["minimo"].to_numpy(),
+                             extras, estrategia, meses_max)
+        resultados.append(pd.DataFrame({"extra": extras, "estrategia": estrategia,
+                                        "meses": r["meses"], "juros": r["juros"], "pago": r["pago"]}))
+    return pd.concat(resultados, ignore_index=True)
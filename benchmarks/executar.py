@@ -0,0 +1,178 @@
+"""Benchmark das páginas em várias escalas de dados.
+
+Uso:
+    python -m benchmarks.executar --linhas 10000 100000 1000000
+    python -m benchmarks.executar --comparar benchmarks/resultados/anterior.json
+
+Para cada escala, um banco sintético (benchmarks.gerar_dados) é criado uma
+vez numa pasta de rascunho e reaproveitado nas execuções seguintes. Cada
+página exibir_* é renderizada sem navegador pelo AppTest do Streamlit e
+medida em três situações:
+
+- tempo_frio_s: primeira renderização, com st.cache_data vazio (mediana);
+- tempo_quente_s: rerun logo em seguida, servido pelo cache (mediana);
+- sql_s e memoria_pico_mb: uma renderização a frio extra com a
+  instrumentação ligada e tracemalloc (o tempo dessa rodada não entra nas
+  medianas).
+
+O resultado vai para um JSON em benchmarks/resultados/, nomeado pelo commit,
+para comparar versões com --comparar.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import streamlit as st
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+
+import database
+from benchmarks import medicao
+from benchmarks.gerar_dados import gerar
+
+PAGINAS = {
+    "dashboard": ("modules.dashboard", "exibir_dashboard"),
+    "lancamentos": ("modules.lancamentos", "exibir_lancamentos"),
+    "metas": ("modules.metas", "exibir_metas"),
+    "investimentos": ("modules.investimentos", "exibir_investimentos"),
+    "dividas": ("modules.dividas", "exibir_dividas"),
+    "cartoes": ("modules.cartoes", "exibir_cartoes"),
+    "cadastros": ("modules.cadastros", "exibir_cadastros"),
+}
+
+SCRIPT = """
+import sys
+sys.path.insert(0, {raiz!r})
+from benchmarks.medicao import medir_pagina
+medir_pagina({modulo!r}, {funcao!r}, detalhado={detalhado})
+"""
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def _renderizar(modulo, funcao, detalhado=False, app=None):
+    """Roda a página no AppTest; devolve (app, segundos de parede)."""
+    if app is None:
+        app = AppTest.from_string(SCRIPT.format(raiz=RAIZ, modulo=modulo, funcao=funcao, detalhado=detalhado),
+                                  default_timeout=600)
+    inicio = time.perf_counter()
+    app.run()
+    decorrido = time.perf_counter() - inicio
+    if app.exception:
+        raise RuntimeError(f"{modulo}.{funcao} falhou: {app.exception[0].value}")
+    return app, decorrido
+
+
+def _limpar_cache():
+    # O AppTest restaura o nível de log a cada execução; fora de um script o
+    # clear() avisaria "missing ScriptRunContext"
+    set_log_level("error")
+    st.cache_data.clear()
+
+
+def medir(nome, repeticoes=3):
+    modulo, funcao = PAGINAS[nome]
+    frio, quente = [], []
+    for _ in range(repeticoes):
+        _limpar_cache()
+        app, tempo = _renderizar(modulo, funcao)
+        frio.append(tempo)
+        quente.append(_renderizar(modulo, funcao, app=app)[1])
+
+    _limpar_cache()
+    _renderizar(modulo, funcao, detalhado=True)
+    # Com o cache vazio toda página consulta o banco: sql_s zerado é medição quebrada
+    if medicao.ULTIMA_MEDICAO["sql_s"] <= 0:
+        raise RuntimeError(f"{nome}: nenhum tempo de SQL medido na renderização a frio")
+    return {
+        "pagina": nome,
+        "tempo_frio_s": statistics.median(frio),
+        "tempo_quente_s": statistics.median(quente),
+        **medicao.ULTIMA_MEDICAO,
+    }
+
+
+def banco_de_teste(pasta, linhas, semente):
+    caminho = os.path.join(pasta, f"bench_{linhas}_{semente}.db")
+    if not os.path.exists(caminho):
+        os.makedirs(pasta, exist_ok=True)
+        inicio = time.perf_counter()
+        gerar(caminho, linhas, semente=semente)
+        print(f"  banco com {linhas} linhas gerado em {time.perf_counter() - inicio:.1f}s")
+    else:
+        # Banco gerado por uma versão anterior: recebe as migrações criadas desde então
+        database.create_tables(caminho)
+    return caminho
+
+
+def comparar(anterior, atual):
+    def indexar(dados):
+        return {(r["linhas"], r["pagina"]): r for r in dados["resultados"]}
+
+    antes, depois = indexar(anterior), indexar(atual)
+    print(f"\n{'linhas':>9} {'página':<14} {'frio antes':>11} {'frio agora':>11} {'variação':>9}")
+    for chave in sorted(set(antes) & set(depois)):
+        a, d = antes[chave]["tempo_frio_s"], depois[chave]["tempo_frio_s"]
+        print(f"{chave[0]:>9} {chave[1]:<14} {a:>10.3f}s {d:>10.3f}s {(d / a - 1) * 100:>8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das páginas do Controle Financeiro")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--paginas", nargs="+", choices=list(PAGINAS), default=list(PAGINAS))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--pasta", default=os.path.join(tempfile.gettempdir(), "financeiro_bench"),
+                        help="Onde ficam os bancos sintéticos")
+    parser.add_argument("--saida", help="Arquivo JSON (padrão: benchmarks/resultados/<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argv)
+
+    commit = _commit()
+    resultado = {
+        "commit": commit,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "streamlit": st.__version__,
+        "sqlite": database.sqlite3.sqlite_version,
+        "resultados": [],
+    }
+    for linhas in args.linhas:
+        print(f"{linhas} lançamentos")
+        database.DB_PATH = banco_de_teste(args.pasta, linhas, args.semente)
+        for pagina in args.paginas:
+            medida = {"linhas": linhas, **medir(pagina, args.repeticoes)}
+            resultado["resultados"].append(medida)
+            print(f"  {pagina:<14} frio {medida['tempo_frio_s']:.3f}s  quente {medida['tempo_quente_s']:.3f}s  "
+                  f"sql {medida['sql_s']:.3f}s  memória {medida['memoria_pico_mb']:.1f} MB")
+        database.fechar_conexoes()
+
+    saida = args.saida or os.path.join(RAIZ, "benchmarks", "resultados", f"{commit}.json")
+    os.makedirs(os.path.dirname(saida), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(json.load(arquivo), resultado)
+
+
+if __name__ == "__main__":
+    main()
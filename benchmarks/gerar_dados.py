@@ -0,0 +1,215 @@
+"""Gera um banco de rascunho com lançamentos sintéticos em qualquer escala.
+
+Uso:
+    python -m benchmarks.gerar_dados /tmp/bench.db --linhas 100000
+
+As linhas imitam o que as telas gravam: receitas mensais, despesas à vista
+com conta e forma de pagamento, compras parceladas no cartão (datadas pelo
+vencimento da fatura), aportes em metas e investimentos e parcelas de
+dívidas, espalhadas pelos últimos `anos` anos até o ano seguinte. As
+parcelas são todas gravadas e vinculadas a planos_parcelamento já completos.
+"""
+import argparse
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import database
+from migrations import registrar_posicoes_dos_aportes, vincular_aportes_a_metas, vincular_parcelas_a_planos
+from parcelas import gravar_lancamentos, vencimentos_fatura
+
+RESPONSAVEIS = ["Ana", "Bruno"]
+CONTAS = ["Itaú", "Nubank Conta", "Caixa"]
+CARTOES = [("Nubank", 8000, 3, 10), ("Inter", 5000, 25, 5)]
+CATEGORIAS_DESPESAS = {"Mercado": "Variável", "Restaurante": "Variável", "Transporte": "Variável",
+                       "Lazer": "Variável", "Saúde": "Variável", "Aluguel": "Fixo", "Energia": "Fixo",
+                       "Internet": "Fixo"}
+CATEGORIAS_RECEITAS = ["Salário", "Freelance"]
+METAS = [("Viagem", 15000, "✈️"), ("Reserva", 30000, "🛟"), ("Carro novo", 60000, "🚗")]
+INVESTIMENTOS = [("CDB", "#58a6ff"), ("Tesouro IPCA", "#3fb950"), ("Ações", "#d29922")]
+DIVIDAS = [("Financiamento Carro", 48000, 48), ("Empréstimo", 12000, 24), ("Reforma", 20000, 36)]
+LOJAS = ["Mercado Extra", "Padaria", "iFood", "Uber", "Farmácia", "Posto", "Amazon", "Magalu", "Cinema"]
+
+# Fração das linhas de cada tipo
+PROPORCOES = {"receita": 0.08, "avulsa": 0.55, "cartao": 0.28, "meta": 0.03, "investimento": 0.03, "divida": 0.03}
+LOTE = 50_000
+
+
+def _somar_meses(datas, meses):
+    """datas + n meses (n por linha), limitando ao último dia do mês."""
+    datas = pd.DatetimeIndex(datas)
+    base = datas.values.astype("datetime64[M]") + np.asarray(meses)
+    dias_no_mes = ((base + 1).astype("datetime64[D]") - base.astype("datetime64[D]")).astype(int)
+    dias = np.minimum(datas.day.values, dias_no_mes) - 1
+    return pd.DatetimeIndex(base.astype("datetime64[D]") + dias.astype("timedelta64[D]"))
+
+
+def _status(datas, hoje):
+    return np.where(datas > pd.Timestamp(hoje), "Pendente", "Paga")
+
+
+def _descricao(texto, responsavel, meio, status):
+    """Mesmo formato de popup_novo_lancamento: "texto | 👤 resp | 💳 ... | status"."""
+    return (pd.Series(texto, dtype=object) + " | 👤 " + np.asarray(responsavel, dtype=object) + meio + " | "
+            + np.asarray(status, dtype=object))
+
+
+def _cadastros(conn):
+    with conn:
+        conn.executemany("INSERT INTO responsaveis (nome) VALUES (?)", [(r,) for r in RESPONSAVEIS])
+        conn.executemany("INSERT INTO contas_bancarias (nome) VALUES (?)", [(c,) for c in CONTAS])
+        conn.executemany("INSERT INTO cartoes_credito (nome, limite, fechamento, vencimento) VALUES (?, ?, ?, ?)", CARTOES)
+        conn.executemany("INSERT INTO categorias_despesas (nome, tipo) VALUES (?, ?)", CATEGORIAS_DESPESAS.items())
+        conn.executemany("INSERT INTO categorias_receitas (nome) VALUES (?)", [(c,) for c in CATEGORIAS_RECEITAS])
+        conn.executemany("INSERT INTO metas (nome, valor_objetivo, valor_atual, icone) VALUES (?, ?, 0, ?)", METAS)
+        conn.executemany("INSERT INTO tipos_investimentos (nome, cor) VALUES (?, ?)", INVESTIMENTOS)
+        conn.execute("INSERT INTO carteira_investimentos (tipo_id, valor_acumulado) SELECT id, 0 FROM tipos_investimentos")
+        conn.executemany("INSERT INTO dividas (nome, valor_total, valor_pago, responsavel, total_parcelas, status) "
+                         "VALUES (?, ?, 0, 'Ana', ?, 'Ativa')", DIVIDAS)
+
+
+def _gerar_lancamentos(rng, quantidades, inicio, dias, hoje):
+    """Um DataFrame por tipo de lançamento, com as colunas de lancamentos."""
+    def datas_aleatorias(n):
+        return inicio + pd.to_timedelta(rng.integers(0, dias, n), unit="D")
+
+    def responsaveis(n):
+        return rng.choice(RESPONSAVEIS, n)
+
+    n = quantidades["receita"]
+    datas, resp = datas_aleatorias(n), responsaveis(n)
+    categoria = rng.choice(CATEGORIAS_RECEITAS, n, p=[0.8, 0.2])
+    status = _status(datas, hoje)
+    yield pd.DataFrame({
+        "data": datas.strftime("%Y-%m-%d"), "descricao": _descricao(categoria, resp, "", status),
+        "categoria": categoria, "valor": rng.normal(6000, 1500, n).clip(500).round(2),
+        "tipo_mov": "Receita", "tipo_custo": "Receita", "responsavel": resp, "status": status,
+    })
+
+    n = quantidades["avulsa"]
+    datas, resp = datas_aleatorias(n), responsaveis(n)
+    categoria = rng.choice(list(CATEGORIAS_DESPESAS), n)
+    forma, conta = rng.choice(["Pix", "Débito", "Boleto", "Dinheiro"], n), rng.choice(CONTAS, n)
+    status = _status(datas, hoje)
+    yield pd.DataFrame({
+        "data": datas.strftime("%Y-%m-%d"),
+        "descricao": _descricao(rng.choice(LOJAS, n), resp, " | 💰 " + pd.Series(forma) + " (" + pd.Series(conta) + ")", status),
+        "categoria": categoria, "valor": rng.lognormal(4, 1, n).round(2),
+        "tipo_mov": "Despesa", "tipo_custo": pd.Series(categoria).map(CATEGORIAS_DESPESAS),
+        "responsavel": resp, "forma_pagto": forma, "conta": conta, "status": status,
+    })
+
+    # Compras no cartão: cada compra vira de 1 a 12 parcelas mensais a partir do vencimento da fatura
+    alvo = quantidades["cartao"]
+    total_parcelas = rng.choice([1, 1, 1, 2, 3, 4, 6, 10, 12], alvo)
+    total_parcelas = total_parcelas[:np.searchsorted(np.cumsum(total_parcelas), alvo) + 1]
+    compras = len(total_parcelas)
+    cartao = rng.integers(0, len(CARTOES), compras)
+    datas_compra = datas_aleatorias(compras)
+    vencimentos = pd.Series(pd.NaT, index=range(compras), dtype="datetime64[ns]")
+    for i, (nome, _, fechamento, vencimento) in enumerate(CARTOES):
+        deste = cartao == i
+        vencimentos[deste] = vencimentos_fatura(datas_compra[deste], fechamento, vencimento)
+    compra = np.repeat(np.arange(compras), total_parcelas)
+    numero = np.arange(len(compra)) - np.repeat(np.cumsum(total_parcelas) - total_parcelas, total_parcelas) + 1
+    datas = _somar_meses(vencimentos.values[compra], numero - 1)
+    nomes_cartao = np.array([c[0] for c in CARTOES])[cartao[compra]]
+    resp = np.array(responsaveis(compras))[compra]
+    loja = np.array(rng.choice(LOJAS, compras))[compra]
+    parcelado = total_parcelas[compra] > 1
+    texto = pd.Series(loja) + np.where(parcelado, " (" + pd.Series(numero).astype(str) + "/"
+                                       + pd.Series(total_parcelas[compra]).astype(str) + ")", "")
+    status = _status(datas, hoje)
+    yield pd.DataFrame({
+        "data": datas.strftime("%Y-%m-%d"),
+        "descricao": _descricao(texto, resp, " | 💳 Crédito (" + pd.Series(nomes_cartao) + ")", status),
+        "categoria": rng.choice(list(CATEGORIAS_DESPESAS)[:5], compras)[compra],
+        "valor": (rng.lognormal(5, 1, compras) / total_parcelas).round(2)[compra],
+        "tipo_mov": "Despesa", "tipo_custo": "Variável", "responsavel": resp, "forma_pagto": "Crédito",
+        "cartao": nomes_cartao, "status": status,
+        "parcela_num": np.where(parcelado, numero, None), "parcela_total": np.where(parcelado, total_parcelas[compra], None),
+    }).iloc[:alvo]
+
+    for tipo, nomes, custo in [("meta", [f"{icone} {nome}" for nome, _, icone in METAS], "Meta"),
+                               ("investimento", [nome for nome, _ in INVESTIMENTOS], "Investimento")]:
+        n = quantidades[tipo]
+        datas, resp = datas_aleatorias(n), responsaveis(n)
+        status = _status(datas, hoje)
+        yield pd.DataFrame({
+            "data": datas.strftime("%Y-%m-%d"),
+            "descricao": _descricao(f"{custo}: " + pd.Series(rng.choice(nomes, n)), resp, "", status),
+            "categoria": custo, "valor": rng.normal(500, 200, n).clip(50).round(2),
+            "tipo_mov": "Despesa", "tipo_custo": custo, "responsavel": resp, "status": status,
+        })
+
+    # Parcelas mensais das dívidas, repetindo os cronogramas até atingir a quantidade pedida
+    n = quantidades["divida"]
+    divida = np.arange(n) % len(DIVIDAS)
+    numero = np.arange(n) // len(DIVIDAS) % (dias // 28)
+    total = np.array([d[2] for d in DIVIDAS])[divida]
+    datas = _somar_meses(np.full(n, inicio.to_datetime64()), numero)
+    texto = "Dívida: " + pd.Series(np.array([d[0] for d in DIVIDAS])[divida]) + " (" \
+        + pd.Series(numero % total + 1).astype(str) + "/" + pd.Series(total).astype(str) + ")"
+    status = _status(datas, hoje)
+    yield pd.DataFrame({
+        "data": datas.strftime("%Y-%m-%d"), "descricao": _descricao(texto, np.full(n, "Ana"), "", status),
+        "categoria": "Dívidas", "valor": (np.array([d[1] / d[2] for d in DIVIDAS])[divida]).round(2),
+        "tipo_mov": "Despesa", "tipo_custo": "Dívida", "responsavel": "Ana", "status": status,
+        "parcela_num": numero % total + 1, "parcela_total": total,
+    })
+
+
+def gerar(caminho, linhas, anos=5, semente=42, hoje=None):
+    """Cria `caminho` (que não pode existir) com cadastros e ~`linhas` lançamentos."""
+    if os.path.exists(caminho):
+        raise FileExistsError(f"{caminho} já existe; o gerador só cria bancos novos")
+    hoje = hoje or date.today()
+    rng = np.random.default_rng(semente)
+    inicio = pd.Timestamp(hoje.year - anos + 1, 1, 1)
+    dias = (pd.Timestamp(hoje.year + 2, 1, 1) - inicio).days
+
+    quantidades = {tipo: int(linhas * fracao) for tipo, fracao in PROPORCOES.items()}
+    quantidades["avulsa"] += linhas - sum(quantidades.values())
+
+    database.create_tables(caminho)
+    conn = database.create_connection(caminho=caminho)
+    try:
+        _cadastros(conn)
+        for bloco in _gerar_lancamentos(rng, quantidades, inicio, dias, hoje):
+            for i in range(0, len(bloco), LOTE):
+                gravar_lancamentos(bloco.iloc[i:i + LOTE], conn=conn)
+        # Saldos de metas, carteira e dívidas coerentes com os lançamentos gerados
+        with conn:
+            conn.execute("""UPDATE metas SET valor_atual = (SELECT COALESCE(SUM(valor), 0) FROM lancamentos
+                            WHERE tipo_custo = 'Meta' AND descricao LIKE 'Meta: ' || metas.icone || ' ' || metas.nome || ' |%')""")
+            conn.execute("""UPDATE carteira_investimentos SET valor_acumulado = (
+                                SELECT COALESCE(SUM(l.valor), 0) FROM lancamentos l, tipos_investimentos t
+                                WHERE t.id = carteira_investimentos.tipo_id AND l.tipo_custo = 'Investimento'
+                                  AND l.descricao LIKE 'Investimento: ' || t.nome || ' |%')""")
+            conn.execute("""UPDATE dividas SET valor_pago = MIN(valor_total, (SELECT COALESCE(SUM(valor), 0) FROM lancamentos
+                            WHERE tipo_custo = 'Dívida' AND status = 'Paga' AND descricao LIKE 'Dívida: ' || dividas.nome || ' (%'))""")
+            # Compras parceladas e cronogramas de dívida ganham os seus planos, como no app
+            vincular_parcelas_a_planos(conn.cursor())
+            registrar_posicoes_dos_aportes(conn.cursor())
+            vincular_aportes_a_metas(conn.cursor())
+        total = conn.execute("SELECT COUNT(*) FROM lancamentos").fetchone()[0]
+    finally:
+        conn.close()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um banco sintético para testes de desempenho")
+    parser.add_argument("caminho", help="Arquivo SQLite a criar")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--anos", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argv)
+    total = gerar(args.caminho, args.linhas, args.anos, args.semente)
+    print(f"{total} lançamentos gravados em {args.caminho}")
+
+
+if __name__ == "__main__":
+    main()
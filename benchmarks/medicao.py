@@ -0,0 +1,37 @@
+"""Medição de uma página dentro do script executado pelo AppTest.
+
+Fica num módulo próprio porque o AppTest roda o script na sua thread, no
+mesmo processo: o resultado volta por ULTIMA_MEDICAO.
+"""
+import importlib
+import time
+import tracemalloc
+
+import instrumentacao
+
+ULTIMA_MEDICAO = {}
+
+
+def medir_pagina(modulo, funcao, detalhado=False):
+    """Chama modules.<modulo>.<funcao>() e guarda o tempo (e, se pedido, SQL e memória)."""
+    exibir = getattr(importlib.import_module(modulo), funcao)
+    ULTIMA_MEDICAO.clear()
+    if not detalhado:
+        inicio = time.perf_counter()
+        exibir()
+        ULTIMA_MEDICAO["tempo_s"] = time.perf_counter() - inicio
+        return
+
+    # Só a rodada detalhada liga a instrumentação: as rodadas cronometradas ficam sem o seu custo
+    ativa = instrumentacao.ATIVA
+    instrumentacao.ativar()
+    tracemalloc.start()
+    try:
+        with instrumentacao.medir_pagina(f"benchmark: {modulo}") as medicao:
+            exibir()
+    finally:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        instrumentacao.ativar(ativa)
+    ULTIMA_MEDICAO["sql_s"] = medicao["sql_s"]
+    ULTIMA_MEDICAO["memoria_pico_mb"] = pico / 2 ** 20
@@ -0,0 +1,199 @@
+"""Carteira de investimentos: posições, cotações e valor de mercado.
+
+posicoes_investimentos é o razão de cada ativo: cada aporte (ou resgate,
+com sinais negativos) guarda a quantidade de cotas e o valor investido.
+As cotações vêm de arquivos CSV em PASTA_COTACOES (variável
+FINANCEIRO_COTACOES, padrão "cotacoes/"): um arquivo por ativo, com o
+código do ativo no nome (PETR4.csv), ou arquivos com uma coluna "ativo".
+O código de um ativo é tipos_investimentos.codigo ou, sem ele, o nome.
+
+O valor diário da carteira junta as cotas de cada ativo às cotações com
+pd.merge_asof (por ativo), sem laço por ativo ou por dia, e soma as
+variações de valor de todos os ativos numa única série. Ativos sem
+cotação (renda fixa, poupança) e aportes registrados sem quantidade
+entram pelo valor investido.
+"""
+import os
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+
+from dados import chave_banco, consultar
+from database import PERFIS_ATIVOS, fixar_banco
+from importador import ler_cotacoes_csv
+
+PASTA_COTACOES = os.environ.get("FINANCEIRO_COTACOES", "cotacoes")
+
+
+def codigo_ativo(nome):
+    return str(nome).strip().upper()
+
+
+# --- COTAÇÕES ---
+
+def arquivos_cotacoes(pasta=None):
+    """(caminho, mtime, tamanho) de cada CSV da pasta: a chave do cache das cotações."""
+    pasta = pasta or PASTA_COTACOES
+    if not os.path.isdir(pasta):
+        return ()
+    arquivos = []
+    for entrada in os.scandir(pasta):
+        if entrada.is_file() and entrada.name.lower().endswith(".csv"):
+            info = entrada.stat()
+            arquivos.append((entrada.path, info.st_mtime_ns, info.st_size))
+    return tuple(sorted(arquivos))
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _ler_cotacoes(arquivos):
+    blocos = []
+    for caminho, _, _ in arquivos:
+        bloco = ler_cotacoes_csv(caminho)
+        bloco["ativo"] = bloco["ativo"].fillna(codigo_ativo(os.path.splitext(os.path.basename(caminho))[0]))
+        blocos.append(bloco)
+    if not blocos:
+        return pd.DataFrame({"ativo": pd.Series(dtype=object), "data": pd.Series(dtype="datetime64[ns]"),
+                             "preco": pd.Series(dtype=float)})
+    cotacoes = pd.concat(blocos, ignore_index=True)
+    cotacoes["data"] = cotacoes["data"].dt.normalize()
+    # Mais de uma cotação no mesmo dia (arquivos sobrepostos): vale a última lida
+    cotacoes = cotacoes.drop_duplicates(["ativo", "data"], keep="last")
+    return cotacoes.sort_values(["data", "ativo"], ignore_index=True)
+
+
+def carregar_cotacoes(pasta=None):
+    """Todas as cotações (ativo, data, preco), relidas só quando algum arquivo muda."""
+    return _ler_cotacoes(arquivos_cotacoes(pasta))
+
+
+# --- POSIÇÕES ---
+
+def carregar_posicoes():
+    """Movimentações da carteira com o nome e o código de cada ativo, em ordem de data."""
+    df = consultar("""
+        SELECT p.id, p.tipo_id, t.nome, COALESCE(NULLIF(TRIM(t.codigo), ''), t.nome) AS ativo,
+               p.data, p.quantidade, p.valor, p.lancamento_id
+        FROM posicoes_investimentos p JOIN tipos_investimentos t ON t.id = p.tipo_id
+        ORDER BY p.data, p.id
+    """)
+    df["ativo"] = df["ativo"].map(codigo_ativo)
+    df["data"] = pd.to_datetime(df["data"], format="ISO8601").dt.normalize().astype("datetime64[ns]")
+    return df
+
+
+def _preparar(posicoes, cotacoes, ate):
+    """Posições e cotações até `ate`, só dos ativos da carteira, e quais movimentações têm cotas cotadas."""
+    ate = pd.Timestamp(ate or date.today()).normalize()
+    # Mesmo tipo nas chaves do merge_asof: o SQLite e o CSV podem trazer object e
+    # string, e as datas podem vir em unidades diferentes (ns, us)
+    posicoes = posicoes.astype({"ativo": str, "data": "datetime64[ns]"})
+    posicoes = posicoes[posicoes["data"] <= ate]
+    cotacoes = cotacoes.astype({"ativo": str, "data": "datetime64[ns]"})
+    cotacoes = cotacoes[(cotacoes["data"] <= ate) & cotacoes["ativo"].isin(posicoes["ativo"].unique())]
+    cotadas = posicoes["ativo"].isin(cotacoes["ativo"].unique()) & (posicoes["quantidade"] != 0)
+    return posicoes, cotacoes, cotadas, ate
+
+
+def _eventos(posicoes, cotacoes, cotadas):
+    """Valor das cotas de cada ativo em cada data em que ele muda (novo preço ou nova quantidade)."""
+    # Cotas acumuladas de cada ativo após cada dia com movimentação
+    cotas = (posicoes[cotadas].groupby(["ativo", "data"])["quantidade"].sum()
+             .groupby(level="ativo").cumsum().rename("cotas").reset_index().sort_values("data"))
+    # Datas em que o valor de algum ativo muda: novo preço ou nova quantidade
+    eventos = (pd.concat([cotacoes.loc[cotacoes["ativo"].isin(cotas["ativo"].unique()), ["ativo", "data"]],
+                          cotas[["ativo", "data"]]])
+               .drop_duplicates().sort_values("data", ignore_index=True))
+    eventos = pd.merge_asof(eventos, cotas, on="data", by="ativo")
+    eventos = pd.merge_asof(eventos, cotacoes, on="data", by="ativo")
+    # Antes da primeira cotação do ativo, vale o primeiro preço conhecido
+    primeiro_preco = cotacoes.groupby("ativo")["preco"].first()
+    eventos["preco"] = eventos["preco"].fillna(eventos["ativo"].map(primeiro_preco))
+    eventos["valor"] = eventos["cotas"].fillna(0) * eventos["preco"]
+    return eventos
+
+
+def valorizar(posicoes, cotacoes, ate=None):
+    """Valor de mercado da carteira dia a dia e a posição atual de cada ativo.
+
+    Retorna (diario, por_ativo): `diario` tem uma linha por dia, do primeiro
+    aporte até `ate`, com valor_mercado e investido; `por_ativo` tem cotas,
+    investido, último preço, valor_atual e resultado de cada ativo.
+    """
+    posicoes, cotacoes, cotadas, ate = _preparar(posicoes, cotacoes, ate)
+    if posicoes.empty:
+        return (pd.DataFrame(columns=["valor_mercado", "investido"], dtype=float),
+                pd.DataFrame(columns=["tipo_id", "nome", "ativo", "cotas", "investido", "preco", "data_cotacao",
+                                      "valor_atual", "resultado"]))
+
+    eventos = _eventos(posicoes, cotacoes, cotadas)
+    # Soma das variações de todos os ativos: uma série só, sem pivotar ativos x dias
+    variacao = eventos["valor"] - eventos.groupby("ativo")["valor"].shift(fill_value=0)
+    mercado = variacao.groupby(eventos["data"]).sum().cumsum()
+
+    sem_cotacao = posicoes.loc[~cotadas].groupby("data")["valor"].sum().cumsum()
+    investido = posicoes.groupby("data")["valor"].sum().cumsum()
+    dias = pd.date_range(posicoes["data"].min(), ate, freq="D")
+
+    def diaria(serie):
+        return serie.reindex(dias, method="ffill").fillna(0) if len(serie) else pd.Series(0.0, index=dias)
+
+    diario = pd.DataFrame({"valor_mercado": diaria(mercado) + diaria(sem_cotacao), "investido": diaria(investido)})
+    diario.index.name = "data"
+
+    ultimos = cotacoes.groupby("ativo").agg(preco=("preco", "last"), data_cotacao=("data", "last"))
+    por_ativo = (posicoes.assign(cotas=posicoes["quantidade"].where(cotadas, 0),
+                                 sem_cotacao=posicoes["valor"].where(~cotadas, 0))
+                 .groupby(["tipo_id", "nome", "ativo"], as_index=False)
+                 .agg(cotas=("cotas", "sum"), investido=("valor", "sum"), sem_cotacao=("sem_cotacao", "sum"))
+                 .join(ultimos, on="ativo"))
+    por_ativo["valor_atual"] = por_ativo["cotas"] * por_ativo["preco"].fillna(0) + por_ativo.pop("sem_cotacao")
+    por_ativo["resultado"] = por_ativo["valor_atual"] - por_ativo["investido"]
+    return diario, por_ativo.sort_values("valor_atual", ascending=False, ignore_index=True)
+
+
+def valores_por_ativo(posicoes, cotacoes, ate=None):
+    """Valor diário e aportes diários de cada ativo: dois DataFrames dias x ativo.
+
+    Base das medidas de rentabilidade (rentabilidade.py), que precisam da
+    série de cada ativo e não só da soma.
+    """
+    posicoes, cotacoes, cotadas, ate = _preparar(posicoes, cotacoes, ate)
+    if posicoes.empty:
+        return pd.DataFrame(dtype=float), pd.DataFrame(dtype=float)
+    dias = pd.date_range(posicoes["data"].min(), ate, freq="D")
+    eventos = _eventos(posicoes, cotacoes, cotadas)
+    # Cada ativo só tem linha nas suas datas: o ffill leva o último valor às datas dos outros
+    mercado = eventos.pivot(index="data", columns="ativo", values="valor").ffill().reindex(dias, method="ffill")
+    sem_cotacao = (posicoes[~cotadas].pivot_table(index="data", columns="ativo", values="valor", aggfunc="sum")
+                   .fillna(0).cumsum().reindex(dias, method="ffill"))
+    valores = mercado.add(sem_cotacao, fill_value=0).fillna(0)
+    aportes = (posicoes.pivot_table(index="data", columns="ativo", values="valor", aggfunc="sum")
+               .reindex(index=dias, columns=valores.columns, fill_value=0).fillna(0))
+    return valores, aportes
+
+
+@st.cache_data(max_entries=2 * PERFIS_ATIVOS, show_spinner=False)
+def _valores_por_ativo(caminho, geracao, arquivos, ate):
+    with fixar_banco(caminho):
+        posicoes = carregar_posicoes()
+    return valores_por_ativo(posicoes, _ler_cotacoes(arquivos), ate)
+
+
+def carteira_por_ativo(ate=None):
+    """valores_por_ativo() das posições gravadas, em cache por geração e arquivos de cotação."""
+    ate = pd.Timestamp(ate or date.today()).date().isoformat()
+    return _valores_por_ativo(*chave_banco(), arquivos_cotacoes(), ate)
+
+
+@st.cache_data(max_entries=2 * PERFIS_ATIVOS, show_spinner=False)
+def _carteira(caminho, geracao, arquivos, ate):
+    with fixar_banco(caminho):
+        posicoes = carregar_posicoes()
+    return valorizar(posicoes, _ler_cotacoes(arquivos), ate)
+
+
+def carteira(ate=None):
+    """valorizar() das posições gravadas com as cotações da pasta, em cache por geração e arquivos."""
+    ate = pd.Timestamp(ate or date.today()).date().isoformat()
+    return _carteira(*chave_banco(), arquivos_cotacoes(), ate)
@@ -0,0 +1,320 @@
+"""Camada de acesso a dados: consultas de leitura usadas pelas páginas.
+
+As leituras são memorizadas com st.cache_data (compartilhado entre sessões).
+A chave inclui o arquivo do banco e a sua geração, que muda a cada commit
+com alterações, deste ou de outro processo (ver database.geracao); assim
+nenhuma escrita precisa limpar o cache explicitamente e nunca se lê um dado
+desatualizado.
+Com vários perfis (perfis.py), cada família tem o seu arquivo: as entradas
+de uma não são invalidadas pelas escritas das outras.
+"""
+import os
+import re
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+
+import database
+from database import create_connection
+
+
+MESES_PT = {1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun",
+            7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez"}
+
+
+def chave_banco():
+    """(arquivo, geração) do banco da sessão — prefixo de toda chave de cache."""
+    return os.path.abspath(database.banco_atual()), database.geracao()
+
+
+def intervalo_mes(ano, mes):
+    """Retorna (início, fim) ISO do mês, com fim exclusivo."""
+    inicio = date(int(ano), int(mes), 1)
+    fim = date(inicio.year + 1, 1, 1) if inicio.month == 12 else date(inicio.year, inicio.month + 1, 1)
+    return inicio.isoformat(), fim.isoformat()
+
+
+def intervalo_ano(ano):
+    return date(int(ano), 1, 1).isoformat(), date(int(ano) + 1, 1, 1).isoformat()
+
+
+# --- LEITURAS EM CACHE ---
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _consultar(caminho, geracao, sql, params):
+    conn = create_connection(somente_leitura=True, caminho=caminho)
+    try:
+        return pd.read_sql_query(sql, conn, params=list(params))
+    finally:
+        conn.close()
+
+
+def consultar(sql, params=()):
+    """Executa um SELECT e devolve um DataFrame, servido do cache quando possível."""
+    return _consultar(*chave_banco(), sql, tuple(params))
+
+
+def carregar_lancamentos(inicio, fim, tipo_custo=None):
+    """Lançamentos com data em [inicio, fim), usando os índices de data."""
+    if tipo_custo:
+        df = consultar("SELECT * FROM lancamentos WHERE tipo_custo = ? AND data >= ? AND data < ? ORDER BY data",
+                       (tipo_custo, inicio, fim))
+    else:
+        df = consultar("SELECT * FROM lancamentos WHERE data >= ? AND data < ? ORDER BY data", (inicio, fim))
+    df['data'] = pd.to_datetime(df['data'], format="ISO8601")
+    return df
+
+
+def existe_lancamento():
+    return bool(consultar("SELECT EXISTS(SELECT 1 FROM lancamentos) AS existe")['existe'].iloc[0])
+
+
+def carregar_resumo(ano, mes=None):
+    """Totais pré-agregados de resumo_mensal para o ano (ou apenas um mês)."""
+    if mes is None:
+        return consultar("SELECT * FROM resumo_mensal WHERE ano = ?", (int(ano),))
+    return consultar("SELECT * FROM resumo_mensal WHERE ano = ? AND mes = ?", (int(ano), int(mes)))
+
+
+# --- DADOS DE REFERÊNCIA (cadastros) ---
+# Tabelas pequenas usadas pelos formulários. Têm versão própria, alterada só
+# quando os cadastros mudam, para não serem recarregadas a cada lançamento.
+
+_versao_referencias = {}
+
+
+def invalidar_referencias():
+    """Chamado pelas telas que alteram cadastros (categorias, cartões, contas...)."""
+    chave = os.path.abspath(database.banco_atual())
+    _versao_referencias[chave] = _versao_referencias.get(chave, 0) + 1
+
+
+@st.cache_data(max_entries=4 * database.PERFIS_ATIVOS, show_spinner=False)
+def _ler_referencias(caminho, versao):
+    conn = create_connection(somente_leitura=True, caminho=caminho)
+    try:
+        def nomes(sql):
+            return [linha[0] for linha in conn.execute(sql)]
+
+        return {
+            "responsaveis": nomes("SELECT nome FROM responsaveis ORDER BY nome ASC"),
+            "contas": nomes("SELECT nome FROM contas_bancarias ORDER BY nome ASC"),
+            "categorias_receitas": nomes("SELECT nome FROM categorias_receitas ORDER BY nome ASC"),
+            "categorias_despesas": dict(conn.execute("SELECT nome, tipo FROM categorias_despesas ORDER BY nome ASC").fetchall()),
+            "cartoes": pd.read_sql_query("SELECT nome, limite, fechamento, vencimento FROM cartoes_credito", conn),
+            "metas": pd.read_sql_query("SELECT id, nome, icone FROM metas", conn),
+            "tipos_investimentos": pd.read_sql_query("SELECT id, nome, cor FROM tipos_investimentos", conn),
+        }
+    finally:
+        conn.close()
+
+
+def carregar_referencias():
+    """Listas de cadastro para os diálogos, mantidas em memória entre reruns."""
+    caminho = os.path.abspath(database.banco_atual())
+    return _ler_referencias(caminho, _versao_referencias.get(caminho, 0))
+
+
+# --- GRADE PAGINADA ---
+
+# Mesmos recortes do seletor "Ver" da tela de lançamentos, em SQL
+FILTROS_LANCAMENTOS = {
+    "Todos": "1 = 1",
+    "Receitas": "tipo_mov = 'Receita'",
+    "Despesas": "tipo_mov = 'Despesa' AND COALESCE(tipo_custo, '') NOT IN ('Meta', 'Investimento', 'Dívida')",
+    "Pendentes": "status = 'Pendente'",
+    "Metas": "tipo_custo = 'Meta'",
+    "Investimentos": "tipo_custo = 'Investimento'",
+    "Dívidas": "tipo_custo = 'Dívida'",
+}
+COLUNAS_ORDENAVEIS = ["data", "descricao", "categoria", "valor", "status", "responsavel"]
+
+
+def contar_lancamentos(inicio, fim, filtro="Todos"):
+    where = f"data >= ? AND data < ? AND ({FILTROS_LANCAMENTOS[filtro]})"
+    return int(consultar(f"SELECT COUNT(*) AS n FROM lancamentos WHERE {where}", (inicio, fim))['n'].iloc[0])
+
+
+def pagina_lancamentos(inicio, fim, filtro="Todos", ordem="data", decrescente=False, limite=50, pagina=1):
+    """Uma página de lançamentos do período, ordenada e paginada no SQLite."""
+    where = f"data >= ? AND data < ? AND ({FILTROS_LANCAMENTOS[filtro]})"
+    ordem = ordem if ordem in COLUNAS_ORDENAVEIS else "data"
+    direcao = "DESC" if decrescente else "ASC"
+    df = consultar(f"SELECT * FROM lancamentos WHERE {where} ORDER BY {ordem} {direcao}, id {direcao} LIMIT ? OFFSET ?",
+                   (inicio, fim, int(limite), (int(pagina) - 1) * int(limite)))
+    df['data'] = pd.to_datetime(df['data'], format="ISO8601")
+    return df
+
+
+# --- BUSCA TEXTUAL ---
+
+def _expressao_busca(termo):
+    """'merc ali' -> '"merc"* "ali"*' (todos os termos, com prefixo)."""
+    termos = re.findall(r"\w+", termo or "")
+    return " ".join(f'"{t}"*' for t in termos)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _tem_fts(caminho):
+    conn = create_connection(somente_leitura=True, caminho=caminho)
+    try:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'lancamentos_fts'").fetchone() is not None
+    finally:
+        conn.close()
+
+
+def buscar_lancamentos(termo, limite=200):
+    """Busca em descrição e categoria de todos os períodos, por relevância (bm25)."""
+    expressao = _expressao_busca(termo)
+    if not expressao:
+        df = consultar("SELECT * FROM lancamentos WHERE 0")
+    elif _tem_fts(os.path.abspath(database.banco_atual())):
+        df = consultar("""
+            SELECT l.* FROM lancamentos_fts
+            JOIN lancamentos l ON l.id = lancamentos_fts.rowid
+            WHERE lancamentos_fts MATCH ?
+            ORDER BY bm25(lancamentos_fts), l.data DESC
+            LIMIT ?
+        """, (expressao, int(limite)))
+    else:
+        termos = re.findall(r"\w+", termo)
+        filtro = " AND ".join("(descricao LIKE ? OR categoria LIKE ?)" for _ in termos)
+        params = [p for t in termos for p in (f"%{t}%", f"%{t}%")]
+        df = consultar(f"SELECT * FROM lancamentos WHERE {filtro} ORDER BY data DESC LIMIT ?", (*params, int(limite)))
+    df['data'] = pd.to_datetime(df['data'], format="ISO8601")
+    return df
+
+
+# --- PARCELAMENTOS ---
+# As parcelas futuras não existem em lancamentos até o mês ser aberto; estas
+# leituras saem direto de planos_parcelamento, com aritmética de meses.
+
+def _mes_sql(coluna):
+    """Índice do mês (ano * 12 + mês - 1) de uma data ISO, em SQL."""
+    return f"(CAST(strftime('%Y', {coluna}) AS INTEGER) * 12 + CAST(strftime('%m', {coluna}) AS INTEGER) - 1)"
+
+
+def _valor_parcela_sql(p, numero):
+    """Valor da parcela `numero` (1 = primeira) do plano `p`, em SQL (ver parcelas.valores_parcelas)."""
+    return f"""(CASE WHEN {numero} = {p}.quantidade AND {p}.valor_ultima IS NOT NULL THEN {p}.valor_ultima
+                 ELSE ROUND({p}.valor_parcela + ({numero} - 1) * COALESCE({p}.variacao, 0), 2) END)"""
+
+
+def _restante_sql(p, feitas):
+    """Soma das parcelas do plano `p` depois das `feitas` primeiras, em SQL (progressão aritmética)."""
+    return f"""(({p}.quantidade - {feitas}) * {p}.valor_parcela
+               + COALESCE({p}.variacao, 0) * (({p}.quantidade - 1) * {p}.quantidade - ({feitas} - 1) * {feitas}) / 2.0
+               + CASE WHEN {p}.valor_ultima IS NOT NULL AND {feitas} < {p}.quantidade
+                      THEN {p}.valor_ultima - {p}.valor_parcela - ({p}.quantidade - 1) * COALESCE({p}.variacao, 0)
+                      ELSE 0 END)"""
+
+
+def parcelas_restantes(hoje=None):
+    """Planos ativos com parcelas a vencer a partir de `hoje` (índice em ativo, ultima_data)."""
+    hoje = pd.Timestamp(hoje or date.today())
+    # Parcelas já vencidas: meses cheios desde a 1ª parcela, mais a do mês atual se o dia já passou
+    return consultar(f"""
+        SELECT *, quantidade - vencidas AS restantes, {_valor_parcela_sql('p', 'vencidas + 1')} AS valor_proxima,
+               {_restante_sql('p', 'vencidas')} AS valor_restante
+        FROM (
+            SELECT id, descricao, categoria, cartao, conta, responsavel, divida_id, valor_parcela, quantidade,
+                   variacao, valor_ultima, primeira_data, ultima_data,
+                   MIN(quantidade, MAX(0, ? - {_mes_sql('primeira_data')}
+                       + (CAST(strftime('%d', primeira_data) AS INTEGER) < ?))) AS vencidas
+            FROM planos_parcelamento
+            WHERE ativo = 1 AND ultima_data >= ?
+        ) p
+        ORDER BY ultima_data
+    """, (hoje.year * 12 + hoje.month - 1, hoje.day, hoje.date().isoformat()))
+
+
+def compromissos_parcelados(inicio, fim, nao_geradas=False):
+    """Total das parcelas de planos ativos em cada mês de [inicio, fim), sem materializá-las.
+
+    A parcela i de um plano cai no mês da 1ª parcela + i - 1: basta cruzar os
+    planos que cobrem a janela com a lista dos seus meses. Com `nao_geradas`,
+    só entram as parcelas que ainda não viraram lançamentos. Agrupa por mês
+    e plano (descricao, categoria, tipo_mov, tipo_custo, cartao).
+    """
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    filtro = f"AND meses.m >= {_mes_sql('p.primeira_data')} + p.geradas" if nao_geradas else ""
+    return consultar(f"""
+        WITH RECURSIVE meses(m) AS (
+            SELECT ? UNION ALL SELECT m + 1 FROM meses WHERE m + 1 < ?
+        )
+        SELECT m / 12 AS ano, m % 12 + 1 AS mes, p.descricao, p.categoria, p.tipo_mov, p.tipo_custo, p.cartao,
+               SUM({_valor_parcela_sql('p', f"meses.m - {_mes_sql('p.primeira_data')} + 1")}) AS total,
+               COUNT(*) AS parcelas
+        FROM planos_parcelamento p
+        JOIN meses ON meses.m BETWEEN {_mes_sql('p.primeira_data')} AND {_mes_sql('p.ultima_data')}
+        WHERE p.ativo = 1 AND p.ultima_data >= ? AND p.primeira_data < ? {filtro}
+        GROUP BY meses.m, p.descricao, p.categoria, p.tipo_mov, p.tipo_custo, p.cartao
+        ORDER BY meses.m
+    """, (inicio.year * 12 + inicio.month - 1, fim.year * 12 + fim.month - 1 + (fim.day > 1),
+          inicio.date().isoformat(), fim.date().isoformat()))
+
+
+def movimento_por_mes(inicio, fim):
+    """Por mês e tipo_mov em [inicio, fim): total pendente e total avulso, numa varredura pelo índice de data.
+
+    Avulso é o que não vem de recorrência nem de parcelamento: a parte do
+    orçamento que a previsão de fluxo de caixa estima pela média.
+    """
+    return consultar(f"""
+        SELECT {_mes_sql('data')} AS m, tipo_mov,
+               SUM(CASE WHEN status = 'Pendente' THEN valor ELSE 0 END) AS pendente,
+               SUM(CASE WHEN recorrencia_id IS NULL AND plano_id IS NULL AND parcela_total IS NULL
+                        THEN valor ELSE 0 END) AS avulso
+        FROM lancamentos
+        WHERE data >= ? AND data < ?
+        GROUP BY m, tipo_mov
+    """, (pd.Timestamp(inicio).date().isoformat(), pd.Timestamp(fim).date().isoformat()))
+
+
+# --- CARTÕES E FATURAS ---
+# faturas (cartão, mês de vencimento) é mantida por triggers em lancamentos;
+# as parcelas ainda não geradas entram pelo saldo dos planos de parcelamento.
+
+def situacao_cartoes(hoje=None):
+    """Fatura aberta, próximo vencimento e limite disponível de todos os cartões, numa consulta.
+
+    - fatura aberta: a que recebe uma compra feita hoje (mês seguinte a partir do fechamento);
+    - próxima fatura: a primeira com vencimento em hoje ou depois, pelo que falta pagar;
+    - em atraso: o que ficou pendente em faturas já vencidas;
+    - limite disponível: limite menos tudo o que está pendente no cartão, inclusive
+      as parcelas futuras que ainda não viraram lançamentos.
+
+    As faturas abertas vencem até o mês seguinte: materialize recorrências e
+    parcelas até parcelas.fim_das_faturas_abertas() antes de ler.
+    """
+    hoje = pd.Timestamp(hoje or date.today())
+    mes_fatura = "(f.ano * 12 + f.mes - 1)"
+    return consultar(f"""
+        WITH hoje(m, d) AS (SELECT ?, ?),
+        futuras AS (
+            SELECT cartao, SUM({_restante_sql('p', 'geradas')}) AS valor
+            FROM planos_parcelamento p
+            WHERE ativo = 1 AND proxima_data IS NOT NULL AND cartao IS NOT NULL
+            GROUP BY cartao
+        )
+        SELECT c.id, c.nome, c.limite, c.fechamento, c.vencimento,
+               h.m + (h.d >= c.fechamento) AS mes_aberta,
+               h.m + (h.d > c.vencimento) AS mes_proxima,
+               COALESCE(SUM(CASE WHEN {mes_fatura} = h.m + (h.d >= c.fechamento) THEN f.total END), 0) AS fatura_aberta,
+               COALESCE(SUM(CASE WHEN {mes_fatura} = h.m + (h.d > c.vencimento) THEN f.total - f.pago END), 0) AS proxima_fatura,
+               COALESCE(SUM(CASE WHEN {mes_fatura} < h.m + (h.d > c.vencimento) THEN f.total - f.pago END), 0) AS em_atraso,
+               COALESCE(SUM(f.total - f.pago), 0) + COALESCE(fu.valor, 0) AS comprometido,
+               c.limite - COALESCE(SUM(f.total - f.pago), 0) - COALESCE(fu.valor, 0) AS limite_disponivel
+        FROM cartoes_credito c
+        CROSS JOIN hoje h
+        LEFT JOIN faturas f ON f.cartao = c.nome
+        LEFT JOIN futuras fu ON fu.cartao = c.nome
+        GROUP BY c.id
+        ORDER BY c.nome
+    """, (hoje.year * 12 + hoje.month - 1, hoje.day))
+
+
+def carregar_faturas(cartao):
+    """Histórico de faturas de um cartão (chave primária de faturas)."""
+    return consultar("SELECT * FROM faturas WHERE cartao = ? ORDER BY ano DESC, mes DESC", (cartao,))
@@ -1,118 +1,242 @@
+import contextvars
+import os
 import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
 
-def create_connection():
-    """Estabelece a conexão com o banco de dados SQLite."""
-    return sqlite3.connect('financeiro.db', check_same_thread=False)
-
-def create_tables():
-    conn = create_connection()
-    cursor = conn.cursor()
-    
-    # 1. TABELA DE LANÇAMENTOS
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS lancamentos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            data TEXT,
-            descricao TEXT,
-            categoria TEXT,
-            valor REAL,
-            tipo_mov TEXT,
-            tipo_custo TEXT
-        )
-    """)
-    
-    # 2. TABELA DE METAS
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS metas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            valor_objetivo REAL NOT NULL,
-            valor_atual REAL DEFAULT 0,
-            icone TEXT DEFAULT '🎯'
-        )
-    """)
-    
-    # 3. TABELA DE CARTÕES DE CRÉDITO
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS cartoes_credito (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            limite REAL,
-            fechamento INTEGER,
-            vencimento INTEGER
-        )
-    """)
-
-    # 4. NOVO: TABELA DE CARTÕES DE BENEFÍCIOS (Vale Alimentação / Presente)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS cartoes_beneficios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            saldo REAL DEFAULT 0
-        )
-    """)
-
-    # 5. TABELAS DE INVESTIMENTOS
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tipos_investimentos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            nome TEXT NOT NULL, 
-            cor TEXT DEFAULT '#58a6ff'
-        )
-    """)
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS carteira_investimentos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tipo_id INTEGER,
-            valor_acumulado REAL DEFAULT 0,
-            FOREIGN KEY (tipo_id) REFERENCES tipos_investimentos(id)
-        )
-    """)
-
-    # 6. TABELA DE DÍVIDAS
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS dividas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            valor_total REAL NOT NULL,
-            valor_pago REAL DEFAULT 0,
-            vencimento TEXT,
-            responsavel TEXT,
-            forma_pagto TEXT,
-            total_parcelas INTEGER DEFAULT 1,
-            status TEXT DEFAULT 'Ativa'
-        )
-    """)
-    
-    # 7. TABELAS AUXILIARES
-    cursor.execute("CREATE TABLE IF NOT EXISTS categorias_receitas (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT)")
-    cursor.execute("CREATE TABLE IF NOT EXISTS categorias_despesas (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT, tipo TEXT)")
-    cursor.execute("CREATE TABLE IF NOT EXISTS contas_bancarias (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT)")
-    cursor.execute("CREATE TABLE IF NOT EXISTS responsaveis (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT)")
-
-    # --- BLOCO DE MIGRAÇÃO ---
-    # Garante que colunas novas existam em bancos de dados antigos
-    try: cursor.execute("ALTER TABLE metas ADD COLUMN icone TEXT DEFAULT '🎯'")
-    except: pass
-    
-    try: cursor.execute("ALTER TABLE lancamentos ADD COLUMN tipo_custo TEXT DEFAULT 'Variável'")
-    except: pass
-
-    try: cursor.execute("ALTER TABLE dividas ADD COLUMN status TEXT DEFAULT 'Ativa'")
-    except: pass
-
-    try: cursor.execute("ALTER TABLE dividas ADD COLUMN forma_pagto TEXT")
-    except: pass
-
-    try: cursor.execute("ALTER TABLE dividas ADD COLUMN total_parcelas INTEGER DEFAULT 1")
-    except: pass
-
-    try: cursor.execute("ALTER TABLE dividas ADD COLUMN responsavel TEXT")
-    except: pass
-
-    conn.commit()
-    conn.close()
-
-# Executa ao carregar para garantir que o esquema esteja pronto
-create_tables()
\ No newline at end of file
+import instrumentacao
+from migrations import aplicar_migracoes
+
+# Caminho padrão do banco (pode ser sobrescrito pela variável FINANCEIRO_DB)
+DB_PATH = os.environ.get("FINANCEIRO_DB", "financeiro.db")
+
+# Chave de st.session_state com o banco do perfil (família) da sessão (ver perfis.py)
+CHAVE_SESSAO = "banco_perfil"
+
+# --- AJUSTES DE DESEMPENHO ---
+CACHE_INSTRUCOES = 256              # Statements preparados mantidos por conexão
+MMAP_BYTES = 256 * 1024 * 1024      # Janela de I/O mapeado em memória
+CACHE_PAGINAS_KIB = 16 * 1024       # Cache de páginas do SQLite (KiB)
+MAX_CONEXOES_OCIOSAS = 4            # Conexões guardadas por banco/modo
+PERFIS_ATIVOS = int(os.environ.get("FINANCEIRO_PERFIS_ATIVOS", "4"))  # Bancos com conexões e caches quentes
+
+_pool = {}
+_pool_lock = threading.Lock()
+
+# Banco das leituras feitas dentro de uma função em cache (ver fixar_banco)
+_banco_fixado = contextvars.ContextVar("banco_fixado", default=None)
+
+# Geração de dados por arquivo: muda a cada commit que altera linhas e
+# faz parte da chave de todos os caches de leitura (ver dados.py)
+_geracoes = {}
+
+# Arquivos cuja data de modificação e tamanho denunciam commits de outros processos
+_SUFIXOS_BANCO = ("", "-wal")
+
+
+def banco_atual():
+    """Arquivo do banco desta execução: o do perfil da sessão do Streamlit ou, fora dela, DB_PATH.
+
+    O Streamlit só é consultado se já estiver carregado: os scripts de linha
+    de comando (gerenciar.py, benchmarks) continuam usando DB_PATH.
+    """
+    fixado = _banco_fixado.get()
+    if fixado is not None:
+        return fixado
+    if "streamlit" in sys.modules:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is not None and CHAVE_SESSAO in ctx.session_state:
+            return ctx.session_state[CHAVE_SESSAO]
+    return DB_PATH
+
+
+@contextmanager
+def fixar_banco(caminho):
+    """Faz as leituras do bloco irem a `caminho`, seja qual for o perfil da sessão.
+
+    Usado pelas funções em st.cache_data que recebem o arquivo só como parte
+    da chave: o resultado guardado tem de vir do banco que a chave indica.
+    """
+    token = _banco_fixado.set(caminho)
+    try:
+        yield
+    finally:
+        _banco_fixado.reset(token)
+
+
+def _marca_arquivos(caminho):
+    """(mtime_ns, tamanho) do banco e do WAL: mudam com commits de qualquer processo."""
+    marca = []
+    for sufixo in _SUFIXOS_BANCO:
+        try:
+            estado = os.stat(caminho + sufixo)
+            marca.append((estado.st_mtime_ns, estado.st_size))
+        except FileNotFoundError:
+            marca.append(None)
+    return tuple(marca)
+
+
+def geracao(caminho=None):
+    """Versão dos dados do arquivo, para as chaves de cache.
+
+    O contador cobre os commits deste processo; a marca dos arquivos, os de
+    outros (gerenciar.py, outros workers do servidor), que gravam no WAL ou,
+    após um checkpoint, no próprio banco. Custa dois os.stat por leitura.
+    """
+    caminho = os.path.abspath(caminho or banco_atual())
+    return _geracoes.get(caminho, 0), _marca_arquivos(caminho)
+
+
+def incrementar_geracao(caminho=None):
+    chave = os.path.abspath(caminho or banco_atual())
+    with _pool_lock:
+        _geracoes[chave] = _geracoes.get(chave, 0) + 1
+
+
+class ConexaoPersistente(sqlite3.Connection):
+    """Conexão que volta para o pool no close() em vez de ser destruída."""
+
+    _chave_pool = None
+    _mudancas_confirmadas = 0
+
+    def _registrar_mudancas(self):
+        # Toda escrita confirmada invalida os caches de leitura deste banco
+        if self.total_changes != self._mudancas_confirmadas:
+            self._mudancas_confirmadas = self.total_changes
+            incrementar_geracao(self._chave_pool[0] if self._chave_pool else None)
+
+    def commit(self):
+        super().commit()
+        self._registrar_mudancas()
+
+    def __exit__(self, tipo, valor, tb):
+        resultado = super().__exit__(tipo, valor, tb)
+        self._registrar_mudancas()
+        return resultado
+
+    # Com a instrumentação ativa, todo SQL passa por CursorMedido (inclusive
+    # conn.execute, que no sqlite3 não chama self.cursor())
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = instrumentacao.CursorMedido if instrumentacao.ATIVA else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, sequencia):
+        return self.cursor().executemany(sql, sequencia)
+
+    def close(self):
+        if self._chave_pool is None:
+            return super().close()
+        with _pool_lock:
+            # close() repetido: a conexão já está ociosa no pool e não pode ser fechada de verdade
+            if self in _pool.get(self._chave_pool, ()):
+                return
+        # Descarta qualquer transação esquecida antes de reutilizar a conexão
+        if self.in_transaction:
+            self.rollback()
+        with _pool_lock:
+            # Reinsere a chave no fim: o pool fica em ordem de uso, para o descarte
+            ociosas = _pool.pop(self._chave_pool, [])
+            _pool[self._chave_pool] = ociosas
+            guardada = self not in ociosas and len(ociosas) < MAX_CONEXOES_OCIOSAS
+            if guardada:
+                ociosas.append(self)
+            elif self in ociosas:
+                return
+            descartadas = _descartar_bancos_antigos()
+        if not guardada:
+            descartadas.append(self)
+        for conn in descartadas:
+            conn._chave_pool = None
+            sqlite3.Connection.close(conn)
+
+
+def _descartar_bancos_antigos():
+    """Tira do pool (com _pool_lock) as conexões dos bancos usados há mais tempo além de PERFIS_ATIVOS.
+
+    Com muitas famílias no mesmo servidor, cada banco ocioso manteria
+    conexões abertas com cache de páginas e mmap próprios.
+    """
+    descartadas = []
+    while len({caminho for caminho, _ in _pool}) > PERFIS_ATIVOS:
+        descartadas.extend(_pool.pop(next(iter(_pool))))
+    return descartadas
+
+
+def _abrir_conexao(caminho, somente_leitura):
+    if somente_leitura:
+        uri = f"file:{os.path.abspath(caminho)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=CACHE_INSTRUCOES, factory=ConexaoPersistente)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(caminho, check_same_thread=False,
+                               cached_statements=CACHE_INSTRUCOES, factory=ConexaoPersistente)
+        conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_PAGINAS_KIB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+
+def create_connection(somente_leitura=False, caminho=None):
+    """Estabelece a conexão com o banco de dados SQLite.
+
+    As conexões ficam em cache por processo e por arquivo: o close() apenas
+    devolve a conexão ao pool. Leituras podem pedir uma conexão própria
+    (somente_leitura=True), que não disputa o lock de escrita do WAL.
+    """
+    caminho = caminho or banco_atual()
+    chave = (os.path.abspath(caminho), somente_leitura)
+    with _pool_lock:
+        ociosas = _pool.get(chave)
+        conn = ociosas.pop() if ociosas else None
+    if conn is None:
+        if somente_leitura and not os.path.exists(caminho):
+            # Banco ainda não criado: o modo somente leitura não consegue abri-lo
+            return create_connection(caminho=caminho)
+        conn = _abrir_conexao(caminho, somente_leitura)
+    conn._chave_pool = chave
+    # A instrumentação pode ter sido ligada ou desligada depois que a conexão foi aberta
+    conn.set_trace_callback(instrumentacao.rastrear_instrucao if instrumentacao.ATIVA else None)
+    return conn
+
+
+def fechar_conexoes():
+    """Fecha de verdade todas as conexões ociosas do pool (testes, scripts)."""
+    with _pool_lock:
+        ociosas = [c for lista in _pool.values() for c in lista]
+        _pool.clear()
+    for conn in ociosas:
+        conn._chave_pool = None
+        conn.close()
+
+_bancos_migrados = set()
+_migracao_lock = threading.Lock()
+
+
+def create_tables(caminho=None):
+    """Garante o esquema atualizado, aplicando migrações uma vez por processo.
+
+    Como o Streamlit reexecuta o main.py a cada interação, as chamadas
+    seguintes à primeira retornam sem tocar no banco.
+    """
+    caminho = os.path.abspath(caminho or banco_atual())
+    if caminho in _bancos_migrados:
+        return
+    with _migracao_lock:
+        if caminho in _bancos_migrados:
+            return
+        conn = create_connection(caminho=caminho)
+        try:
+            aplicar_migracoes(conn)
+        finally:
+            conn.close()
+        _bancos_migrados.add(caminho)
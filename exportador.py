@@ -0,0 +1,215 @@
+"""Exportação do banco para CSV, Parquet e XLSX.
+
+Cada conjunto é lido com pd.read_sql_query(chunksize=...) numa conexão
+somente leitura e gravado lote a lote, então a memória usada depende do
+tamanho do lote e não do período exportado. Em WAL a leitura não bloqueia
+quem estiver gravando enquanto a exportação roda.
+
+Parquet (pyarrow) e XLSX (xlsxwriter) estão no requirements.txt, mas só são
+importados quando o formato é pedido.
+
+Na página de Configurações, arquivo_exportado() roda fora da execução do
+script, só quando o botão de download é clicado (st.download_button com
+dados adiados), numa pasta temporária apagada quando o arquivo é fechado.
+"""
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+import pandas as pd
+
+from database import create_connection
+
+TAMANHO_LOTE = 20_000
+FORMATOS = ["csv", "parquet", "xlsx"]
+LIMITE_LINHAS_XLSX = 1_048_575  # uma linha da planilha fica para o cabeçalho
+PACOTES = {"parquet": "pyarrow", "xlsx": "xlsxwriter"}
+
+# nome -> (SELECT, tabelas de onde vêm os tipos das colunas, filtra por data?)
+CONJUNTOS = {
+    "lancamentos": ("SELECT * FROM lancamentos WHERE data >= ? AND data < ? ORDER BY data, id",
+                    ["lancamentos"], True),
+    "investimentos": ("SELECT * FROM lancamentos WHERE tipo_custo = 'Investimento' AND data >= ? AND data < ? "
+                      "ORDER BY data, id", ["lancamentos"], True),
+    "carteira": ("SELECT c.id, t.nome, t.cor, c.valor_acumulado FROM carteira_investimentos c "
+                 "JOIN tipos_investimentos t ON t.id = c.tipo_id ORDER BY t.nome",
+                 ["carteira_investimentos", "tipos_investimentos"], False),
+    "posicoes": ("SELECT p.id, t.nome, t.codigo, p.data, p.quantidade, p.valor, p.lancamento_id "
+                 "FROM posicoes_investimentos p JOIN tipos_investimentos t ON t.id = p.tipo_id "
+                 "WHERE p.data >= ? AND p.data < ? ORDER BY p.data, p.id",
+                 ["posicoes_investimentos", "tipos_investimentos"], True),
+    "dividas": ("SELECT * FROM dividas ORDER BY id", ["dividas"], False),
+    "parcelamentos": ("SELECT * FROM planos_parcelamento ORDER BY id", ["planos_parcelamento"], False),
+    "metas": ("SELECT * FROM metas ORDER BY id", ["metas"], False),
+}
+
+
+def _tipos(conn, sql, params, tabelas):
+    """dtypes do pandas a partir dos tipos declarados no SQLite.
+
+    Fixar os tipos evita que um lote com a coluna toda vazia mude o esquema
+    no meio do arquivo (Parquet exige o mesmo esquema em todos os lotes).
+    """
+    declarados = {}
+    for tabela in tabelas:
+        for _, nome, tipo, *_ in conn.execute(f"PRAGMA table_info({tabela})"):
+            declarados.setdefault(nome, tipo.upper())
+    colunas = [c[0] for c in conn.execute(f"SELECT * FROM ({sql}) LIMIT 0", params).description]
+    mapa = {"INTEGER": "Int64", "REAL": "float64"}
+    return {c: mapa.get(declarados.get(c), "string") for c in colunas}
+
+
+def ler_em_lotes(nome, inicio=None, fim=None, tamanho_lote=TAMANHO_LOTE, conn=None):
+    """Gera DataFrames do conjunto `nome`, no máximo `tamanho_lote` linhas por vez."""
+    sql, tabelas, por_data = CONJUNTOS[nome]
+    params = (inicio or "0000-01-01", fim or "9999-12-31") if por_data else ()
+    propria = conn is None
+    conn = conn or create_connection(somente_leitura=True)
+    try:
+        dtype = _tipos(conn, sql, params, tabelas)
+        vazio = True
+        for lote in pd.read_sql_query(sql, conn, params=params, chunksize=tamanho_lote, dtype=dtype):
+            vazio = False
+            yield lote
+        if vazio:
+            # Mantém o cabeçalho/esquema mesmo sem linhas
+            yield pd.DataFrame({c: pd.Series(dtype=t) for c, t in dtype.items()})
+    finally:
+        if propria:
+            conn.close()
+
+
+# --- ESCRITORES ---
+
+def _gravar_csv(lotes, caminho):
+    with open(caminho, "w", encoding="utf-8-sig", newline="") as arquivo:
+        for i, lote in enumerate(lotes):
+            lote.to_csv(arquivo, sep=";", decimal=",", index=False, header=(i == 0))
+
+
+def _gravar_parquet(lotes, caminho):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    try:
+        for lote in lotes:
+            tabela = pa.Table.from_pandas(lote, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(caminho, tabela.schema)
+            escritor.write_table(tabela)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def _gravar_planilhas(livro, nome, lotes):
+    """Escreve os lotes em abas de `livro`, abrindo outra aba ao atingir o limite do Excel."""
+    aba, linha, parte = None, 0, 1
+    for lote in lotes:
+        valores = lote.astype(object).where(lote.notna(), None)
+        for registro in valores.itertuples(index=False, name=None):
+            if aba is None or linha > LIMITE_LINHAS_XLSX:
+                aba = livro.add_worksheet(nome if parte == 1 else f"{nome}_{parte}")
+                aba.write_row(0, 0, list(lote.columns))
+                linha, parte = 1, parte + 1
+            aba.write_row(linha, 0, registro)
+            linha += 1
+        if aba is None:
+            aba = livro.add_worksheet(nome)
+            aba.write_row(0, 0, list(lote.columns))
+            parte += 1
+
+
+def exportar(destino, formato="csv", conjuntos=None, inicio=None, fim=None, tamanho_lote=TAMANHO_LOTE):
+    """Exporta os conjuntos escolhidos para a pasta `destino`.
+
+    CSV e Parquet geram um arquivo por conjunto; XLSX gera um único
+    financeiro.xlsx com uma aba por conjunto (em modo constant_memory, que
+    descarrega cada linha no disco assim que é escrita). `inicio`/`fim`
+    (ISO, fim exclusivo) filtram lançamentos e investimentos.
+
+    Retorna a lista de arquivos gerados.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' não suportado (use {', '.join(FORMATOS)})")
+    conjuntos = list(conjuntos or CONJUNTOS)
+    os.makedirs(destino, exist_ok=True)
+
+    conn = create_connection(somente_leitura=True)
+    try:
+        if formato == "xlsx":
+            import xlsxwriter
+
+            caminho = os.path.join(destino, "financeiro.xlsx")
+            livro = xlsxwriter.Workbook(caminho, {"constant_memory": True})
+            try:
+                for nome in conjuntos:
+                    _gravar_planilhas(livro, nome, ler_em_lotes(nome, inicio, fim, tamanho_lote, conn))
+            finally:
+                livro.close()
+            return [caminho]
+
+        gravar = _gravar_csv if formato == "csv" else _gravar_parquet
+        arquivos = []
+        for nome in conjuntos:
+            caminho = os.path.join(destino, f"{nome}.{formato}")
+            gravar(ler_em_lotes(nome, inicio, fim, tamanho_lote, conn), caminho)
+            arquivos.append(caminho)
+        return arquivos
+    finally:
+        conn.close()
+
+
+def compactar(arquivos, caminho_zip):
+    """Junta os arquivos exportados num .zip (copiado do disco em blocos)."""
+    with zipfile.ZipFile(caminho_zip, "w", compression=zipfile.ZIP_DEFLATED) as pacote:
+        for arquivo in arquivos:
+            pacote.write(arquivo, os.path.basename(arquivo))
+    return caminho_zip
+
+
+def pacote_faltando(formato):
+    """Pacote opcional exigido pelo formato e não instalado, ou None."""
+    pacote = PACOTES.get(formato)
+    return pacote if pacote and importlib.util.find_spec(pacote) is None else None
+
+
+def nome_do_arquivo(formato, conjuntos):
+    """Nome do arquivo que arquivo_exportado() entrega para estes conjuntos."""
+    conjuntos = list(conjuntos or CONJUNTOS)
+    if formato == "xlsx":
+        return "financeiro.xlsx"
+    return f"{conjuntos[0]}.{formato}" if len(conjuntos) == 1 else "financeiro.zip"
+
+
+class _ArquivoTemporario(io.FileIO):
+    """Arquivo exportado que apaga a sua pasta temporária ao ser fechado (ou coletado)."""
+
+    def __init__(self, caminho, pasta):
+        super().__init__(caminho, "rb")
+        self._pasta = pasta
+
+    def close(self):
+        super().close()
+        shutil.rmtree(self._pasta, ignore_errors=True)
+
+
+def arquivo_exportado(formato="csv", conjuntos=None, inicio=None, fim=None):
+    """Exporta numa pasta temporária e devolve o arquivo final aberto para leitura.
+
+    Vários arquivos viram um .zip (ver nome_do_arquivo). A pasta some quando
+    o arquivo devolvido é fechado.
+    """
+    pasta = tempfile.mkdtemp(prefix="exportacao_")
+    try:
+        arquivos = exportar(pasta, formato, conjuntos, inicio, fim)
+        if len(arquivos) > 1:
+            arquivos = [compactar(arquivos, os.path.join(pasta, nome_do_arquivo(formato, conjuntos)))]
+        return _ArquivoTemporario(arquivos[0], pasta)
+    except Exception:
+        shutil.rmtree(pasta, ignore_errors=True)
+        raise
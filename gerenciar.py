@@ -0,0 +1,80 @@
+"""Comandos de manutenção do banco, para uso fora do Streamlit.
+
+Uso:
+    python gerenciar.py migrar
+    python gerenciar.py reconstruir-resumo
+    python gerenciar.py importar extrato.ofx --conta "Itaú"
+    python gerenciar.py exportar saida/ --formato parquet --inicio 2024-01-01 --fim 2025-01-01
+"""
+import argparse
+
+import database
+from exportador import CONJUNTOS, FORMATOS, exportar
+from importador import importar_extrato
+from migrations import reconstruir_faturas, reconstruir_resumo_mensal
+
+
+def cmd_migrar(args):
+    database.create_tables()
+    print(f"Esquema atualizado em {database.DB_PATH}")
+
+
+def cmd_reconstruir_resumo(args):
+    database.create_tables()
+    conn = database.create_connection()
+    try:
+        with conn:
+            reconstruir_resumo_mensal(conn.cursor())
+            reconstruir_faturas(conn.cursor())
+        linhas = conn.execute("SELECT COUNT(*) FROM resumo_mensal").fetchone()[0]
+        faturas = conn.execute("SELECT COUNT(*) FROM faturas").fetchone()[0]
+    finally:
+        conn.close()
+    print(f"resumo_mensal reconstruído: {linhas} linhas; faturas: {faturas}")
+
+
+def cmd_importar(args):
+    database.create_tables()
+    resultado = importar_extrato(args.arquivo, conta=args.conta, cartao=args.cartao, responsavel=args.responsavel)
+    print(f"{resultado['lidas']} linhas lidas: {resultado['inseridas']} importadas, "
+          f"{resultado['duplicadas']} já existentes, {resultado['ignoradas']} ignoradas")
+
+
+def cmd_exportar(args):
+    database.create_tables()
+    for arquivo in exportar(args.destino, args.formato, args.conjuntos, args.inicio, args.fim):
+        print(arquivo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção do banco do Controle Financeiro")
+    parser.add_argument("--banco", help="Arquivo SQLite (padrão: FINANCEIRO_DB ou financeiro.db)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    sub.add_parser("migrar", help="Aplica migrações pendentes").set_defaults(func=cmd_migrar)
+    sub.add_parser("reconstruir-resumo", help="Recalcula as tabelas resumo_mensal e faturas").set_defaults(func=cmd_reconstruir_resumo)
+
+    importar = sub.add_parser("importar", help="Importa um extrato CSV/OFX")
+    importar.add_argument("arquivo")
+    destino = importar.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--conta", help="Conta bancária do extrato")
+    destino.add_argument("--cartao", help="Cartão de crédito da fatura")
+    importar.add_argument("--responsavel")
+    importar.set_defaults(func=cmd_importar)
+
+    exportar_ = sub.add_parser("exportar", help="Exporta os dados para CSV, Parquet ou XLSX")
+    exportar_.add_argument("destino", help="Pasta de saída")
+    exportar_.add_argument("--formato", choices=FORMATOS, default="csv")
+    exportar_.add_argument("--conjuntos", nargs="+", choices=list(CONJUNTOS), help="Padrão: todos")
+    exportar_.add_argument("--inicio", help="Data inicial dos lançamentos (AAAA-MM-DD)")
+    exportar_.add_argument("--fim", help="Data final dos lançamentos, exclusiva (AAAA-MM-DD)")
+    exportar_.set_defaults(func=cmd_exportar)
+
+    args = parser.parse_args(argv)
+    if args.banco:
+        database.DB_PATH = args.banco
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Importação de extratos bancários e faturas (CSV e OFX).
+
+O arquivo é lido em lotes (pd.read_csv com chunksize; no OFX, um gerador
+sobre os blocos <STMTTRN>), de modo que a memória usada não depende do
+tamanho do extrato. Cada linha recebe um hash do conteúdo, gravado em
+lancamentos.hash_importacao sob um índice único: reimportar o mesmo
+arquivo (ou um extrato que se sobrepõe ao anterior) não duplica nada.
+
+Os arquivos de cotações da carteira (ver carteira.py) usam os mesmos
+leitores de CSV: ler_cotacoes_csv.
+"""
+import hashlib
+import io
+import os
+import re
+
+import pandas as pd
+
+from database import create_connection
+from parcelas import gravar_lancamentos, vencimentos_fatura
+
+TAMANHO_LOTE = 10_000
+
+# Nomes de coluna comuns nos CSVs dos bancos, já em minúsculas e sem acento
+NOMES_COLUNAS = {
+    "data": ["data", "date", "data lancamento", "data da compra", "dt"],
+    "descricao": ["descricao", "historico", "title", "lancamento", "estabelecimento", "memo"],
+    "valor": ["valor", "amount", "valor (r$)", "quantia"],
+}
+NOMES_COTACOES = {
+    "data": ["data", "date", "dt", "data pregao"],
+    "preco": ["preco", "fechamento", "close", "adj close", "ultimo", "cotacao", "price", "valor"],
+}
+COLUNAS_ATIVO = ["ativo", "codigo", "ticker", "symbol", "papel"]
+
+
+# --- LEITURA EM LOTES ---
+
+def _abrir(arquivo):
+    """Fluxo binário posicionado no início, a partir de um caminho ou arquivo enviado."""
+    if isinstance(arquivo, (str, os.PathLike)):
+        return open(arquivo, "rb"), True
+    arquivo.seek(0)
+    return arquivo, False
+
+
+def _codificacao(amostra):
+    try:
+        amostra.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as erro:
+        # Amostra cortada no meio de um caractere multibyte ainda é UTF-8
+        return "utf-8-sig" if erro.start >= len(amostra) - 3 else "latin-1"
+
+
+def _formato_csv(amostra):
+    """(codificação, separador) a partir do início do arquivo."""
+    codificacao = _codificacao(amostra)
+    primeira_linha = amostra.decode(codificacao, errors="replace").splitlines()[0] if amostra else ""
+    return codificacao, ";" if primeira_linha.count(";") > primeira_linha.count(",") else ","
+
+
+def _normalizar_nome(nome):
+    nome = str(nome).strip().lower()
+    for com, sem in zip("áàâãéêíóôõúç", "aaaaeeiooouc"):
+        nome = nome.replace(com, sem)
+    return nome
+
+
+def _mapear_colunas(cabecalho, colunas=None, nomes=NOMES_COLUNAS):
+    """Descobre quais colunas do CSV são data, descrição e valor (ou os campos de `nomes`)."""
+    normalizados = {_normalizar_nome(c): c for c in cabecalho}
+    mapa = {}
+    for campo, candidatos in nomes.items():
+        if colunas and campo in colunas:
+            mapa[campo] = colunas[campo]
+            continue
+        encontrado = next((normalizados[c] for c in candidatos if c in normalizados), None)
+        if encontrado is None:
+            raise ValueError(f"Coluna de {campo} não encontrada no CSV (colunas: {', '.join(map(str, cabecalho))})")
+        mapa[campo] = encontrado
+    return mapa
+
+
+def _converter_valores(serie):
+    """'1.234,56', '-50.00' e 'R$ 10,00' -> float, de uma vez para a série toda."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    texto = serie.astype(str).str.replace(r"[R$\s]", "", regex=True)
+    decimal_virgula = texto.str.contains(",", regex=False)
+    texto = texto.where(~decimal_virgula, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(texto, errors="coerce")
+
+
+def _converter_datas(serie):
+    serie = serie.astype(str).str.strip()
+    formato = "ISO8601" if re.match(r"\d{4}-\d{2}-\d{2}", serie.iloc[0]) else "%d/%m/%Y"
+    return pd.to_datetime(serie.str[:10], format=formato, errors="coerce")
+
+
+def lotes_csv(fluxo, tamanho_lote=TAMANHO_LOTE, colunas=None):
+    """Gera DataFrames (data, descricao, valor, fitid) lendo o CSV em pedaços."""
+    amostra = fluxo.read(65536)
+    fluxo.seek(0)
+    codificacao, separador = _formato_csv(amostra)
+
+    leitor = pd.read_csv(fluxo, sep=separador, encoding=codificacao, dtype=str, chunksize=tamanho_lote,
+                         skipinitialspace=True)
+    mapa = None
+    for pedaco in leitor:
+        mapa = mapa or _mapear_colunas(pedaco.columns, colunas)
+        pedaco = pedaco.dropna(subset=[mapa["data"], mapa["valor"]])
+        if pedaco.empty:
+            continue
+        yield pd.DataFrame({
+            "data": _converter_datas(pedaco[mapa["data"]]),
+            "descricao": pedaco[mapa["descricao"]].fillna("").str.strip(),
+            "valor": _converter_valores(pedaco[mapa["valor"]]),
+            "fitid": None,
+        })
+
+
+def ler_cotacoes_csv(arquivo):
+    """DataFrame (ativo, data, preco) de um arquivo de cotações.
+
+    A coluna do ativo é opcional: sem ela, `ativo` fica vazio e quem chama
+    usa o nome do arquivo. Linhas sem data ou preço válidos são descartadas.
+    """
+    fluxo, abriu = _abrir(arquivo)
+    try:
+        codificacao, separador = _formato_csv(fluxo.read(65536))
+        fluxo.seek(0)
+        df = pd.read_csv(fluxo, sep=separador, encoding=codificacao, dtype=str, skipinitialspace=True)
+    finally:
+        if abriu:
+            fluxo.close()
+    mapa = _mapear_colunas(df.columns, nomes=NOMES_COTACOES)
+    df = df.dropna(subset=[mapa["data"], mapa["preco"]])
+    if df.empty:
+        return pd.DataFrame({"ativo": pd.Series(dtype=object), "data": pd.Series(dtype="datetime64[ns]"),
+                             "preco": pd.Series(dtype=float)})
+    normalizados = {_normalizar_nome(c): c for c in df.columns}
+    coluna_ativo = next((normalizados[c] for c in COLUNAS_ATIVO if c in normalizados), None)
+    cotacoes = pd.DataFrame({
+        "ativo": df[coluna_ativo].str.strip().str.upper() if coluna_ativo else None,
+        "data": _converter_datas(df[mapa["data"]]),
+        "preco": _converter_valores(df[mapa["preco"]]),
+    })
+    return cotacoes.dropna(subset=["data", "preco"])
+
+
+def _transacoes_ofx(texto):
+    """Gera um dict por bloco <STMTTRN>, lendo o OFX aos poucos."""
+    buffer = ""
+    while True:
+        bloco = texto.read(65536)
+        buffer += bloco
+        while True:
+            inicio = buffer.find("<STMTTRN>")
+            fim = buffer.find("</STMTTRN>", inicio)
+            if inicio < 0 or fim < 0:
+                break
+            # OFX 1.x (SGML) não fecha as tags de valor; por isso o regex para em '<' ou fim de linha
+            yield dict(re.findall(r"<(\w+)>([^<\r\n]*)", buffer[inicio + 9:fim]))
+            buffer = buffer[fim + 10:]
+        if not bloco:
+            break
+        # Descarta o que vem antes da próxima transação (mantendo uma tag cortada ao meio)
+        inicio = buffer.find("<STMTTRN>")
+        buffer = buffer[inicio:] if inicio >= 0 else buffer[-9:]
+
+
+def lotes_ofx(fluxo, tamanho_lote=TAMANHO_LOTE):
+    """Gera DataFrames (data, descricao, valor, fitid) a partir das transações do OFX."""
+    cabecalho = fluxo.read(1024)
+    fluxo.seek(0)
+    codificacao = "utf-8" if re.search(rb"CHARSET:\s*UTF-?8|encoding=\"UTF-8\"", cabecalho, re.I) else "cp1252"
+    texto = io.TextIOWrapper(fluxo, encoding=codificacao, errors="replace", newline="")
+
+    def montar(transacoes):
+        lote = pd.DataFrame(transacoes).reindex(columns=["DTPOSTED", "TRNAMT", "MEMO", "NAME", "FITID"])
+        return pd.DataFrame({
+            "data": pd.to_datetime(lote["DTPOSTED"].str.strip().str[:8], format="%Y%m%d", errors="coerce"),
+            "descricao": lote["MEMO"].fillna(lote["NAME"]).fillna("").str.strip(),
+            "valor": _converter_valores(lote["TRNAMT"].str.strip()),
+            "fitid": lote["FITID"].str.strip(),
+        })
+
+    try:
+        transacoes = []
+        for transacao in _transacoes_ofx(texto):
+            transacoes.append(transacao)
+            if len(transacoes) >= tamanho_lote:
+                yield montar(transacoes)
+                transacoes = []
+        if transacoes:
+            yield montar(transacoes)
+    finally:
+        # Não fecha o arquivo enviado junto com o wrapper
+        texto.detach()
+
+
+# --- MAPEAMENTO PARA LANÇAMENTOS ---
+
+def _hashes(origem, lote, ocorrencias):
+    """Hash de cada linha: origem + FITID, ou origem + data/valor/descrição + nº da repetição.
+
+    A contagem de repetições (dois cafés iguais no mesmo dia) continua entre
+    lotes através de `ocorrencias`, para que o resultado não dependa do
+    tamanho do lote.
+    """
+    base = (lote["data"].dt.strftime("%Y-%m-%d") + "|" + lote["valor"].map("{:.2f}".format) + "|"
+            + lote["descricao"].str.lower())
+    base = base.where(lote["fitid"].isna(), "fitid|" + lote["fitid"].astype(str))
+    repeticao = base.groupby(base).cumcount() + base.map(ocorrencias).fillna(0).astype(int)
+    for chave, quantidade in base.value_counts().items():
+        ocorrencias[chave] = ocorrencias.get(chave, 0) + quantidade
+    chaves = f"{origem}|" + base + "|" + repeticao.astype(str)
+    return [hashlib.sha1(chave.encode()).hexdigest() for chave in chaves]
+
+
+def _montar_linhas(lote, origem, ocorrencias, conta=None, cartao=None, responsavel=None,
+                   categoria="Importado"):
+    lote = lote.dropna(subset=["data", "valor"])
+    lote = lote[lote["valor"] != 0]
+    hashes = _hashes(origem, lote, ocorrencias)
+    metadados = f" | 👤 {responsavel}" if responsavel else ""
+
+    if cartao is not None:
+        # Fatura: compras são positivas; pagamentos e estornos já aparecem no extrato da conta
+        compras = lote["valor"] > 0
+        lote, hashes = lote[compras], pd.Series(hashes, index=compras.index)[compras]
+        datas = vencimentos_fatura(lote["data"], cartao["fechamento"], cartao["vencimento"])
+        linhas = pd.DataFrame({
+            "data": datas.strftime("%Y-%m-%d"),
+            "descricao": lote["descricao"] + f"{metadados} | 💳 Crédito ({cartao['nome']}) | Pendente",
+            "valor": lote["valor"],
+            "tipo_mov": "Despesa",
+            "tipo_custo": "Variável",
+            "forma_pagto": "Crédito",
+            "cartao": cartao["nome"],
+            "status": "Pendente",
+        })
+    else:
+        linhas = pd.DataFrame({
+            "data": lote["data"].dt.strftime("%Y-%m-%d"),
+            "descricao": lote["descricao"] + f"{metadados} | 💰 Débito ({conta}) | Paga",
+            "valor": lote["valor"].abs(),
+            "tipo_mov": lote["valor"].gt(0).map({True: "Receita", False: "Despesa"}),
+            "tipo_custo": lote["valor"].gt(0).map({True: "Receita", False: "Variável"}),
+            "forma_pagto": "Débito",
+            "conta": conta,
+            "status": "Paga",
+        })
+    linhas["categoria"] = categoria
+    linhas["responsavel"] = responsavel
+    linhas["hash_importacao"] = list(hashes)
+    return linhas
+
+
+def importar_extrato(arquivo, nome_arquivo=None, conta=None, cartao=None, responsavel=None,
+                     categoria="Importado", colunas=None, tamanho_lote=TAMANHO_LOTE, conn=None):
+    """Importa um extrato CSV/OFX para a conta ou o cartão informado.
+
+    `arquivo` é um caminho ou um arquivo binário aberto (ex.: o enviado pelo
+    st.file_uploader). Em conta corrente, valores positivos viram receitas e
+    negativos despesas; em cartão, as compras vão para o vencimento da fatura
+    segundo o fechamento cadastrado. Cada lote é gravado na sua própria
+    transação; se a importação parar no meio, basta repeti-la.
+
+    Retorna {"lidas", "inseridas", "duplicadas", "ignoradas"}.
+    """
+    if (conta is None) == (cartao is None):
+        raise ValueError("Informe a conta ou o cartão do extrato (apenas um dos dois)")
+    nome_arquivo = nome_arquivo or getattr(arquivo, "name", None) or str(arquivo)
+    formato = "ofx" if nome_arquivo.lower().endswith((".ofx", ".qfx")) else "csv"
+
+    propria = conn is None
+    conn = conn or create_connection()
+    fluxo, abriu = _abrir(arquivo)
+    try:
+        if cartao is not None:
+            linha = conn.execute("SELECT nome, fechamento, vencimento FROM cartoes_credito WHERE nome = ?",
+                                 (cartao,)).fetchone()
+            if linha is None:
+                raise ValueError(f"Cartão '{cartao}' não cadastrado")
+            cartao = {"nome": linha[0], "fechamento": linha[1] or 1, "vencimento": linha[2] or 10}
+            origem = f"cartao:{cartao['nome']}"
+        else:
+            if conn.execute("SELECT 1 FROM contas_bancarias WHERE nome = ?", (conta,)).fetchone() is None:
+                raise ValueError(f"Conta '{conta}' não cadastrada")
+            origem = f"conta:{conta}"
+
+        lotes = lotes_ofx(fluxo, tamanho_lote) if formato == "ofx" else lotes_csv(fluxo, tamanho_lote, colunas)
+        resultado = {"lidas": 0, "inseridas": 0, "duplicadas": 0, "ignoradas": 0}
+        ocorrencias = {}
+        for lote in lotes:
+            linhas = _montar_linhas(lote, origem, ocorrencias, conta=conta,
+                                    cartao=cartao, responsavel=responsavel, categoria=categoria)
+            inseridas = gravar_lancamentos(linhas, conn=conn, ignorar_duplicados=True) if len(linhas) else 0
+            resultado["lidas"] += len(lote)
+            resultado["inseridas"] += inseridas
+            resultado["duplicadas"] += len(linhas) - inseridas
+            resultado["ignoradas"] += len(lote) - len(linhas)
+        return resultado
+    finally:
+        if abriu:
+            fluxo.close()
+        if propria:
+            conn.close()
@@ -0,0 +1,215 @@
+"""Instrumentação do app: tempo de cada página e de cada consulta SQL.
+
+- As conexões de database.create_connection usam CursorMedido, que mede o
+  tempo de execute() + fetch*() de cada consulta e conta as linhas lidas;
+  o set_trace_callback do sqlite3 conta as instruções realmente executadas
+  (inclusive as disparadas por triggers).
+- medir_pagina() envolve a chamada de um exibir_* e acumula o tempo total,
+  o tempo em SQL e o número de consultas/linhas daquela renderização.
+- Consultas acima de FINANCEIRO_SQL_LENTA_MS (padrão 200 ms) vão para o
+  logger "financeiro.sql".
+
+Os números ficam em memória, por processo, e são exibidos na página de
+Diagnóstico (oculta no menu, em /diagnostico). Desligada por padrão, para
+não pesar em cada consulta: FINANCEIRO_INSTRUMENTACAO=1 a liga desde o
+início, ou a página de Diagnóstico, enquanto o processo estiver no ar.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+ATIVA = os.environ.get("FINANCEIRO_INSTRUMENTACAO", "0") == "1"
+LIMITE_LENTA_S = float(os.environ.get("FINANCEIRO_SQL_LENTA_MS", "200")) / 1000
+AMOSTRAS_POR_PAGINA = 500
+
+logger = logging.getLogger("financeiro.sql")
+
+_lock = threading.Lock()
+_local = threading.local()  # medição em andamento (cada sessão do Streamlit roda na sua thread)
+_amostras = defaultdict(lambda: deque(maxlen=AMOSTRAS_POR_PAGINA))
+_consultas = {}  # sql -> [execuções, tempo total, linhas, maior tempo]
+_lentas = deque(maxlen=100)
+
+
+def ativar(ligada=True):
+    """Liga ou desliga a medição no processo todo, a partir das próximas conexões entregues pelo pool."""
+    global ATIVA
+    ATIVA = ligada
+
+
+def _normalizar(sql):
+    return " ".join(sql.split())[:300]
+
+
+# --- SQL ---
+
+def rastrear_instrucao(instrucao):
+    """Callback do set_trace_callback: conta cada instrução executada pelo SQLite."""
+    medicao = getattr(_local, "medicao", None)
+    if medicao is not None:
+        medicao["instrucoes"] += 1
+
+
+def registrar_consulta(sql, duracao, linhas):
+    sql = _normalizar(sql)
+    medicao = getattr(_local, "medicao", None)
+    if medicao is not None:
+        medicao["sql_s"] += duracao
+        medicao["consultas"] += 1
+        medicao["linhas"] += linhas
+    with _lock:
+        estatistica = _consultas.setdefault(sql, [0, 0.0, 0, 0.0])
+        estatistica[0] += 1
+        estatistica[1] += duracao
+        estatistica[2] += linhas
+        estatistica[3] = max(estatistica[3], duracao)
+        if duracao >= LIMITE_LENTA_S:
+            _lentas.append({"quando": time.strftime("%H:%M:%S"), "pagina": medicao and medicao["pagina"],
+                            "ms": duracao * 1000, "linhas": linhas, "sql": sql})
+    if duracao >= LIMITE_LENTA_S:
+        logger.warning("Consulta lenta (%.0f ms, %d linhas): %s", duracao * 1000, linhas, sql)
+
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que cronometra execute + leitura das linhas de cada consulta.
+
+    A consulta só é registrada quando termina: resultado esgotado, novo
+    execute(), close() ou coleta do cursor. Assim o tempo inclui os passos
+    do SQLite feitos durante o fetch, onde fica o grosso de uma varredura.
+    """
+    _sql = None
+    _tempo = 0.0
+    _linhas = 0
+
+    def _finalizar(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            registrar_consulta(sql, self._tempo, self._linhas)
+
+    def _medir(self, metodo, *args):
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args)
+        finally:
+            self._tempo += time.perf_counter() - inicio
+
+    def execute(self, sql, parametros=()):
+        self._finalizar()
+        self._sql, self._tempo, self._linhas = sql, 0.0, 0
+        resultado = self._medir(super().execute, sql, parametros)
+        if self.description is None:
+            self._finalizar()
+        return resultado
+
+    def executemany(self, sql, sequencia):
+        self._finalizar()
+        self._sql, self._tempo, self._linhas = sql, 0.0, 0
+        try:
+            return self._medir(super().executemany, sql, sequencia)
+        finally:
+            self._finalizar()
+
+    def fetchone(self):
+        linha = self._medir(super().fetchone)
+        if linha is None:
+            self._finalizar()
+        else:
+            self._linhas += 1
+        return linha
+
+    def fetchmany(self, size=None):
+        tamanho = self.arraysize if size is None else size
+        linhas = self._medir(super().fetchmany, tamanho)
+        self._linhas += len(linhas)
+        if len(linhas) < tamanho:
+            self._finalizar()
+        return linhas
+
+    def fetchall(self):
+        linhas = self._medir(super().fetchall)
+        self._linhas += len(linhas)
+        self._finalizar()
+        return linhas
+
+    def __next__(self):
+        try:
+            linha = self._medir(super().__next__)
+        except StopIteration:
+            self._finalizar()
+            raise
+        self._linhas += 1
+        return linha
+
+    def close(self):
+        self._finalizar()
+        super().close()
+
+    def __del__(self):
+        self._finalizar()
+
+
+# --- PÁGINAS ---
+
+@contextmanager
+def medir_pagina(nome):
+    """Mede uma renderização de página (tempo total, SQL, consultas e linhas)."""
+    if not ATIVA:
+        yield None
+        return
+    medicao = {"pagina": nome, "sql_s": 0.0, "consultas": 0, "instrucoes": 0, "linhas": 0}
+    anterior = getattr(_local, "medicao", None)
+    _local.medicao = medicao
+    inicio = time.perf_counter()
+    try:
+        yield medicao
+    finally:
+        medicao["tempo_s"] = time.perf_counter() - inicio
+        _local.medicao = anterior
+        with _lock:
+            _amostras[nome].append(medicao)
+
+
+# --- RELATÓRIOS (página de Diagnóstico) ---
+
+def resumo_paginas():
+    """Percentis de tempo por página desde o início do processo."""
+    with _lock:
+        amostras = [m for fila in _amostras.values() for m in fila]
+    if not amostras:
+        return pd.DataFrame()
+    df = pd.DataFrame(amostras)
+    df["outros_s"] = df["tempo_s"] - df["sql_s"]
+    agrupado = df.groupby("pagina")
+    resumo = agrupado["tempo_s"].quantile([0.5, 0.9, 0.99]).unstack()
+    resumo.columns = ["p50_s", "p90_s", "p99_s"]
+    resumo.insert(0, "execucoes", agrupado.size())
+    resumo["max_s"] = agrupado["tempo_s"].max()
+    resumo = resumo.join(agrupado[["sql_s", "outros_s", "consultas", "instrucoes", "linhas"]].mean().add_suffix("_media"))
+    return resumo.sort_values("p90_s", ascending=False).reset_index()
+
+
+def resumo_consultas(limite=20):
+    """Consultas que mais consumiram tempo no total."""
+    with _lock:
+        linhas = [(sql, *valores) for sql, valores in _consultas.items()]
+    df = pd.DataFrame(linhas, columns=["sql", "execucoes", "tempo_total_s", "linhas", "max_s"])
+    df["media_ms"] = df["tempo_total_s"] / df["execucoes"].clip(lower=1) * 1000
+    return df.sort_values("tempo_total_s", ascending=False).head(limite).reset_index(drop=True)
+
+
+def consultas_lentas():
+    with _lock:
+        return pd.DataFrame(list(_lentas)[::-1])
+
+
+def limpar():
+    with _lock:
+        _amostras.clear()
+        _consultas.clear()
+        _lentas.clear()
@@ -1,54 +1,83 @@
+import importlib
+
 import streamlit as st
-from database import create_tables
+from database import DB_PATH, create_tables
+from parcelas import materializar_parcelas
+from instrumentacao import medir_pagina
+from perfis import criar_perfil, listar_perfis, nome_perfil, titulo_perfil, usar_perfil
+from recorrencias import materializar_recorrencias
 
 # Configuração da página (DEVE ser o primeiro comando)
 st.set_page_config(page_title="Controle Financeiro", page_icon="💰", layout="wide")
 
-# Inicializa o banco (Garante que a tabela de dívidas seja criada)
+# --- PERFIL (família) ---
+# Escolhido antes de tudo: migrações, lançamentos automáticos e páginas usam o banco do perfil
+perfis = listar_perfis()
+if "perfil_criado" in st.session_state:
+    # Perfil recém-criado: passa a ser o selecionado antes de o seletor ser desenhado
+    st.session_state["perfil"] = st.session_state.pop("perfil_criado")
+if st.session_state.get("perfil") not in perfis:
+    st.session_state.pop("perfil", None)
+
+with st.sidebar:
+    padrao = list(perfis).index(nome_perfil(DB_PATH))
+    perfil = st.selectbox("👪 Perfil", list(perfis), format_func=titulo_perfil, key="perfil",
+                          index=0 if "perfil" in st.session_state else padrao)
+    with st.popover("➕ Novo perfil", use_container_width=True):
+        with st.form("form_novo_perfil", clear_on_submit=True):
+            novo = st.text_input("Nome da família")
+            if st.form_submit_button("Criar"):
+                try:
+                    st.session_state["perfil_criado"] = criar_perfil(novo)[0]
+                except ValueError as erro:
+                    st.error(str(erro))
+                else:
+                    st.rerun()
+
+usar_perfil(perfis[perfil])
+
+# Aplica migrações pendentes (só executa DDL na primeira vez de cada processo e banco)
 create_tables()
 
-# Importações dos módulos
-from modules.dashboard import exibir_dashboard
-from modules.lancamentos import exibir_lancamentos
-from modules.metas import exibir_metas
-from modules.investimentos import exibir_investimentos
-from modules.dividas import exibir_dividas  # Nova importação
-from modules.cadastros import exibir_cadastros
+# Lança as recorrências e parcelas do mês corrente (consultas indexadas quando já estão em dia)
+materializar_recorrencias()
+materializar_parcelas()
 
-# --- MENU LATERAL ---
-with st.sidebar:
-    st.title("Controle Financeiro")
-    st.markdown("---")
-    menu = st.radio(
-        "Menu Principal",
-        [
-            "📊 Dashboard", 
-            "💸 Lançamentos", 
-            "🎯 Metas", 
-            "📈 Investimentos", 
-            "📉 Dívidas", # Nova opção no menu
-            "⚙️ Configurações"
-        ],
-        index=0
-    )
-    st.markdown("---")
-    st.caption("Sistema v2.6 | 2026")
 
-# --- ROTEAMENTO ---
-if menu == "📊 Dashboard":
-    exibir_dashboard()
+def pagina(modulo, funcao, titulo, icone, **opcoes):
+    """st.Page que só importa modules.<modulo> quando a página é aberta.
 
-elif menu == "💸 Lançamentos":
-    exibir_lancamentos()
+    Assim o Plotly (dashboard) e os demais módulos pesados não entram no
+    custo de abrir páginas leves como Configurações. Cada renderização é
+    cronometrada para a página de Diagnóstico.
+    """
+    def executar():
+        exibir = getattr(importlib.import_module(f"modules.{modulo}"), funcao)
+        with medir_pagina(f"{icone} {titulo}"):
+            exibir()
 
-elif menu == "🎯 Metas":
-    exibir_metas()
+    return st.Page(executar, title=titulo, icon=icone, url_path=modulo, **opcoes)
 
-elif menu == "📈 Investimentos":
-    exibir_investimentos()
 
-elif menu == "📉 Dívidas":
-    exibir_dividas()  # Chamada do novo módulo
+# --- PÁGINAS ---
+paginas = [
+    pagina("dashboard", "exibir_dashboard", "Dashboard", "📊", default=True),
+    pagina("lancamentos", "exibir_lancamentos", "Lançamentos", "💸"),
+    pagina("metas", "exibir_metas", "Metas", "🎯"),
+    pagina("investimentos", "exibir_investimentos", "Investimentos", "📈"),
+    pagina("dividas", "exibir_dividas", "Dívidas", "📉"),
+    pagina("cartoes", "exibir_cartoes", "Cartões", "💳"),
+    pagina("cadastros", "exibir_cadastros", "Configurações", "⚙️"),
+    # Oculta do menu: acessível só pela URL /diagnostico
+    pagina("diagnostico", "exibir_diagnostico", "Diagnóstico", "🩺", visibility="hidden"),
+]
 
-elif menu == "⚙️ Configurações":
-    exibir_cadastros()
\ No newline at end of file
+# --- MENU LATERAL ---
+selecionada = st.navigation(paginas)
+with st.sidebar:
+    st.markdown("---")
+    st.title("Controle Financeiro")
+    st.caption("Sistema v2.6 | 2026")
+
+# --- ROTEAMENTO ---
+selecionada.run()
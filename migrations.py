@@ -0,0 +1,689 @@
+"""Migrações versionadas do esquema do banco.
+
+Cada migração é uma função numerada registrada em MIGRACOES, aplicada em
+ordem dentro da sua própria transação. A versão atual fica na tabela
+schema_version; quando ela já está em dia nenhum DDL é executado.
+"""
+from datetime import datetime
+
+MIGRACOES = []
+
+
+def migracao(versao, descricao):
+    """Registra a função decorada como a migração de número `versao`."""
+    def registrar(funcao):
+        MIGRACOES.append((versao, descricao, funcao))
+        MIGRACOES.sort(key=lambda m: m[0])
+        return funcao
+    return registrar
+
+
+def _colunas(cursor, tabela):
+    return {linha[1] for linha in cursor.execute(f"PRAGMA table_info({tabela})")}
+
+
+def _adicionar_coluna(cursor, tabela, coluna, definicao):
+    """ALTER TABLE ADD COLUMN apenas se a coluna ainda não existir."""
+    if coluna not in _colunas(cursor, tabela):
+        cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+
+
+# --- MIGRAÇÕES ---
+
+@migracao(1, "Esquema inicial")
+def _m001_esquema_inicial(cursor):
+    # 1. TABELA DE LANÇAMENTOS
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lancamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT,
+            descricao TEXT,
+            categoria TEXT,
+            valor REAL,
+            tipo_mov TEXT,
+            tipo_custo TEXT
+        )
+    """)
+
+    # 2. TABELA DE METAS
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS metas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            valor_objetivo REAL NOT NULL,
+            valor_atual REAL DEFAULT 0,
+            icone TEXT DEFAULT '🎯'
+        )
+    """)
+
+    # 3. TABELA DE CARTÕES DE CRÉDITO
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cartoes_credito (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            limite REAL,
+            fechamento INTEGER,
+            vencimento INTEGER
+        )
+    """)
+
+    # 4. TABELA DE CARTÕES DE BENEFÍCIOS (Vale Alimentação / Presente)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cartoes_beneficios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            saldo REAL DEFAULT 0
+        )
+    """)
+
+    # 5. TABELAS DE INVESTIMENTOS
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tipos_investimentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            cor TEXT DEFAULT '#58a6ff'
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS carteira_investimentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo_id INTEGER,
+            valor_acumulado REAL DEFAULT 0,
+            FOREIGN KEY (tipo_id) REFERENCES tipos_investimentos(id)
+        )
+    """)
+
+    # 6. TABELA DE DÍVIDAS
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dividas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            valor_total REAL NOT NULL,
+            valor_pago REAL DEFAULT 0,
+            vencimento TEXT,
+            responsavel TEXT,
+            forma_pagto TEXT,
+            total_parcelas INTEGER DEFAULT 1,
+            status TEXT DEFAULT 'Ativa'
+        )
+    """)
+
+    # 7. TABELAS AUXILIARES
+    cursor.execute("CREATE TABLE IF NOT EXISTS categorias_receitas (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS categorias_despesas (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT, tipo TEXT)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS contas_bancarias (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS responsaveis (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT)")
+
+    # Colunas que bancos antigos (anteriores ao controle de versão) podem não ter
+    _adicionar_coluna(cursor, "metas", "icone", "TEXT DEFAULT '🎯'")
+    _adicionar_coluna(cursor, "lancamentos", "tipo_custo", "TEXT DEFAULT 'Variável'")
+    _adicionar_coluna(cursor, "dividas", "status", "TEXT DEFAULT 'Ativa'")
+    _adicionar_coluna(cursor, "dividas", "forma_pagto", "TEXT")
+    _adicionar_coluna(cursor, "dividas", "total_parcelas", "INTEGER DEFAULT 1")
+    _adicionar_coluna(cursor, "dividas", "responsavel", "TEXT")
+
+
+@migracao(2, "Datas ISO e índices de período em lançamentos")
+def _m002_indices_data(cursor):
+    # Normaliza datas gravadas com hora ("2026-01-12 00:00:00") para AAAA-MM-DD,
+    # requisito para os filtros por intervalo (data >= ? AND data < ?)
+    cursor.execute("""
+        UPDATE lancamentos SET data = date(data)
+        WHERE date(data) IS NOT NULL AND data <> date(data)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lancamentos_data ON lancamentos(data)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lancamentos_tipo_custo_data ON lancamentos(tipo_custo, data)")
+
+
+
+@migracao(3, "Metadados da descrição em colunas próprias")
+def _m003_colunas_metadados(cursor):
+    import pandas as pd
+
+    _adicionar_coluna(cursor, "lancamentos", "responsavel", "TEXT")
+    _adicionar_coluna(cursor, "lancamentos", "forma_pagto", "TEXT")
+    _adicionar_coluna(cursor, "lancamentos", "conta", "TEXT")
+    _adicionar_coluna(cursor, "lancamentos", "cartao", "TEXT")
+    _adicionar_coluna(cursor, "lancamentos", "parcela_num", "INTEGER")
+    _adicionar_coluna(cursor, "lancamentos", "parcela_total", "INTEGER")
+    _adicionar_coluna(cursor, "lancamentos", "status", "TEXT DEFAULT 'Paga'")
+
+    # Backfill: interpreta " | 👤 X | 💳 Crédito (Cartão) | Pendente" de todas as linhas numa passada só
+    df = pd.DataFrame(cursor.execute("SELECT id, descricao, conta FROM lancamentos").fetchall(),
+                      columns=["id", "descricao", "conta"])
+    if not df.empty:
+        desc = df["descricao"].fillna("").astype(str)
+        responsavel = desc.str.extract(r"👤 (.*?)(?: \||$)")[0]
+        cartao = desc.str.extract(r"💳 Crédito \((.*?)\)")[0]
+        conta = desc.str.extract(r"💰 \w+ \((.*?)\)")[0]
+        forma = desc.str.extract(r"💰 (\w+)")[0].where(cartao.isna(), "Crédito")
+        parcelas = desc.str.extract(r"\((\d+)/(\d+)\)")
+        status = desc.str.contains("Pendente", regex=False).map({True: "Pendente", False: "Paga"})
+
+        atualizados = pd.DataFrame({
+            "responsavel": responsavel,
+            "forma_pagto": forma,
+            "conta": conta.fillna(df["conta"]),
+            "cartao": cartao,
+            "parcela_num": pd.to_numeric(parcelas[0]),
+            "parcela_total": pd.to_numeric(parcelas[1]),
+            "status": status,
+            "id": df["id"],
+        }).astype(object)
+        atualizados = atualizados.where(atualizados.notna(), None)
+        cursor.executemany("""
+            UPDATE lancamentos
+            SET responsavel = ?, forma_pagto = ?, conta = ?, cartao = ?,
+                parcela_num = ?, parcela_total = ?, status = ?
+            WHERE id = ?
+        """, atualizados.itertuples(index=False, name=None))
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lancamentos_status_data ON lancamentos(status, data)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lancamentos_cartao_data ON lancamentos(cartao, data)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lancamentos_conta_data ON lancamentos(conta, data)")
+
+
+
+# Chave do resumo mensal a partir de uma linha de lancamentos (NEW/OLD nos triggers)
+def _chave_resumo(linha):
+    return (f"CAST(strftime('%Y', {linha}.data) AS INTEGER), CAST(strftime('%m', {linha}.data) AS INTEGER), "
+            f"COALESCE({linha}.tipo_mov, ''), COALESCE({linha}.tipo_custo, ''), COALESCE({linha}.categoria, '')")
+
+
+def _somar_no_resumo(linha):
+    return f"""
+        INSERT INTO resumo_mensal (ano, mes, tipo_mov, tipo_custo, categoria, total, quantidade)
+        SELECT {_chave_resumo(linha)}, COALESCE({linha}.valor, 0), 1
+        WHERE strftime('%Y', {linha}.data) IS NOT NULL
+        ON CONFLICT (ano, mes, tipo_mov, tipo_custo, categoria)
+        DO UPDATE SET total = total + excluded.total, quantidade = quantidade + 1;
+    """
+
+
+def _subtrair_do_resumo(linha):
+    filtro = (f"(ano, mes, tipo_mov, tipo_custo, categoria) = ({_chave_resumo(linha)})")
+    return f"""
+        UPDATE resumo_mensal SET total = total - COALESCE({linha}.valor, 0), quantidade = quantidade - 1
+        WHERE {filtro};
+        DELETE FROM resumo_mensal WHERE quantidade <= 0 AND {filtro};
+    """
+
+
+def reconstruir_resumo_mensal(cursor):
+    """Recalcula resumo_mensal do zero a partir de lancamentos."""
+    cursor.execute("DELETE FROM resumo_mensal")
+    cursor.execute("""
+        INSERT INTO resumo_mensal (ano, mes, tipo_mov, tipo_custo, categoria, total, quantidade)
+        SELECT CAST(strftime('%Y', data) AS INTEGER), CAST(strftime('%m', data) AS INTEGER),
+               COALESCE(tipo_mov, ''), COALESCE(tipo_custo, ''), COALESCE(categoria, ''),
+               SUM(COALESCE(valor, 0)), COUNT(*)
+        FROM lancamentos
+        WHERE strftime('%Y', data) IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+    """)
+
+
+@migracao(4, "Resumo mensal mantido por triggers")
+def _m004_resumo_mensal(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumo_mensal (
+            ano INTEGER NOT NULL,
+            mes INTEGER NOT NULL,
+            tipo_mov TEXT NOT NULL,
+            tipo_custo TEXT NOT NULL,
+            categoria TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (ano, mes, tipo_mov, tipo_custo, categoria)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_insert AFTER INSERT ON lancamentos
+        BEGIN {_somar_no_resumo("NEW")} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_delete AFTER DELETE ON lancamentos
+        BEGIN {_subtrair_do_resumo("OLD")} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumo_update
+        AFTER UPDATE OF data, valor, tipo_mov, tipo_custo, categoria ON lancamentos
+        BEGIN {_subtrair_do_resumo("OLD")} {_somar_no_resumo("NEW")} END
+    """)
+    reconstruir_resumo_mensal(cursor)
+
+
+
+def fts5_disponivel(cursor):
+    return bool(cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+
+
+@migracao(5, "Busca textual (FTS5) em lançamentos")
+def _m005_busca_textual(cursor):
+    # Sem FTS5 compilado no SQLite a busca usa LIKE (ver dados.buscar_lancamentos)
+    if not fts5_disponivel(cursor):
+        return
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS lancamentos_fts USING fts5(
+            descricao, categoria,
+            content='lancamentos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON lancamentos BEGIN
+            INSERT INTO lancamentos_fts (rowid, descricao, categoria) VALUES (NEW.id, NEW.descricao, NEW.categoria);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON lancamentos BEGIN
+            INSERT INTO lancamentos_fts (lancamentos_fts, rowid, descricao, categoria)
+            VALUES ('delete', OLD.id, OLD.descricao, OLD.categoria);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF descricao, categoria ON lancamentos BEGIN
+            INSERT INTO lancamentos_fts (lancamentos_fts, rowid, descricao, categoria)
+            VALUES ('delete', OLD.id, OLD.descricao, OLD.categoria);
+            INSERT INTO lancamentos_fts (rowid, descricao, categoria) VALUES (NEW.id, NEW.descricao, NEW.categoria);
+        END
+    """)
+    cursor.execute("INSERT INTO lancamentos_fts (lancamentos_fts) VALUES ('rebuild')")
+
+
+
+@migracao(6, "Hash de importação para deduplicar extratos")
+def _m006_hash_importacao(cursor):
+    _adicionar_coluna(cursor, "lancamentos", "hash_importacao", "TEXT")
+    # Só linhas importadas têm hash; lançamentos digitados ficam fora do índice
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_lancamentos_hash_importacao
+        ON lancamentos(hash_importacao) WHERE hash_importacao IS NOT NULL
+    """)
+
+
+@migracao(7, "Lançamentos recorrentes")
+def _m007_recorrencias(cursor):
+    # Regras de recorrência; proximo_periodo marca o primeiro mês ainda não
+    # materializado em lancamentos (ver recorrencias.materializar_recorrencias)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recorrencias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            descricao TEXT NOT NULL,
+            categoria TEXT,
+            valor REAL NOT NULL,
+            tipo_mov TEXT NOT NULL,
+            tipo_custo TEXT,
+            responsavel TEXT,
+            forma_pagto TEXT,
+            conta TEXT,
+            cartao TEXT,
+            status TEXT DEFAULT 'Pendente',
+            intervalo_meses INTEGER NOT NULL DEFAULT 1,
+            dia INTEGER NOT NULL,
+            inicio TEXT NOT NULL,
+            fim TEXT,
+            gerar_apos TEXT,
+            proximo_periodo TEXT NOT NULL,
+            ativa INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recorrencias_pendentes ON recorrencias(ativa, proximo_periodo)")
+    _adicionar_coluna(cursor, "lancamentos", "recorrencia_id", "INTEGER")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_lancamentos_recorrencia
+        ON lancamentos(recorrencia_id, data) WHERE recorrencia_id IS NOT NULL
+    """)
+
+
+def vincular_parcelas_a_planos(cursor):
+    """Agrupa em planos_parcelamento as parcelas "(i/n)" gravadas sem plano.
+
+    Parcelas da mesma compra têm o mesmo texto, valor e meio de pagamento e
+    apontam para o mesmo mês da 1ª parcela. Os planos criados já nascem com
+    todas as parcelas geradas: uma parcela apagada à mão não volta.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(cursor.execute("""
+        SELECT id, data, descricao, categoria, valor, tipo_mov, tipo_custo, responsavel, forma_pagto, conta, cartao,
+               parcela_num, parcela_total
+        FROM lancamentos WHERE parcela_total IS NOT NULL AND parcela_num IS NOT NULL AND plano_id IS NULL
+    """).fetchall(), columns=["id", "data", "descricao", "categoria", "valor", "tipo_mov", "tipo_custo", "responsavel",
+                              "forma_pagto", "conta", "cartao", "parcela_num", "parcela_total"])
+    df["data"] = pd.to_datetime(df["data"], errors="coerce")
+    partes = df["descricao"].fillna("").str.extract(r"^(.*?) \(\d+/\d+\)(.*?)(?: \| (?:Paga|Pendente))?$")
+    df["base"], df["metadados"] = partes[0], partes[1].fillna("")
+    df = df.dropna(subset=["data", "base"])
+    if df.empty:
+        return
+    df["mes_inicial"] = df["data"].dt.year * 12 + df["data"].dt.month - 1 - (df["parcela_num"] - 1)
+    chave = ["base", "metadados", "categoria", "valor", "tipo_mov", "tipo_custo", "responsavel", "forma_pagto",
+             "conta", "cartao", "parcela_total", "mes_inicial"]
+    df["plano"] = df.groupby(chave, dropna=False, sort=False).ngroup()
+    dividas = dict(cursor.execute("SELECT nome, id FROM dividas").fetchall())
+
+    for _, grupo in df.groupby("plano", sort=False):
+        primeira = grupo.loc[grupo["parcela_num"].idxmin()]
+        inicio = primeira["data"] - pd.DateOffset(months=int(primeira["parcela_num"]) - 1)
+        quantidade = int(primeira["parcela_total"])
+        divida = primeira["base"].removeprefix("Dívida: ") if primeira["base"].startswith("Dívida: ") else None
+        valores = [None if pd.isna(v) else v for v in (
+            primeira["base"], primeira["metadados"], primeira["categoria"], primeira["tipo_mov"], primeira["tipo_custo"],
+            primeira["responsavel"], primeira["forma_pagto"], primeira["conta"], primeira["cartao"])]
+        plano_id = cursor.execute("""
+            INSERT INTO planos_parcelamento (descricao, metadados, categoria, tipo_mov, tipo_custo, responsavel,
+                forma_pagto, conta, cartao, divida_id, valor_parcela, quantidade, primeira_data, ultima_data, geradas)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, valores + [dividas.get(divida), float(primeira["valor"]), quantidade, inicio.date().isoformat(),
+                        (inicio + pd.DateOffset(months=quantidade - 1)).date().isoformat(), quantidade]).lastrowid
+        cursor.executemany("UPDATE lancamentos SET plano_id = ? WHERE id = ?",
+                           [(plano_id, int(i)) for i in grupo["id"]])
+
+
+@migracao(8, "Planos de parcelamento")
+def _m008_planos_parcelamento(cursor):
+    # Uma compra parcelada (ou o plano de uma dívida) gravada uma única vez;
+    # geradas/proxima_data marcam até onde as parcelas já viraram lançamentos
+    # (ver parcelas.materializar_parcelas)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS planos_parcelamento (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            descricao TEXT NOT NULL,
+            metadados TEXT NOT NULL DEFAULT '',
+            categoria TEXT,
+            tipo_mov TEXT,
+            tipo_custo TEXT,
+            responsavel TEXT,
+            forma_pagto TEXT,
+            conta TEXT,
+            cartao TEXT,
+            divida_id INTEGER,
+            valor_parcela REAL NOT NULL,
+            quantidade INTEGER NOT NULL,
+            status_parcela TEXT NOT NULL DEFAULT 'Pendente',
+            primeira_data TEXT NOT NULL,
+            ultima_data TEXT NOT NULL,
+            geradas INTEGER NOT NULL DEFAULT 0,
+            proxima_data TEXT,
+            ativo INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_planos_pendentes
+        ON planos_parcelamento(proxima_data) WHERE proxima_data IS NOT NULL
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_planos_ativos ON planos_parcelamento(ativo, ultima_data)")
+    _adicionar_coluna(cursor, "lancamentos", "plano_id", "INTEGER")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_lancamentos_plano
+        ON lancamentos(plano_id, parcela_num) WHERE plano_id IS NOT NULL
+    """)
+    vincular_parcelas_a_planos(cursor)
+
+
+# Fatura de um lançamento no crédito: cartão e mês de vencimento (a data das
+# compras no cartão já é o vencimento da fatura, ver parcelas.vencimentos_fatura)
+def _chave_fatura(linha):
+    return (f"{linha}.cartao, CAST(strftime('%Y', {linha}.data) AS INTEGER), "
+            f"CAST(strftime('%m', {linha}.data) AS INTEGER)")
+
+
+def _somar_na_fatura(linha):
+    return f"""
+        INSERT INTO faturas (cartao, ano, mes, total, pago, quantidade)
+        SELECT {_chave_fatura(linha)}, COALESCE({linha}.valor, 0),
+               CASE WHEN {linha}.status = 'Paga' THEN COALESCE({linha}.valor, 0) ELSE 0 END, 1
+        WHERE {linha}.cartao IS NOT NULL AND strftime('%Y', {linha}.data) IS NOT NULL
+        ON CONFLICT (cartao, ano, mes)
+        DO UPDATE SET total = total + excluded.total, pago = pago + excluded.pago, quantidade = quantidade + 1;
+    """
+
+
+def _subtrair_da_fatura(linha):
+    filtro = f"(cartao, ano, mes) = ({_chave_fatura(linha)})"
+    return f"""
+        UPDATE faturas SET total = total - COALESCE({linha}.valor, 0),
+                           pago = pago - CASE WHEN {linha}.status = 'Paga' THEN COALESCE({linha}.valor, 0) ELSE 0 END,
+                           quantidade = quantidade - 1
+        WHERE {filtro};
+        DELETE FROM faturas WHERE quantidade <= 0 AND {filtro};
+    """
+
+
+def reconstruir_faturas(cursor):
+    """Recalcula faturas do zero a partir dos lançamentos no crédito."""
+    cursor.execute("DELETE FROM faturas")
+    cursor.execute("""
+        INSERT INTO faturas (cartao, ano, mes, total, pago, quantidade)
+        SELECT cartao, CAST(strftime('%Y', data) AS INTEGER), CAST(strftime('%m', data) AS INTEGER),
+               SUM(COALESCE(valor, 0)), SUM(CASE WHEN status = 'Paga' THEN COALESCE(valor, 0) ELSE 0 END), COUNT(*)
+        FROM lancamentos
+        WHERE cartao IS NOT NULL AND strftime('%Y', data) IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+
+@migracao(9, "Faturas de cartão mantidas por triggers")
+def _m009_faturas(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS faturas (
+            cartao TEXT NOT NULL,
+            ano INTEGER NOT NULL,
+            mes INTEGER NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            pago REAL NOT NULL DEFAULT 0,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (cartao, ano, mes)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_faturas_insert AFTER INSERT ON lancamentos
+        WHEN NEW.cartao IS NOT NULL
+        BEGIN {_somar_na_fatura("NEW")} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_faturas_delete AFTER DELETE ON lancamentos
+        WHEN OLD.cartao IS NOT NULL
+        BEGIN {_subtrair_da_fatura("OLD")} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_faturas_update AFTER UPDATE OF data, valor, cartao, status ON lancamentos
+        WHEN OLD.cartao IS NOT NULL OR NEW.cartao IS NOT NULL
+        BEGIN {_subtrair_da_fatura("OLD")} {_somar_na_fatura("NEW")} END
+    """)
+    reconstruir_faturas(cursor)
+
+
+@migracao(10, "Juros e parcela mínima das dívidas")
+def _m010_juros_dividas(cursor):
+    # taxa_juros em % ao mês; usados pelo simulador de quitação (amortizacao.py)
+    _adicionar_coluna(cursor, "dividas", "taxa_juros", "REAL DEFAULT 0")
+    _adicionar_coluna(cursor, "dividas", "parcela_minima", "REAL DEFAULT 0")
+
+
+def registrar_posicoes_dos_aportes(cursor):
+    """Cria a posição de cada aporte "Investimento: <ativo> | ..." que ainda não tem uma.
+
+    Aportes antigos não registravam a quantidade de cotas: entram com
+    quantidade 0 e são avaliados pelo valor investido (ver carteira.py).
+    """
+    cursor.execute("""
+        INSERT INTO posicoes_investimentos (tipo_id, data, quantidade, valor, lancamento_id)
+        SELECT t.id, substr(l.data, 1, 10), 0, l.valor, l.id
+        FROM lancamentos l
+        JOIN tipos_investimentos t ON l.descricao LIKE 'Investimento: ' || t.nome || ' |%'
+                                   OR l.descricao LIKE 'Aporte Invest: ' || t.nome || ' |%'
+        WHERE l.tipo_custo = 'Investimento'
+          AND NOT EXISTS (SELECT 1 FROM posicoes_investimentos p WHERE p.lancamento_id = l.id)
+        GROUP BY l.id
+    """)
+
+
+@migracao(11, "Posições de investimentos")
+def _m011_posicoes_investimentos(cursor):
+    # Razão da carteira: cada aporte (ou resgate, com sinal negativo) guarda
+    # as cotas e o valor; o valor de mercado vem das cotações (carteira.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS posicoes_investimentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            quantidade REAL NOT NULL DEFAULT 0,
+            valor REAL NOT NULL DEFAULT 0,
+            lancamento_id INTEGER,
+            FOREIGN KEY (tipo_id) REFERENCES tipos_investimentos(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posicoes_ativo ON posicoes_investimentos(tipo_id, data)")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_posicoes_lancamento
+        ON posicoes_investimentos(lancamento_id) WHERE lancamento_id IS NOT NULL
+    """)
+    # Código usado nos arquivos de cotação (ticker); sem ele vale o nome do ativo
+    _adicionar_coluna(cursor, "tipos_investimentos", "codigo", "TEXT")
+    # O aporte acompanha o lançamento de origem, venha a edição ou exclusão de onde vier
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_posicoes_delete AFTER DELETE ON lancamentos
+        WHEN OLD.tipo_custo = 'Investimento'
+        BEGIN
+            DELETE FROM posicoes_investimentos WHERE lancamento_id = OLD.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_posicoes_update AFTER UPDATE OF data, valor ON lancamentos
+        WHEN OLD.tipo_custo = 'Investimento'
+        BEGIN
+            UPDATE posicoes_investimentos SET data = substr(NEW.data, 1, 10), valor = NEW.valor
+            WHERE lancamento_id = OLD.id;
+        END
+    """)
+    registrar_posicoes_dos_aportes(cursor)
+
+
+def vincular_aportes_a_metas(cursor):
+    """Preenche lancamentos.meta_id dos aportes "Meta: <ícone> <nome> | ..." gravados sem ele."""
+    cursor.execute("""
+        UPDATE lancamentos SET meta_id = (
+            SELECT m.id FROM metas m
+            WHERE lancamentos.descricao LIKE 'Meta: ' || COALESCE(m.icone || ' ', '') || m.nome || ' |%'
+            ORDER BY length(m.nome) DESC LIMIT 1
+        )
+        WHERE tipo_custo = 'Meta' AND meta_id IS NULL
+    """)
+
+
+@migracao(12, "Aportes ligados às metas")
+def _m012_aportes_metas(cursor):
+    # O histórico de aportes de cada meta alimenta a projeção (projecao.py);
+    # prazo é a data-alvo opcional da meta
+    _adicionar_coluna(cursor, "lancamentos", "meta_id", "INTEGER")
+    _adicionar_coluna(cursor, "metas", "prazo", "TEXT")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_lancamentos_meta
+        ON lancamentos(meta_id, data) WHERE meta_id IS NOT NULL
+    """)
+    vincular_aportes_a_metas(cursor)
+
+
+@migracao(13, "Colunas dos bancos da versão anterior")
+def _m013_bancos_legados(cursor):
+    # Bancos criados pela versão antiga (financas.db, financas_casal.db) já
+    # tinham metas e cartoes_credito, então o CREATE TABLE IF NOT EXISTS da
+    # migração 1 não trouxe as colunas novas; agora eles viram perfis
+    _adicionar_coluna(cursor, "cartoes_credito", "vencimento", "INTEGER")
+    colunas_metas = _colunas(cursor, "metas")
+    _adicionar_coluna(cursor, "metas", "valor_objetivo", "REAL")
+    _adicionar_coluna(cursor, "metas", "valor_atual", "REAL DEFAULT 0")
+    if "valor_alvo" in colunas_metas:
+        cursor.execute("UPDATE metas SET valor_objetivo = valor_alvo WHERE valor_objetivo IS NULL")
+    if "data_alvo" in colunas_metas:
+        cursor.execute("UPDATE metas SET prazo = substr(data_alvo, 1, 10) WHERE prazo IS NULL AND data_alvo <> ''")
+
+
+def _tabelas(cursor):
+    return {linha[0] for linha in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+@migracao(14, "Lançamentos e cartões dos bancos da versão anterior")
+def _m014_dados_legados(cursor):
+    # A versão antiga gravava receitas e despesas em tabelas próprias; elas
+    # viram lançamentos (os triggers preenchem resumo_mensal e a busca) e
+    # ficam no banco sem uso
+    tabelas = _tabelas(cursor)
+    if "categorias" in tabelas:
+        cursor.execute("""
+            INSERT INTO categorias_despesas (nome, tipo)
+            SELECT c.nome, 'Variável' FROM categorias c
+            WHERE c.nome IS NOT NULL AND NOT EXISTS (SELECT 1 FROM categorias_despesas d WHERE d.nome = c.nome)
+        """)
+    if "receitas" in tabelas:
+        cursor.execute("""
+            INSERT INTO lancamentos (data, descricao, categoria, valor, tipo_mov, tipo_custo, responsavel, status)
+            SELECT substr(data, 1, 10), COALESCE(NULLIF(fonte, ''), 'Receita'), fonte, valor, 'Receita', 'Receita',
+                   responsavel, 'Paga'
+            FROM receitas ORDER BY data, id
+        """)
+    if "despesas" in tabelas:
+        cursor.execute("""
+            INSERT INTO lancamentos (data, descricao, categoria, valor, tipo_mov, tipo_custo, status)
+            SELECT substr(d.data, 1, 10), COALESCE(NULLIF(d.descricao, ''), d.categoria), d.categoria, d.valor,
+                   'Despesa', COALESCE((SELECT c.tipo FROM categorias_despesas c WHERE c.nome = d.categoria
+                                        ORDER BY c.id LIMIT 1), 'Variável'), 'Paga'
+            FROM despesas d ORDER BY d.data, d.id
+        """)
+    # Cartões antigos só tinham o fechamento: vencimento padrão do cadastro
+    cursor.execute("UPDATE cartoes_credito SET vencimento = 10 WHERE vencimento IS NULL")
+
+
+@migracao(15, "Data de pagamento dos lançamentos")
+def _m015_data_pagamento(cursor):
+    # Pagar um item no cartão ou de uma recorrência não muda a data: ela é o
+    # vencimento da fatura (chave de faturas) e a data da ocorrência da regra
+    _adicionar_coluna(cursor, "lancamentos", "data_pagamento", "TEXT")
+
+
+@migracao(16, "Regra de valor das parcelas do plano")
+def _m016_regra_de_valor(cursor):
+    # Price e SAC (com ou sem amortização extra) pagam valor_parcela + (i - 1) * variacao
+    # na i-ésima parcela; a última, que quita o saldo, pode fugir da regra
+    _adicionar_coluna(cursor, "planos_parcelamento", "variacao", "REAL DEFAULT 0")
+    _adicionar_coluna(cursor, "planos_parcelamento", "valor_ultima", "REAL")
+
+# --- EXECUÇÃO ---
+
+def versao_atual(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            versao INTEGER PRIMARY KEY,
+            descricao TEXT,
+            aplicada_em TEXT
+        )
+    """)
+    res = conn.execute("SELECT MAX(versao) FROM schema_version").fetchone()
+    return res[0] or 0
+
+
+def aplicar_migracoes(conn):
+    """Aplica, em ordem, as migrações pendentes. Retorna a versão final."""
+    versao = versao_atual(conn)
+    for numero, descricao, funcao in MIGRACOES:
+        if numero <= versao:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Outro processo pode ter aplicado a migração enquanto esperávamos o lock
+            if (cursor.execute("SELECT MAX(versao) FROM schema_version").fetchone()[0] or 0) >= numero:
+                conn.rollback()
+                continue
+            funcao(cursor)
+            cursor.execute("INSERT INTO schema_version (versao, descricao, aplicada_em) VALUES (?, ?, ?)",
+                           (numero, descricao, datetime.now().isoformat(timespec="seconds")))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        versao = numero
+    return versao
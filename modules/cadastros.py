@@ -1,6 +1,11 @@
+from datetime import date, timedelta
+
 import streamlit as st
 import pandas as pd
-from database import create_connection
+from database import banco_atual, create_connection, fixar_banco
+from dados import carregar_referencias, consultar, invalidar_referencias
+from exportador import CONJUNTOS, FORMATOS, arquivo_exportado, nome_do_arquivo, pacote_faltando
+from recorrencias import FREQUENCIAS, encerrar_recorrencia, salvar_recorrencia
 
 def deletar_cadastro(tabela, id_item):
     """Função genérica para deletar itens das tabelas de configuração"""
@@ -8,6 +13,7 @@ def deletar_cadastro(tabela, id_item):
     try:
         conn.execute(f"DELETE FROM {tabela} WHERE id = ?", (id_item,))
         conn.commit()
+        invalidar_referencias()
         st.toast(f"Item removido com sucesso!", icon="🗑️")
     except Exception as e:
         st.error(f"Erro ao deletar: {e}")
@@ -15,15 +21,77 @@ def deletar_cadastro(tabela, id_item):
         conn.close()
     st.rerun()
 
+def campos_recorrencia(atual, chave):
+    """Campos de uma regra recorrente; `atual` preenche os valores na edição."""
+    refs = carregar_referencias()
+    tipos = ["Despesa", "Receita"]
+    tipo_mov = st.radio("Tipo", tipos, index=tipos.index(atual.get("tipo_mov", "Despesa")), horizontal=True, key=f"{chave}_tipo")
+    categorias = (refs['categorias_receitas'] if tipo_mov == "Receita" else list(refs['categorias_despesas'])) or ["Geral"]
+
+    c1, c2 = st.columns(2)
+    descricao = c1.text_input("Descrição", atual.get("descricao", ""), key=f"{chave}_desc")
+    categoria = c2.selectbox("Categoria", categorias, index=categorias.index(atual["categoria"]) if atual.get("categoria") in categorias else 0,
+                             key=f"{chave}_cat")
+    c3, c4, c5 = st.columns(3)
+    valor = c3.number_input("Valor R$", min_value=0.0, value=float(atual.get("valor", 0.0)), format="%.2f", key=f"{chave}_valor")
+    frequencias = list(FREQUENCIAS)
+    intervalo_atual = [f for f, meses in FREQUENCIAS.items() if meses == atual.get("intervalo_meses", 1)]
+    frequencia = c4.selectbox("Frequência", frequencias, index=frequencias.index(intervalo_atual[0]) if intervalo_atual else 0,
+                              key=f"{chave}_freq")
+    dia = c5.number_input("Dia do mês", 1, 31, int(atual.get("dia", date.today().day)), key=f"{chave}_dia")
+    c6, c7 = st.columns(2)
+    inicio = c6.date_input("Início", pd.Timestamp(atual.get("inicio", date.today())).date(), key=f"{chave}_inicio")
+    fim = c7.date_input("Fim (opcional)", pd.Timestamp(atual["fim"]).date() if atual.get("fim") else None, key=f"{chave}_fim")
+
+    resps = [None] + refs['responsaveis']
+    responsavel = st.selectbox("Responsável", resps, index=resps.index(atual.get("responsavel")) if atual.get("responsavel") in resps else 0,
+                               format_func=lambda r: r or "—", key=f"{chave}_resp")
+    cartoes = refs['cartoes']['nome'].tolist()
+    origens = ["Conta", "Cartão"] if cartoes and tipo_mov == "Despesa" else ["Conta"]
+    origem = st.radio("Pagamento", origens, index=1 if atual.get("cartao") and len(origens) > 1 else 0, horizontal=True, key=f"{chave}_origem")
+    forma, conta, cartao = None, None, None
+    if origem == "Cartão":
+        cartao = st.selectbox("Cartão", cartoes, index=cartoes.index(atual["cartao"]) if atual.get("cartao") in cartoes else 0, key=f"{chave}_cartao")
+    else:
+        formas = ["Pix", "Boleto", "Dinheiro", "Débito"]
+        contas = refs['contas'] or ["Conta Principal"]
+        c8, c9 = st.columns(2)
+        forma = c8.selectbox("Forma", formas, index=formas.index(atual["forma_pagto"]) if atual.get("forma_pagto") in formas else 0,
+                             key=f"{chave}_forma")
+        conta = c9.selectbox("Conta", contas, index=contas.index(atual["conta"]) if atual.get("conta") in contas else 0, key=f"{chave}_conta")
+    status = st.radio("Status dos lançamentos gerados", ["Pendente", "Paga"], index=1 if atual.get("status") == "Paga" else 0,
+                      horizontal=True, key=f"{chave}_status")
+
+    return {
+        "descricao": descricao.strip(), "categoria": categoria, "valor": valor, "tipo_mov": tipo_mov,
+        "tipo_custo": "Receita" if tipo_mov == "Receita" else refs['categorias_despesas'].get(categoria, "Variável"),
+        "responsavel": responsavel, "forma_pagto": forma, "conta": conta, "cartao": cartao, "status": status,
+        "intervalo_meses": FREQUENCIAS[frequencia], "dia": int(dia), "inicio": inicio, "fim": fim,
+    }
+
+@st.dialog("Editar Recorrência", width="large")
+def popup_editar_recorrencia(regra):
+    st.caption("As alterações valem a partir de hoje: lançamentos já realizados ou pagos não mudam.")
+    nova = campos_recorrencia(regra, f"rec_{regra['id']}")
+    if st.button("💾 Salvar alterações", use_container_width=True):
+        if not nova["descricao"] or nova["valor"] <= 0:
+            st.warning("Informe descrição e valor.")
+        else:
+            salvar_recorrencia(nova, id_regra=int(regra['id']))
+            st.toast("Recorrência atualizada!", icon="🔁")
+            st.rerun()
+
 def exibir_cadastros():
     st.markdown("<h2 style='color: white;'>Configurações e Cadastros</h2>", unsafe_allow_html=True)
     
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
         "🏷️ Categorias", 
         "💳 Cartões", 
         "🏦 Contas", 
         "👥 Responsáveis",
-        "📈 Investimentos"
+        "📈 Investimentos",
+        "🔁 Recorrências",
+        "📤 Exportar"
     ])
     
     conn = create_connection()
@@ -44,6 +112,7 @@ def exibir_cadastros():
                     else:
                         conn.execute("INSERT INTO categorias_despesas (nome, tipo) VALUES (?,?)", (nome_cat, tipo_custo))
                     conn.commit()
+                    invalidar_referencias()
                     st.toast("Categoria salva!", icon="✅")
                     st.rerun()
 
@@ -51,7 +120,7 @@ def exibir_cadastros():
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("**Categorias de Receitas**")
-            df_rec = pd.read_sql_query("SELECT * FROM categorias_receitas ORDER BY nome", conn)
+            df_rec = consultar("SELECT * FROM categorias_receitas ORDER BY nome")
             for _, row in df_rec.iterrows():
                 c_v1, c_v2 = st.columns([0.8, 0.2])
                 c_v1.text(f"● {row['nome']}")
@@ -59,7 +128,7 @@ def exibir_cadastros():
                     deletar_cadastro("categorias_receitas", row['id'])
         with col2:
             st.markdown("**Categorias de Despesas**")
-            df_desp = pd.read_sql_query("SELECT * FROM categorias_despesas ORDER BY nome", conn)
+            df_desp = consultar("SELECT * FROM categorias_despesas ORDER BY nome")
             for _, row in df_desp.iterrows():
                 c_v1, c_v2 = st.columns([0.8, 0.2])
                 c_v1.text(f"● {row['nome']} ({row['tipo']})")
@@ -82,10 +151,11 @@ def exibir_cadastros():
                 if nome:
                     conn.execute("INSERT INTO cartoes_credito (nome, limite, fechamento, vencimento) VALUES (?,?,?,?)", (nome, limite, fechamento, vencimento))
                     conn.commit()
+                    invalidar_referencias()
                     st.toast("Cartão cadastrado!", icon="💳")
                     st.rerun()
 
-        df_c = pd.read_sql_query("SELECT * FROM cartoes_credito", conn)
+        df_c = consultar("SELECT * FROM cartoes_credito")
         for _, row in df_c.iterrows():
             col_b1, col_b2 = st.columns([0.9, 0.1])
             col_b1.write(f"💳 **{row['nome']}** - Limite: R$ {row['limite']:.2f} (Venc: {row['vencimento']})")
@@ -106,12 +176,13 @@ def exibir_cadastros():
                     # Assumindo que você tenha ou criará a tabela cartoes_beneficios
                     conn.execute("INSERT INTO cartoes_beneficios (nome, saldo) VALUES (?,?)", (nome_vale, saldo_vale))
                     conn.commit()
+                    invalidar_referencias()
                     st.toast("Benefício cadastrado!", icon="🍏")
                     st.rerun()
 
         # Listagem de Benefícios (Tente ler da tabela, se não existir, ignore para não quebrar)
         try:
-            df_v = pd.read_sql_query("SELECT * FROM cartoes_beneficios", conn)
+            df_v = consultar("SELECT * FROM cartoes_beneficios")
             for _, row in df_v.iterrows():
                 col_v1, col_v2 = st.columns([0.9, 0.1])
                 col_v1.write(f"🍏 **{row['nome']}** - Saldo: R$ {row['saldo']:.2f}")
@@ -128,9 +199,10 @@ def exibir_cadastros():
                 if n:
                     conn.execute("INSERT INTO contas_bancarias (nome) VALUES (?)", (n,))
                     conn.commit()
+                    invalidar_referencias()
                     st.toast("Conta salva!", icon="🏦")
                     st.rerun()
-        df_contas = pd.read_sql_query("SELECT * FROM contas_bancarias", conn)
+        df_contas = consultar("SELECT * FROM contas_bancarias")
         for _, row in df_contas.iterrows():
             col_b1, col_b2 = st.columns([0.9, 0.1])
             col_b1.write(f"🏦 {row['nome']}")
@@ -145,9 +217,10 @@ def exibir_cadastros():
                 if n:
                     conn.execute("INSERT INTO responsaveis (nome) VALUES (?)", (n,))
                     conn.commit()
+                    invalidar_referencias()
                     st.toast("Responsável salva!", icon="👤")
                     st.rerun()
-        df_resp = pd.read_sql_query("SELECT * FROM responsaveis", conn)
+        df_resp = consultar("SELECT * FROM responsaveis")
         for _, row in df_resp.iterrows():
             col_b1, col_b2 = st.columns([0.9, 0.1])
             col_b1.write(f"👤 {row['nome']}")
@@ -159,19 +232,80 @@ def exibir_cadastros():
         st.subheader("🏦 Tipos de Investimento")
         with st.form("form_invest", clear_on_submit=True):
             nome_inv = st.text_input("Nome do Investimento (ex: CDB Itaú, PETR4)")
+            codigo_inv = st.text_input("Código nas cotações (opcional)", help="Nome do arquivo em cotacoes/ (ex: PETR4 para PETR4.csv). Sem ele, vale o nome.")
             cor_inv = st.color_picker("Escolha uma cor para os gráficos", "#58a6ff")
             if st.form_submit_button("Salvar Ativo"):
                 if nome_inv:
-                    conn.execute("INSERT INTO tipos_investimentos (nome, cor) VALUES (?,?)", (nome_inv, cor_inv))
+                    conn.execute("INSERT INTO tipos_investimentos (nome, cor, codigo) VALUES (?,?,?)",
+                                 (nome_inv, cor_inv, codigo_inv.strip().upper() or None))
                     conn.commit()
+                    invalidar_referencias()
                     st.toast("Ativo cadastrado!", icon="📈")
                     st.rerun()
         
-        df_inv = pd.read_sql_query("SELECT * FROM tipos_investimentos ORDER BY nome", conn)
+        df_inv = consultar("SELECT * FROM tipos_investimentos ORDER BY nome")
         for _, row in df_inv.iterrows():
             col_b1, col_b2 = st.columns([0.9, 0.1])
-            col_b1.markdown(f"<span style='color:{row['cor']}'>●</span> {row['nome']}", unsafe_allow_html=True)
+            codigo = f" `{row['codigo']}`" if row['codigo'] else ""
+            col_b1.markdown(f"<span style='color:{row['cor']}'>●</span> {row['nome']}{codigo}", unsafe_allow_html=True)
             if col_b2.button("🗑️", key=f"del_tipo_inv_{row['id']}"):
                 deletar_cadastro("tipos_investimentos", row['id'])
 
+    # --- ABA 6: RECORRÊNCIAS ---
+    with tab6:
+        st.subheader("🔁 Lançamentos Recorrentes")
+        st.caption("Cada ocorrência é lançada automaticamente quando o seu mês é aberto no app.")
+        with st.expander("➕ Nova Recorrência"):
+            regra = campos_recorrencia({}, "rec_nova")
+            if st.button("Salvar Recorrência"):
+                if not regra["descricao"] or regra["valor"] <= 0:
+                    st.warning("Informe descrição e valor.")
+                else:
+                    salvar_recorrencia(regra)
+                    st.toast("Recorrência criada!", icon="🔁")
+                    st.rerun()
+
+        df_rec = consultar("SELECT * FROM recorrencias WHERE ativa = 1 ORDER BY descricao")
+        nomes_frequencia = {meses: nome for nome, meses in FREQUENCIAS.items()}
+        for _, row in df_rec.iterrows():
+            col_r1, col_r2, col_r3 = st.columns([0.8, 0.1, 0.1])
+            origem = f"💳 {row['cartao']}" if row['cartao'] else f"🏦 {row['conta'] or '—'}"
+            cor = "#3fb950" if row['tipo_mov'] == "Receita" else "#f85149"
+            frequencia = nomes_frequencia.get(row['intervalo_meses'], f"a cada {row['intervalo_meses']} meses")
+            col_r1.markdown(f"<span style='color:{cor}'>●</span> **{row['descricao']}** - R$ {row['valor']:.2f} · "
+                            f"{frequencia}, dia {row['dia']} · {origem}",
+                            unsafe_allow_html=True)
+            if col_r2.button("✏️", key=f"edit_rec_{row['id']}"):
+                popup_editar_recorrencia(row.to_dict())
+            if col_r3.button("⏹️", key=f"fim_rec_{row['id']}", help="Encerrar: remove os lançamentos futuros pendentes"):
+                encerrar_recorrencia(int(row['id']))
+                st.toast("Recorrência encerrada!", icon="⏹️")
+                st.rerun()
+
+    # --- ABA 7: EXPORTAÇÃO ---
+    with tab7:
+        st.subheader("📤 Exportar Dados")
+        c1, c2 = st.columns(2)
+        formato = c1.selectbox("Formato", FORMATOS, format_func=str.upper)
+        periodo = c2.date_input("Período dos lançamentos", (date(date.today().year, 1, 1), date.today()))
+        conjuntos = st.multiselect("Conteúdo", list(CONJUNTOS), default=list(CONJUNTOS))
+        inicio, fim = periodo if len(periodo) == 2 else (periodo[0], periodo[0])
+
+        faltando = pacote_faltando(formato)
+        if faltando:
+            st.error(f"Formato indisponível: instale o pacote '{faltando}'.")
+        elif conjuntos:
+            # A exportação só roda no clique, fora da execução do script (outra thread,
+            # sem a sessão): o banco do perfil vai fixado junto
+            caminho = banco_atual()
+
+            def gerar_arquivo():
+                with fixar_banco(caminho):
+                    return arquivo_exportado(formato, conjuntos, inicio.isoformat(),
+                                             (fim + timedelta(days=1)).isoformat())
+
+            nome = nome_do_arquivo(formato, conjuntos)
+            st.download_button(f"⬇️ Exportar e baixar {nome}", gerar_arquivo, file_name=nome,
+                               on_click="ignore", use_container_width=True)
+
     conn.close()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import streamlit as st
+from dados import MESES_PT, carregar_faturas, carregar_lancamentos, intervalo_mes, situacao_cartoes
+from modules.lancamentos import popup_pagar_item, popup_pagar_lote
+from parcelas import fim_das_faturas_abertas, materializar_parcelas
+from recorrencias import materializar_recorrencias
+
+def _nome_mes(indice_mes):
+    ano, mes = divmod(int(indice_mes), 12)
+    return f"{MESES_PT[mes + 1]}/{ano}"
+
+def abrir_faturas():
+    """A fatura aberta vence no mês seguinte: parcelas e recorrências dela precisam existir."""
+    fim = fim_das_faturas_abertas()
+    materializar_recorrencias(fim)
+    materializar_parcelas(fim)
+
+def exibir_cartoes():
+    st.markdown("<h2 style='color: white;'>💳 Cartões de Crédito</h2>", unsafe_allow_html=True)
+
+    abrir_faturas()
+    cartoes = situacao_cartoes()
+    if cartoes.empty:
+        st.info("Cadastre um cartão em Configurações para acompanhar as faturas.")
+        return
+
+    # --- TOTAIS ---
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Faturas abertas", f"R$ {cartoes['fatura_aberta'].sum():,.2f}")
+    c2.metric("Próximos vencimentos", f"R$ {cartoes['proxima_fatura'].sum():,.2f}")
+    c3.metric("Limite disponível", f"R$ {cartoes['limite_disponivel'].sum():,.2f}")
+    st.divider()
+
+    # --- UM BLOCO POR CARTÃO ---
+    for _, cartao in cartoes.iterrows():
+        with st.container(border=True):
+            st.markdown(f"### 💳 {cartao['nome']}")
+            st.caption(f"Fecha dia {cartao['fechamento']} · vence dia {cartao['vencimento']}")
+            k1, k2, k3 = st.columns(3)
+            k1.metric(f"Fatura aberta ({_nome_mes(cartao['mes_aberta'])})", f"R$ {cartao['fatura_aberta']:,.2f}")
+            k2.metric(f"A pagar em {_nome_mes(cartao['mes_proxima'])}", f"R$ {cartao['proxima_fatura']:,.2f}")
+            k3.metric("Limite disponível", f"R$ {cartao['limite_disponivel']:,.2f}")
+            if cartao['limite'] > 0:
+                uso = min(max(cartao['comprometido'] / cartao['limite'], 0.0), 1.0)
+                st.progress(uso, text=f"{uso*100:.0f}% do limite comprometido (inclui parcelas futuras)")
+            if cartao['em_atraso'] > 0:
+                st.error(f"⚠️ R$ {cartao['em_atraso']:,.2f} pendentes em faturas já vencidas")
+
+            with st.expander("🧾 Faturas"):
+                faturas = carregar_faturas(cartao['nome'])
+                if faturas.empty:
+                    st.info("Nenhum lançamento neste cartão.")
+                    continue
+                faturas['aberto'] = faturas['total'] - faturas['pago']
+                faturas['fatura'] = [f"{MESES_PT[m]}/{a}" for a, m in zip(faturas['ano'], faturas['mes'])]
+                escolhida = st.selectbox("Fatura", faturas.index, format_func=lambda i: faturas.loc[i, 'fatura'],
+                                         index=int((faturas['ano'] * 12 + faturas['mes'] - 1 == cartao['mes_proxima']).argmax()),
+                                         key=f"fatura_{cartao['id']}")
+                fatura = faturas.loc[escolhida]
+                itens = carregar_lancamentos(*intervalo_mes(fatura['ano'], fatura['mes']))
+                itens = itens[itens['cartao'] == cartao['nome']]
+                st.dataframe(itens[['data', 'descricao', 'categoria', 'valor', 'status']], hide_index=True,
+                             use_container_width=True, column_config={
+                                 "data": st.column_config.DateColumn("Vencimento", format="DD/MM/YYYY"),
+                                 "descricao": "Descrição", "categoria": "Categoria",
+                                 "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"), "status": "Status",
+                             })
+                pendentes = itens[itens['status'] == 'Pendente']
+                st.caption(f"Total R$ {fatura['total']:,.2f} · pago R$ {fatura['pago']:,.2f} · em aberto R$ {fatura['aberto']:,.2f}")
+                if st.button("💸 Pagar fatura", disabled=pendentes.empty, use_container_width=True, key=f"pagar_fatura_{cartao['id']}"):
+                    if len(pendentes) == 1:
+                        row = pendentes.iloc[0]
+                        popup_pagar_item(row['id'], row['descricao'], row['valor'])
+                    else:
+                        popup_pagar_lote(pendentes)
+
+                st.markdown("**Histórico**")
+                st.dataframe(faturas[['fatura', 'total', 'pago', 'aberto', 'quantidade']], hide_index=True,
+                             use_container_width=True, column_config={
+                                 "fatura": "Vencimento",
+                                 "total": st.column_config.NumberColumn("Total", format="R$ %.2f"),
+                                 "pago": st.column_config.NumberColumn("Pago", format="R$ %.2f"),
+                                 "aberto": st.column_config.NumberColumn("Em aberto", format="R$ %.2f"),
+                                 "quantidade": "Lançamentos",
+                             })
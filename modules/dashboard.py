@@ -1,51 +1,132 @@
 import streamlit as st
 import pandas as pd
-from database import create_connection
+from dados import (MESES_PT, chave_banco, consultar, carregar_lancamentos, carregar_resumo, existe_lancamento, intervalo_mes,
+                   situacao_cartoes)
 import plotly.express as px
+import plotly.graph_objects as go
 from datetime import datetime, date
+from database import PERFIS_ATIVOS, fixar_banco
+from modules.lancamentos import exibir_previstos
+from parcelas import fim_das_faturas_abertas, materializar_parcelas
+from previsao import previsao_fluxo
+from recorrencias import materializar_recorrencias
+
+# --- GRÁFICOS EM CACHE ---
+# Montar uma figura com plotly.express custa dezenas de ms. As figuras ficam
+# guardadas já serializadas (fig.to_dict()), junto com os dados agregados,
+# por (banco, geração, ano, mês): um rerun sem escrita no banco só as exibe.
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _graficos_periodo(caminho, geracao, ano, mes):
+    with fixar_banco(caminho):
+        df_mes = carregar_lancamentos(*intervalo_mes(ano, mes))
+        df_resumo = carregar_resumo(ano)
+    graficos = {"cartao": None, "conta": None, "evolucao": None}
+
+    # Agrupa pela coluna cartao (gastos no crédito)
+    df_cartao_chart = df_mes[df_mes['cartao'].notna()]
+    if not df_cartao_chart.empty:
+        gastos_cartao = df_cartao_chart.groupby('cartao')['valor'].sum().reset_index().rename(columns={'cartao': 'Cartao'})
+        fig_cartao = px.bar(gastos_cartao, x='Cartao', y='valor', title="Gastos por Cartão",
+                             text_auto='.2s', color_discrete_sequence=['#f85149'])
+        fig_cartao.update_layout(height=300, margin=dict(t=30, b=0, l=0, r=0))
+        graficos["cartao"] = {"dados": gastos_cartao, "figura": fig_cartao.to_dict()}
+
+    # Agrupa pela coluna conta (pagamentos fora do crédito); receitas importadas também têm conta
+    df_conta_chart = df_mes[df_mes['conta'].notna() & df_mes['cartao'].isna() & (df_mes['tipo_mov'] == 'Despesa')]
+    if not df_conta_chart.empty:
+        gastos_conta = df_conta_chart.groupby('conta')['valor'].sum().reset_index().rename(columns={'conta': 'Conta'})
+        fig_conta = px.pie(gastos_conta, values='valor', names='Conta', title="Pagos por Conta",
+                           hole=0.4, color_discrete_sequence=px.colors.qualitative.Pastel)
+        fig_conta.update_layout(height=300, margin=dict(t=30, b=0, l=0, r=0))
+        graficos["conta"] = {"dados": gastos_conta, "figura": fig_conta.to_dict()}
+
+    if not df_resumo.empty:
+        df_chart = df_resumo.groupby(['mes', 'tipo_mov'])['total'].sum().reset_index()
+        df_chart = df_chart.rename(columns={'mes': 'Mes', 'total': 'valor'})
+        df_chart['Mes_Nome'] = df_chart['Mes'].map(MESES_PT)
+        fig_evolucao = px.bar(df_chart, x='Mes_Nome', y='valor', color='tipo_mov', barmode='group',
+                              color_discrete_map={'Receita': '#3fb950', 'Despesa': '#f85149'})
+        fig_evolucao.update_layout(height=300, margin=dict(t=0, b=0, l=0, r=0))
+        graficos["evolucao"] = {"dados": df_chart, "figura": fig_evolucao.to_dict()}
+    return graficos
+
+
+@st.cache_data(max_entries=4 * PERFIS_ATIVOS, show_spinner=False)
+def _grafico_alocacao(caminho, geracao):
+    with fixar_banco(caminho):
+        df_carteira = consultar("""
+            SELECT t.nome, c.valor_acumulado, t.cor 
+            FROM carteira_investimentos c 
+            JOIN tipos_investimentos t ON c.tipo_id = t.id
+        """)
+    if df_carteira.empty:
+        return None
+    fig_pie = px.pie(df_carteira, values='valor_acumulado', names='nome', hole=0.5,
+                     color_discrete_sequence=df_carteira['cor'].tolist())
+    fig_pie.update_layout(height=280, margin=dict(t=0, b=0, l=0, r=0))
+    return {"dados": df_carteira, "figura": fig_pie.to_dict()}
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _grafico_previsao(caminho, geracao, hoje, meses, saldo_inicial):
+    with fixar_banco(caminho):
+        fluxo = previsao_fluxo(meses, saldo_inicial, hoje)
+    rotulos = [f"{MESES_PT[m.month]}/{m.year % 100:02d}" for m in fluxo['mes']]
+    fig = go.Figure()
+    fig.add_bar(x=rotulos, y=fluxo['receitas'], name="Entradas", marker_color="#3fb950")
+    fig.add_bar(x=rotulos, y=-fluxo['despesas'], name="Saídas", marker_color="#f85149")
+    fig.add_scatter(x=rotulos, y=fluxo['saldo'], name="Saldo projetado", mode="lines+markers",
+                    line=dict(color="#58a6ff", width=3),
+                    marker=dict(size=9, color=["#f85149" if n else "#58a6ff" for n in fluxo['negativo']]))
+    fig.update_layout(height=320, barmode="relative", margin=dict(t=10, b=0, l=0, r=0),
+                      legend=dict(orientation="h", y=1.1))
+    return {"dados": fluxo, "figura": fig.to_dict()}
+
+
+def exibir_figura(grafico):
+    # A especificação já saiu validada do plotly; _validate=False evita refazer a validação a cada rerun
+    st.plotly_chart(go.Figure(grafico["figura"], _validate=False), use_container_width=True)
+
 
 def exibir_dashboard():
     st.markdown("<h2 style='color: white;'>🚀 Cockpit Financeiro</h2>", unsafe_allow_html=True)
     
     # --- BARRA DE FILTRO (MÊS/ANO) ---
     c_f1, c_f2 = st.columns([1, 3])
-    meses_pt = {1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun",
-                7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez"}
-    
-    mes_sel = c_f1.selectbox("Mês", options=range(1, 13), format_func=lambda x: meses_pt[x], index=datetime.now().month - 1)
+    mes_sel = c_f1.selectbox("Mês", options=range(1, 13), format_func=lambda x: MESES_PT[x], index=datetime.now().month - 1)
     ano_sel = c_f2.number_input("Ano", min_value=2024, max_value=2030, value=datetime.now().year)
 
-    conn = create_connection()
-    df_lanc = pd.read_sql_query("SELECT * FROM lancamentos", conn)
-    df_metas = pd.read_sql_query("SELECT * FROM metas", conn)
-    df_carteira = pd.read_sql_query("""
-        SELECT t.nome, c.valor_acumulado, t.cor 
-        FROM carteira_investimentos c 
-        JOIN tipos_investimentos t ON c.tipo_id = t.id
-    """, conn)
-    df_cartoes = pd.read_sql_query("SELECT * FROM cartoes_credito", conn)
-    conn.close()
-
-    if df_lanc.empty:
+    # Recorrências e parcelas são geradas até as faturas abertas dos cartões (alertas),
+    # que vencem no mês seguinte; meses além delas mostram a previsão, sem gravar nada
+    fim_gerado = fim_das_faturas_abertas()
+    materializar_recorrencias(fim_gerado)
+    materializar_parcelas(fim_gerado)
+
+    df_metas = consultar("SELECT * FROM metas")
+    df_cartoes = situacao_cartoes()
+
+    if not existe_lancamento():
         st.info("💡 O cockpit aparecerá assim que você realizar o primeiro lançamento.")
         return
 
-    # Processamento de Datas e Filtro do Mês Selecionado
-    df_lanc['data'] = pd.to_datetime(df_lanc['data'])
-    df_mes = df_lanc[(df_lanc['data'].dt.month == mes_sel) & (df_lanc['data'].dt.year == ano_sel)].copy()
+    # Totais do ano vêm do resumo_mensal; as figuras, do cache de gráficos
+    df_resumo = carregar_resumo(ano_sel)
+    graficos = _graficos_periodo(*chave_banco(), int(ano_sel), int(mes_sel))
+    res_mes = df_resumo[df_resumo['mes'] == mes_sel]
 
     # --- CÁLCULOS 50/30/20 ---
-    receita_total = df_mes[df_mes['tipo_mov'] == 'Receita']['valor'].sum()
-    essencial = df_mes[(df_mes['tipo_mov'] == 'Despesa') & (df_mes['tipo_custo'].isin(['Fixo', 'Dívida']))]['valor'].sum()
-    lazer = df_mes[(df_mes['tipo_mov'] == 'Despesa') & (df_mes['tipo_custo'] == 'Variável')]['valor'].sum()
-    investido_mes = df_mes[df_mes['tipo_custo'] == 'Investimento']['valor'].sum()
+    receita_total = res_mes[res_mes['tipo_mov'] == 'Receita']['total'].sum()
+    essencial = res_mes[(res_mes['tipo_mov'] == 'Despesa') & (res_mes['tipo_custo'].isin(['Fixo', 'Dívida']))]['total'].sum()
+    lazer = res_mes[(res_mes['tipo_mov'] == 'Despesa') & (res_mes['tipo_custo'] == 'Variável')]['total'].sum()
+    investido_mes = res_mes[res_mes['tipo_custo'] == 'Investimento']['total'].sum()
     
     despesa_total = essencial + lazer + investido_mes
     saldo_livre = receita_total - despesa_total
 
     # --- INDICADORES DE SAÚDE FINANCEIRA ---
     with st.container(border=True):
-        st.markdown(f"### 📊 Saúde Financeira ({meses_pt[mes_sel]}/{ano_sel})")
+        st.markdown(f"### 📊 Saúde Financeira ({MESES_PT[mes_sel]}/{ano_sel})")
         if receita_total > 0:
             p_ess, p_laz, p_inv = (essencial / receita_total), (lazer / receita_total), (investido_mes / receita_total)
             k1, k2, k3 = st.columns(3)
@@ -56,6 +137,9 @@ def exibir_dashboard():
         else:
             st.warning("Sem receitas registradas para este período.")
 
+    if intervalo_mes(ano_sel, mes_sel)[1] > fim_gerado:
+        exibir_previstos(ano_sel, mes_sel)
+
     st.divider()
 
     # --- NOVOS GRÁFICOS: CARTÕES E CONTAS ---
@@ -63,28 +147,14 @@ def exibir_dashboard():
     col_c1, col_c2 = st.columns(2)
 
     with col_c1:
-        # Extração do nome do Cartão da descrição: "Crédito (Nome Cartão)"
-        df_cartao_chart = df_mes[df_mes['descricao'].str.contains("💳 Crédito", na=False)].copy()
-        if not df_cartao_chart.empty:
-            df_cartao_chart['Cartao'] = df_cartao_chart['descricao'].str.extract(r'💳 Crédito \((.*?)\)')
-            gastos_cartao = df_cartao_chart.groupby('Cartao')['valor'].sum().reset_index()
-            fig_cartao = px.bar(gastos_cartao, x='Cartao', y='valor', title="Gastos por Cartão",
-                                 text_auto='.2s', color_discrete_sequence=['#f85149'])
-            fig_cartao.update_layout(height=300, margin=dict(t=30, b=0, l=0, r=0))
-            st.plotly_chart(fig_cartao, use_container_width=True)
+        if graficos["cartao"]:
+            exibir_figura(graficos["cartao"])
         else:
             st.info("Sem gastos no crédito este mês.")
 
     with col_c2:
-        # Extração do nome da Conta da descrição: "💰 Tipo (Nome Conta)"
-        df_conta_chart = df_mes[df_mes['descricao'].str.contains("💰", na=False)].copy()
-        if not df_conta_chart.empty:
-            df_conta_chart['Conta'] = df_conta_chart['descricao'].str.extract(r'💰 .*?\((.*?)\)')
-            gastos_conta = df_conta_chart.groupby('Conta')['valor'].sum().reset_index()
-            fig_conta = px.pie(gastos_conta, values='valor', names='Conta', title="Pagos por Conta",
-                               hole=0.4, color_discrete_sequence=px.colors.qualitative.Pastel)
-            fig_conta.update_layout(height=300, margin=dict(t=30, b=0, l=0, r=0))
-            st.plotly_chart(fig_conta, use_container_width=True)
+        if graficos["conta"]:
+            exibir_figura(graficos["conta"])
         else:
             st.info("Sem pagamentos via conta este mês.")
 
@@ -94,40 +164,57 @@ def exibir_dashboard():
     col_esq, col_dir = st.columns([2, 1])
     with col_esq:
         st.markdown("#### 📈 Evolução Anual")
-        df_anual = df_lanc[df_lanc['data'].dt.year == ano_sel].copy()
-        if not df_anual.empty:
-            df_anual['Mes'] = df_anual['data'].dt.month # Sort by month number
-            df_chart = df_anual.groupby(['Mes', 'tipo_mov'])['valor'].sum().reset_index()
-            df_chart['Mes_Nome'] = df_chart['Mes'].apply(lambda x: meses_pt[x])
-            fig_evolucao = px.bar(df_chart, x='Mes_Nome', y='valor', color='tipo_mov', barmode='group',
-                                  color_discrete_map={'Receita': '#3fb950', 'Despesa': '#f85149'})
-            fig_evolucao.update_layout(height=300, margin=dict(t=0, b=0, l=0, r=0))
-            st.plotly_chart(fig_evolucao, use_container_width=True)
+        if graficos["evolucao"]:
+            exibir_figura(graficos["evolucao"])
 
     with col_dir:
         st.markdown("#### 🔔 Alertas")
+        # Faturas pré-calculadas (tabela faturas): só alerta o que tem valor a pagar
         dia_hoje = date.today().day
-        if not df_cartoes.empty:
-            for _, cartao in df_cartoes.iterrows():
-                venc = cartao['vencimento']
-                if 0 <= (venc - dia_hoje) <= 5:
-                    st.warning(f"**{cartao['nome']}**: Vence em {venc - dia_hoje} dias!")
-                elif dia_hoje > venc:
-                    st.error(f"**{cartao['nome']}**: Venceu dia {venc}")
+        for _, cartao in df_cartoes.iterrows():
+            venc = cartao['vencimento']
+            if cartao['em_atraso'] > 0:
+                st.error(f"**{cartao['nome']}**: R$ {cartao['em_atraso']:,.2f} em faturas vencidas")
+            if cartao['proxima_fatura'] > 0 and 0 <= (venc - dia_hoje) <= 5:
+                st.warning(f"**{cartao['nome']}**: R$ {cartao['proxima_fatura']:,.2f} vencem em {venc - dia_hoje} dias!")
+            if cartao['limite'] > 0 and cartao['limite_disponivel'] < 0.1 * cartao['limite']:
+                st.warning(f"**{cartao['nome']}**: Limite disponível R$ {cartao['limite_disponivel']:,.2f}")
         if saldo_livre < 0:
             st.error("⚠️ Orçamento Negativo!")
 
     st.divider()
 
+    # --- FLUXO DE CAIXA PREVISTO ---
+    st.markdown("#### 🔮 Fluxo de Caixa Previsto")
+    p1, p2, _ = st.columns([1, 1, 2])
+    horizonte = p1.radio("Horizonte", [12, 24], horizontal=True, format_func=lambda m: f"{m} meses", key="prev_meses")
+    saldo_hoje = p2.number_input("Saldo disponível hoje (R$)", value=0.0, step=500.0, key="prev_saldo")
+    previsao = _grafico_previsao(*chave_banco(), date.today().isoformat(), horizonte, saldo_hoje)
+    exibir_figura(previsao)
+    fluxo = previsao["dados"]
+    negativos = fluxo[fluxo['negativo']]
+    if not negativos.empty:
+        primeiro = negativos.iloc[0]
+        st.error(f"⚠️ Saldo projetado negativo em {len(negativos)} mês(es), a partir de "
+                 f"{MESES_PT[primeiro['mes'].month]}/{primeiro['mes'].year} (R$ {primeiro['saldo']:,.2f}).")
+    with st.expander("Detalhe da previsão"):
+        st.caption("Pendentes: lançamentos em aberto · Parcelas e recorrências: ainda não lançadas · "
+                   "Estimado: média dos lançamentos avulsos dos últimos 6 meses (valores líquidos).")
+        st.dataframe(fluxo.drop(columns=['negativo']), hide_index=True, use_container_width=True, column_config={
+            "mes": st.column_config.DateColumn("Mês", format="MM/YYYY"),
+            **{c: st.column_config.NumberColumn(c.capitalize(), format="R$ %.2f")
+               for c in fluxo.columns if c not in ("mes", "negativo")},
+        })
+
+    st.divider()
+
     # --- INVESTIMENTOS E METAS ---
     c_inv, c_meta = st.columns(2)
     with c_inv:
         st.markdown("#### 🏦 Alocação de Ativos")
-        if not df_carteira.empty:
-            fig_pie = px.pie(df_carteira, values='valor_acumulado', names='nome', hole=0.5,
-                             color_discrete_sequence=df_carteira['cor'].tolist())
-            fig_pie.update_layout(height=280, margin=dict(t=0, b=0, l=0, r=0))
-            st.plotly_chart(fig_pie, use_container_width=True)
+        alocacao = _grafico_alocacao(*chave_banco())
+        if alocacao:
+            exibir_figura(alocacao)
 
     with c_meta:
         st.markdown("#### 🎯 Status das Metas")
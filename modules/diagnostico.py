@@ -0,0 +1,49 @@
+import streamlit as st
+import instrumentacao
+
+def exibir_diagnostico():
+    st.markdown("<h2 style='color: white;'>🩺 Diagnóstico</h2>", unsafe_allow_html=True)
+
+    # Vale para o processo todo (todas as sessões), até ser desligada ou o servidor reiniciar
+    ativa = st.toggle("Medir páginas e consultas", value=instrumentacao.ATIVA,
+                      help="Cronometra cada consulta SQL deste servidor. Também pode ser ligada com FINANCEIRO_INSTRUMENTACAO=1.")
+    if ativa != instrumentacao.ATIVA:
+        instrumentacao.ativar(ativa)
+    if not ativa:
+        st.info("Instrumentação desligada: ligue-a acima e navegue pelo app para colher medições.")
+        return
+
+    c1, c2 = st.columns([3, 1])
+    c1.caption(f"Medições deste processo desde o início. Consultas lentas: acima de {instrumentacao.LIMITE_LENTA_S * 1000:.0f} ms.")
+    if c2.button("🧹 Zerar medições", use_container_width=True):
+        instrumentacao.limpar()
+        st.rerun()
+
+    # --- TEMPO POR PÁGINA ---
+    st.markdown("#### ⏱️ Páginas")
+    paginas = instrumentacao.resumo_paginas()
+    if paginas.empty:
+        st.info("Nenhuma página medida ainda. Navegue pelo app e volte aqui.")
+    else:
+        st.dataframe(paginas, hide_index=True, use_container_width=True, column_config={
+            "pagina": "Página", "execucoes": "Execuções",
+            **{c: st.column_config.NumberColumn(c, format="%.3f") for c in paginas.columns if "_s" in c},
+        })
+        st.caption("sql = tempo em consultas (execute + leitura das linhas); outros = pandas, Plotly e widgets.")
+
+    # --- CONSULTAS ---
+    st.markdown("#### 🗄️ Consultas mais custosas")
+    consultas = instrumentacao.resumo_consultas()
+    if not consultas.empty:
+        st.dataframe(consultas, hide_index=True, use_container_width=True, column_config={
+            "tempo_total_s": st.column_config.NumberColumn("Total (s)", format="%.3f"),
+            "max_s": st.column_config.NumberColumn("Máx (s)", format="%.3f"),
+            "media_ms": st.column_config.NumberColumn("Média (ms)", format="%.1f"),
+        })
+
+    st.markdown("#### 🐢 Consultas lentas")
+    lentas = instrumentacao.consultas_lentas()
+    if lentas.empty:
+        st.success("Nenhuma consulta acima do limite.")
+    else:
+        st.dataframe(lentas, hide_index=True, use_container_width=True)
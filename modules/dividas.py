@@ -1,6 +1,10 @@
+import numpy as np
 import streamlit as st
 import pandas as pd
 from database import create_connection
+from dados import carregar_referencias, consultar
+from amortizacao import ESTRATEGIAS, SISTEMAS, comparar_estrategias, cronograma, simular_quitacao
+from parcelas import criar_plano, montar_parcelas, regra_de_valores, valores_parcelas
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 
@@ -10,13 +14,15 @@ def deletar_divida(id_divida, nome_divida):
     conn = create_connection()
     conn.execute("DELETE FROM dividas WHERE id = ?", (id_divida,))
     busca_desc = f"Dívida: {nome_divida}%"
-    conn.execute("DELETE FROM lancamentos WHERE descricao LIKE ? AND descricao LIKE '%Pendente%'", (busca_desc,))
+    conn.execute("DELETE FROM lancamentos WHERE descricao LIKE ? AND status = 'Pendente'", (busca_desc,))
+    # Parcelas dos meses seguintes ainda não geradas também deixam de existir
+    conn.execute("UPDATE planos_parcelamento SET ativo = 0, proxima_data = NULL WHERE divida_id = ?", (int(id_divida),))
     conn.commit()
     conn.close()
     st.toast(f"Dívida '{nome_divida}' removida!", icon="🗑️")
     st.rerun()
 
-def planejar_pagamentos(id_divida, nome, valor_original, valor_pago, responsavel):
+def planejar_pagamentos(id_divida, nome, valor_original, valor_pago, responsavel, taxa_juros=0.0):
     """Lógica corrigida: Entrada define o início e oculta campos desnecessários"""
     
     valor_restante_atual = valor_original - valor_pago
@@ -57,53 +63,110 @@ def planejar_pagamentos(id_divida, nome, valor_original, valor_pago, responsavel
         label_parc = "Qtd. de Parcelas (após entrada)" if tem_entrada else "Quantidade de Parcelas"
         qtd_parc = st.number_input(label_parc, min_value=1, value=12, step=1, key=f"n_sel_{id_divida}")
 
-    # Cálculo e Campo Editável
+    # Sistema de amortização: sem juros divide o saldo; Price/SAC usam a taxa mensal
     saldo_para_parcelar = valor_restante_atual - valor_entrada
-    sugestao_parcela = saldo_para_parcelar / qtd_parc if qtd_parc > 0 else 0
-    valor_parcela_final = st.number_input("Valor de cada Parcela (Editável)", min_value=0.0, value=float(sugestao_parcela), format="%.2f", key=f"v_edit_{id_divida}")
-    
+    sistema, taxa, extra_mensal = "Sem juros", float(taxa_juros or 0), 0.0
+    if forma == "Parcelado":
+        cs1, cs2, cs3 = st.columns(3)
+        sistema = cs1.selectbox("Sistema", ["Sem juros"] + SISTEMAS, index=1 if taxa > 0 else 0, key=f"sis_{id_divida}")
+        if sistema != "Sem juros":
+            taxa = cs2.number_input("Juros (% a.m.)", min_value=0.0, value=taxa, step=0.1, format="%.2f", key=f"tx_{id_divida}")
+            extra_mensal = cs3.number_input("Amortização extra mensal", min_value=0.0, value=0.0, format="%.2f", key=f"ext_{id_divida}")
+
+    if sistema == "Sem juros":
+        sugestao_parcela = saldo_para_parcelar / qtd_parc if qtd_parc > 0 else 0
+        valor_parcela_final = st.number_input("Valor de cada Parcela (Editável)", min_value=0.0, value=float(sugestao_parcela), format="%.2f", key=f"v_edit_{id_divida}")
+        regra = (round(valor_parcela_final, 2), 0.0, None)
+        pagamentos = valores_parcelas(regra[0], qtd_parc)
+    else:
+        tabela = cronograma(saldo_para_parcelar, taxa / 100, qtd_parc, sistema, extras=np.full(int(qtd_parc), extra_mensal))
+        # O plano guarda só a regra do cronograma; as parcelas saem dela mês a mês
+        regra = regra_de_valores(tabela["pagamento"])
+        pagamentos = valores_parcelas(regra[0], len(tabela), regra[1], regra[2])
+        k1, k2, k3 = st.columns(3)
+        k1.metric("1ª parcela", f"R$ {pagamentos[0]:,.2f}")
+        k2.metric("Juros totais", f"R$ {tabela['juros'].sum():,.2f}")
+        k3.metric("Prazo", f"{len(tabela)} meses", delta=f"-{int(qtd_parc) - len(tabela)}" if len(tabela) < qtd_parc else None)
+        with st.expander("📋 Cronograma"):
+            st.dataframe(tabela, hide_index=True, use_container_width=True,
+                         column_config={c: st.column_config.NumberColumn(format="R$ %.2f") for c in tabela.columns if c != "mes"})
+
     # Recálculo do Total Final para atualização do banco
-    novo_total_db = valor_pago + valor_entrada + (qtd_parc * valor_parcela_final)
+    novo_total_db = valor_pago + valor_entrada + pagamentos.sum()
 
     if st.button("🚀 Confirmar e Gerar Lançamentos", use_container_width=True, key=f"btn_sel_{id_divida}"):
-        conn = create_connection()
-        
+        comuns = dict(categoria="Dívidas", tipo_mov="Despesa", tipo_custo="Dívida", responsavel=responsavel)
+        ajustes = []
+
         # 1. Lançar Entrada (se existir)
+        entrada = None
         if tem_entrada and valor_entrada > 0:
             status_ent = "Paga" if data_entrada <= date.today() else "Pendente"
-            desc_ent = f"Dívida: {nome} (Entrada) | 👤 {responsavel} | {status_ent}"
-            conn.execute("""
-                INSERT INTO lancamentos (data, descricao, categoria, valor, tipo_mov, tipo_custo) 
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (str(data_entrada), desc_ent, "Dívidas", valor_entrada, "Despesa", "Dívida"))
-            
+            entrada = montar_parcelas(f"Dívida: {nome} (Entrada)", data_entrada, 1, valor_entrada,
+                                      f" | 👤 {responsavel}", status_ent, **comuns)
             if status_ent == "Paga":
-                conn.execute("UPDATE dividas SET valor_pago = valor_pago + ? WHERE id = ?", (valor_entrada, id_divida))
+                ajustes.append(("UPDATE dividas SET valor_pago = valor_pago + ? WHERE id = ?", (valor_entrada, id_divida)))
 
-        # 2. Lançar Parcelas (Mês sequente à entrada ou data manual)
-        for i in range(int(qtd_parc)):
-            dt_p = data_primeira_parcela + relativedelta(months=i)
-            sufixo = f" ({i+1}/{int(qtd_parc)})"
-            desc_parc = f"Dívida: {nome}{sufixo} | 👤 {responsavel} | Pendente"
-            
-            conn.execute("""
-                INSERT INTO lancamentos (data, descricao, categoria, valor, tipo_mov, tipo_custo) 
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (str(dt_p), desc_parc, "Dívidas", valor_parcela_final, "Despesa", "Dívida"))
-        
-        # 3. Atualizar o Valor Total da Dívida e o Plano
-        total_fatias = qtd_parc + (1 if tem_entrada else 0)
-        conn.execute("""
+        # 2. Atualizar o Valor Total da Dívida e o Plano
+        total_fatias = len(pagamentos) + (1 if tem_entrada else 0)
+        ajustes.append(("""
             UPDATE dividas 
-            SET valor_total = ?, forma_pagto = ?, total_parcelas = ?, vencimento = ? 
+            SET valor_total = ?, forma_pagto = ?, total_parcelas = ?, vencimento = ?, taxa_juros = ?
             WHERE id = ?
-        """, (novo_total_db, forma, int(total_fatias), str(data_entrada if tem_entrada else data_primeira_parcela), id_divida))
-        
-        conn.commit()
-        conn.close()
+        """, (novo_total_db, forma, int(total_fatias), str(data_entrada if tem_entrada else data_primeira_parcela),
+              taxa if sistema != "Sem juros" else taxa_juros, id_divida)))
+
+        # 3. Parcelas (mês sequente à entrada ou data manual); entrada, parcelas e plano entram juntos.
+        # Price, SAC e amortizações extras também viram plano: as parcelas são geradas mês a mês pela regra
+        criar_plano(f"Dívida: {nome}", data_primeira_parcela, len(pagamentos), regra[0], f" | 👤 {responsavel}",
+                    avulsas=entrada, ajustes=ajustes, divida_id=int(id_divida), variacao=regra[1],
+                    valor_ultima=regra[2], **comuns)
         st.toast(f"Plano de {total_fatias}x confirmado!", icon="✅")
         st.rerun()
 
+def exibir_estrategias(df_div):
+    """Bola de neve x avalanche sobre todas as dívidas ativas, para vários valores de pagamento extra."""
+    planejada = (df_div['total_parcelas'].fillna(1) > 1) & df_div['forma_pagto'].notna()
+    minimo_plano = (df_div['valor_total'] / df_div['total_parcelas'].fillna(1).clip(lower=1)).where(planejada, 0)
+    dividas = pd.DataFrame({
+        "nome": df_div['nome'],
+        "saldo": (df_div['valor_total'] - df_div['valor_pago']).clip(lower=0),
+        "taxa": df_div['taxa_juros'].fillna(0) / 100,
+        "minimo": df_div['parcela_minima'].fillna(0).where(df_div['parcela_minima'].fillna(0) > 0, minimo_plano),
+    })
+    dividas = dividas[dividas['saldo'] > 0].reset_index(drop=True)
+    if dividas.empty:
+        st.info("Nenhum saldo devedor para simular.")
+        return
+
+    c1, c2 = st.columns(2)
+    extra = c1.number_input("Pagamento extra por mês (R$)", min_value=0.0, value=500.0, step=100.0, key="sim_extra")
+    extra_max = c2.number_input("Comparar extras até (R$)", min_value=100.0, value=max(2000.0, extra * 2), step=500.0, key="sim_extra_max")
+    sem_minimo = dividas.loc[dividas['minimo'] <= 0, 'nome'].tolist()
+    if sem_minimo:
+        st.caption(f"Sem parcela mínima (só recebem o extra): {', '.join(sem_minimo)}")
+
+    # Cenário escolhido: meses, juros e mês de quitação de cada dívida
+    cols = st.columns(len(ESTRATEGIAS))
+    for col, (estrategia, regra) in zip(cols, ESTRATEGIAS.items()):
+        r = simular_quitacao(dividas['saldo'], dividas['taxa'], dividas['minimo'], [extra], estrategia)
+        with col.container(border=True):
+            st.markdown(f"**{estrategia}** · {regra}")
+            if np.isnan(r['meses'][0]):
+                st.error("Não quita em 50 anos: os pagamentos não cobrem os juros.")
+                continue
+            st.metric("Livre de dívidas em", f"{int(r['meses'][0])} meses")
+            st.metric("Juros pagos", f"R$ {r['juros'][0]:,.2f}")
+            st.caption(" → ".join(f"{n} ({int(m)}m)" for n, m in sorted(zip(dividas['nome'], r['quitacao'][0]), key=lambda x: x[1])))
+
+    # Centenas de cenários de uma vez (a simulação é vetorizada por cenário)
+    comparacao = comparar_estrategias(dividas, np.linspace(0, extra_max, 201))
+    g1, g2 = st.columns(2)
+    g1.markdown("**Meses até quitar tudo**")
+    g1.line_chart(comparacao.pivot(index="extra", columns="estrategia", values="meses"))
+    g2.markdown("**Juros totais (R$)**")
+    g2.line_chart(comparacao.pivot(index="extra", columns="estrategia", values="juros"))
+
 def exibir_dividas():
     st.markdown("<h2 style='color: white;'>📉 Gestão Estratégica de Dívidas</h2>", unsafe_allow_html=True)
     
@@ -113,21 +176,20 @@ def exibir_dividas():
             c1, c2 = st.columns(2)
             nome = c1.text_input("Credor / Nome da Dívida")
             valor_total = c2.number_input("Valor Original da Dívida", min_value=0.0)
+            c3, c4 = st.columns(2)
+            taxa_juros = c3.number_input("Juros (% ao mês)", min_value=0.0, step=0.1, format="%.2f")
+            parcela_minima = c4.number_input("Pagamento mínimo mensal", min_value=0.0, format="%.2f")
             
-            conn = create_connection()
-            df_resp = pd.read_sql_query("SELECT nome FROM responsaveis ORDER BY nome ASC", conn)
-            conn.close()
-            
-            resps = df_resp['nome'].tolist() if not df_resp.empty else ["Geral"]
+            resps = carregar_referencias()['responsaveis'] or ["Geral"]
             responsavel = st.selectbox("Responsável pela Dívida", resps)
             
             if st.form_submit_button("Registrar Dívida"):
                 if nome and valor_total > 0:
                     conn = create_connection()
                     conn.execute("""
-                        INSERT INTO dividas (nome, valor_total, valor_pago, responsavel, status) 
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (nome, valor_total, 0, responsavel, 'Ativa'))
+                        INSERT INTO dividas (nome, valor_total, valor_pago, responsavel, status, taxa_juros, parcela_minima) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (nome, valor_total, 0, responsavel, 'Ativa', taxa_juros, parcela_minima))
                     conn.commit()
                     conn.close()
                     st.rerun()
@@ -135,9 +197,7 @@ def exibir_dividas():
     st.divider()
 
     # --- LISTAGEM ---
-    conn = create_connection()
-    df_div = pd.read_sql_query("SELECT * FROM dividas WHERE status = 'Ativa'", conn)
-    conn.close()
+    df_div = consultar("SELECT * FROM dividas WHERE status = 'Ativa'")
 
     if not df_div.empty:
         for _, row in df_div.iterrows():
@@ -149,6 +209,8 @@ def exibir_dividas():
                 with col1:
                     st.markdown(f"### {row['nome']}")
                     st.markdown(f"👤 **Responsável:** {row['responsavel']}")
+                    if row['taxa_juros']:
+                        st.caption(f"Juros: {row['taxa_juros']:.2f}% a.m.")
                     if row['forma_pagto']:
                         st.success(f"✅ {row['forma_pagto']} ({row['total_parcelas']} fatias)")
                     else:
@@ -164,9 +226,14 @@ def exibir_dividas():
 
                 if st.session_state.get(f"show_plan_{row['id']}", False):
                     st.markdown("---")
-                    planejar_pagamentos(row['id'], row['nome'], row['valor_total'], row['valor_pago'], row['responsavel'])
+                    planejar_pagamentos(row['id'], row['nome'], row['valor_total'], row['valor_pago'], row['responsavel'],
+                                        row['taxa_juros'] or 0.0)
                     if st.button("Fechar Planejador", key=f"close_{row['id']}", use_container_width=True):
                         st.session_state[f"show_plan_{row['id']}"] = False
                         st.rerun()
+
+        # --- ESTRATÉGIAS DE QUITAÇÃO ---
+        with st.expander("🧮 Estratégias de quitação (bola de neve x avalanche)"):
+            exibir_estrategias(df_div)
     else:
         st.info("Nenhuma dívida ativa encontrada.")
\ No newline at end of file
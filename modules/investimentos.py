@@ -1,7 +1,10 @@
 import streamlit as st
 import pandas as pd
 from database import create_connection
-from datetime import datetime
+from carteira import PASTA_COTACOES, carteira
+from dados import carregar_lancamentos, intervalo_mes
+from rentabilidade import CARTEIRA, desempenho_carteira
+from datetime import date, datetime, timedelta
 
 def deletar_investimento(id_item):
     """Remove o lançamento e ajusta o saldo na carteira"""
@@ -40,32 +43,33 @@ def exibir_investimentos():
         mes_sel = f1.selectbox("Mês", ["01","02","03","04","05","06","07","08","09","10","11","12"], index=datetime.now().month-1, key="mes_inv")
         ano_sel = f2.selectbox("Ano", [2025, 2026], index=1, key="ano_inv")
 
-    conn = create_connection()
-    # Busca apenas lançamentos do tipo Investimento
-    df = pd.read_sql_query("SELECT * FROM lancamentos WHERE tipo_custo = 'Investimento'", conn)
-    
-    # Busca saldo consolidado da carteira
-    res_carteira = pd.read_sql_query("SELECT SUM(valor_acumulado) as total FROM carteira_investimentos", conn)
-    total_patrimonio = res_carteira['total'].iloc[0] if res_carteira['total'].iloc[0] is not None else 0.0
-    conn.close()
+    # Busca apenas os aportes do mês (índice em tipo_custo, data)
+    df_f = carregar_lancamentos(*intervalo_mes(ano_sel, mes_sel), tipo_custo='Investimento')
 
-    # Padronização e Filtro
-    if not df.empty:
-        df['data'] = pd.to_datetime(df['data'])
-        df['valor'] = pd.to_numeric(df['valor'], errors='coerce').fillna(0.0)
-        df_f = df[(df['data'].dt.month == int(mes_sel)) & (df['data'].dt.year == int(ano_sel))].copy()
-        aporte_mes = df_f['valor'].sum()
-    else:
-        df_f = pd.DataFrame()
-        aporte_mes = 0.0
+    # Valor de mercado da carteira (posições x cotações, em cache)
+    diario, por_ativo = carteira()
+    total_patrimonio = diario['valor_mercado'].iloc[-1] if not diario.empty else 0.0
+    total_investido = diario['investido'].iloc[-1] if not diario.empty else 0.0
+    resultado = total_patrimonio - total_investido
+
+    # Padronização
+    df_f['valor'] = pd.to_numeric(df_f['valor'], errors='coerce').fillna(0.0)
+    aporte_mes = df_f['valor'].sum()
 
     # --- CARDS DE RESUMO ---
-    c1, c2, c3 = st.columns(3)
+    c1, c4, c2, c3 = st.columns(4)
     
     with c1:
         with st.container(border=True):
-            st.markdown("<p style='color:#8b949e; margin:0; font-size:14px;'>Patrimônio Acumulado</p>", unsafe_allow_html=True)
+            st.markdown("<p style='color:#8b949e; margin:0; font-size:14px;'>Patrimônio a Mercado</p>", unsafe_allow_html=True)
             st.markdown(f"<h3 style='color:#58a6ff; margin:0;'>R$ {total_patrimonio:,.2f}</h3>", unsafe_allow_html=True)
+
+    with c4:
+        with st.container(border=True):
+            cor = "#3fb950" if resultado >= 0 else "#f85149"
+            perc_resultado = (resultado / total_investido * 100) if total_investido > 0 else 0
+            st.markdown("<p style='color:#8b949e; margin:0; font-size:14px;'>Resultado sobre Aportes</p>", unsafe_allow_html=True)
+            st.markdown(f"<h3 style='color:{cor}; margin:0;'>R$ {resultado:,.2f} ({perc_resultado:+.1f}%)</h3>", unsafe_allow_html=True)
     
     with c2:
         with st.container(border=True):
@@ -78,6 +82,57 @@ def exibir_investimentos():
             st.markdown("<p style='color:#8b949e; margin:0; font-size:14px;'>Representatividade</p>", unsafe_allow_html=True)
             st.markdown(f"<h3 style='color:#bc8cff; margin:0;'>{perc_crescimento:.1f}%</h3>", unsafe_allow_html=True)
 
+    # --- EVOLUÇÃO E POSIÇÕES ---
+    if not diario.empty:
+        st.markdown("#### 📊 Evolução da Carteira")
+        st.line_chart(diario.rename(columns={"valor_mercado": "Valor de mercado", "investido": "Investido"}))
+        st.dataframe(por_ativo.drop(columns=["tipo_id"]), hide_index=True, use_container_width=True, column_config={
+            "nome": "Ativo", "ativo": "Código",
+            "cotas": st.column_config.NumberColumn("Cotas", format="%.4f"),
+            "investido": st.column_config.NumberColumn("Investido", format="R$ %.2f"),
+            "preco": st.column_config.NumberColumn("Última cotação", format="R$ %.2f"),
+            "data_cotacao": st.column_config.DateColumn("Cotado em", format="DD/MM/YYYY"),
+            "valor_atual": st.column_config.NumberColumn("Valor atual", format="R$ %.2f"),
+            "resultado": st.column_config.NumberColumn("Resultado", format="R$ %.2f"),
+        })
+        sem_cotacao = por_ativo.loc[por_ativo['preco'].isna(), 'ativo'].tolist()
+        if sem_cotacao:
+            st.caption(f"Sem cotação em {PASTA_COTACOES}/ (avaliados pelo valor aportado): {', '.join(sem_cotacao)}")
+
+        # --- RENTABILIDADE ---
+        st.markdown("#### 📐 Rentabilidade")
+        hoje = date.today()
+        janelas = {"No ano": date(hoje.year, 1, 1), "12 meses": hoje - timedelta(days=365), "Desde o início": None}
+        j1, j2, j3 = st.columns([2, 1, 1])
+        janela = j1.radio("Período", list(janelas) + ["Personalizado"], horizontal=True, key="janela_rent")
+        if janela == "Personalizado":
+            inicio = j2.date_input("De", hoje - timedelta(days=90), key="rent_de")
+            fim = j3.date_input("Até", hoje, key="rent_ate")
+        else:
+            inicio, fim = janelas[janela], hoje
+
+        # Matriz diária em cache por geração; trocar o período só refaz as contas
+        perf = desempenho_carteira(inicio, fim)
+        total = perf[perf['ativo'] == CARTEIRA]
+        if not total.empty:
+            total = total.iloc[0]
+            m1, m2, m3 = st.columns(3)
+            m1.metric("TIR dos aportes (a.a.)", f"{total['xirr']:.2%}" if pd.notna(total['xirr']) else "—",
+                      help="Retorno ponderado pelo dinheiro (XIRR): considera quando e quanto foi aportado")
+            m2.metric("Retorno no período (TWR)", f"{total['twr']:.2%}" if pd.notna(total['twr']) else "—",
+                      help="Retorno ponderado pelo tempo: o desempenho dos ativos, sem o efeito dos aportes")
+            m3.metric("Ganho no período", f"R$ {total['ganho']:,.2f}")
+            ativos = perf[perf['ativo'] != CARTEIRA].copy()
+            ativos[['xirr', 'twr', 'twr_anual']] *= 100
+            st.dataframe(ativos, hide_index=True, use_container_width=True, column_config={
+                "ativo": "Código",
+                **{c: st.column_config.NumberColumn(c.replace("_", " ").capitalize(), format="R$ %.2f")
+                   for c in ["valor_inicial", "aportes", "valor_final", "ganho"]},
+                "xirr": st.column_config.NumberColumn("XIRR a.a.", format="%.2f%%"),
+                "twr": st.column_config.NumberColumn("TWR", format="%.2f%%"),
+                "twr_anual": st.column_config.NumberColumn("TWR a.a.", format="%.2f%%"),
+            })
+
     st.divider()
 
     # --- LISTAGEM ESTILO LANÇAMENTOS ---
@@ -1,9 +1,16 @@
+import re
+
 import streamlit as st
 import pandas as pd
 from database import create_connection
+from importador import importar_extrato
+from dados import (buscar_lancamentos, carregar_lancamentos, carregar_referencias, carregar_resumo, contar_lancamentos,
+                   intervalo_mes, pagina_lancamentos, parcelas_restantes)
 from datetime import datetime, date
-from dateutil.relativedelta import relativedelta
-import re
+from parcelas import (alterar_plano, cancelar_plano, criar_plano, data_vencimento_fatura, fim_das_faturas_abertas,
+                      gravar_lancamentos, materializar_parcelas, montar_parcelas)
+from previsao import lancamentos_previstos
+from recorrencias import materializar_recorrencias
 
 # --- FUNÇÕES DE AÇÃO ---
 
@@ -14,39 +21,50 @@ def deletar_item(id_item):
     conn.close()
     st.rerun()
 
+def deletar_itens(ids):
+    """Exclui vários lançamentos numa única transação (seleção da grade)."""
+    conn = create_connection()
+    with conn:
+        conn.executemany("DELETE FROM lancamentos WHERE id = ?", [(int(i),) for i in ids])
+    conn.close()
+    st.rerun()
+
+def _registrar_pagamento(conn, id_item, descricao, valor, data_pagto):
+    nova_desc = descricao.replace("Pendente", "Paga")
+    # Itens no cartão e de recorrências mantêm a data (fatura / ocorrência da regra)
+    conn.execute("""
+        UPDATE lancamentos SET descricao = ?, status = 'Paga', data_pagamento = ?,
+            data = CASE WHEN cartao IS NULL AND recorrencia_id IS NULL THEN ? ELSE data END
+        WHERE id = ?
+    """, (nova_desc, str(data_pagto), str(data_pagto), int(id_item)))
+    
+    if "Dívida:" in descricao:
+        try:
+            nome_divida = descricao.split("|")[0].replace("Dívida:", "").split("(")[0].strip()
+            conn.execute("UPDATE dividas SET valor_pago = valor_pago + ? WHERE nome = ?", (valor, nome_divida))
+        except: pass
+
 @st.dialog("Editar Lançamento", width="medium")
 def popup_editar_item(row):
     st.markdown(f"### ✏️ Editar Registro")
     
-    conn = create_connection()
-    df_resp = pd.read_sql_query("SELECT nome FROM responsaveis ORDER BY nome ASC", conn)
-    try:
-        df_contas = pd.read_sql_query("SELECT nome FROM contas ORDER BY nome ASC", conn)
-        contas = df_contas['nome'].tolist() if not df_contas.empty else ["Conta Principal"]
-    except: contas = ["Conta Principal"]
-    
-    # Extrair valores atuais da descrição via Regex para preencher o formulário
+    refs = carregar_referencias()
+    resps = refs['responsaveis'] or ["Geral"]
+
+    # Valores atuais vêm das colunas de metadados; a descrição só fornece o texto base
     desc_limpa = row['descricao'].split(" | ")[0]
-    resp_atual = re.search(r"👤 (.*?)(?: \||$)", row['descricao'])
-    resp_atual = resp_atual.group(1) if resp_atual else "Geral"
-    
-    forma_atual = "Pix"
-    for f in ["Pix", "Boleto", "Dinheiro", "Débito", "Crédito"]:
-        if f in row['descricao']:
-            forma_atual = f
-            break
-            
-    # Busca categorias baseadas no tipo de movimento original
-    tabela_cat = "categorias_receitas" if row['tipo_mov'] == "Receita" else "categorias_despesas"
-    categorias = pd.read_sql_query(f"SELECT nome FROM {tabela_cat} ORDER BY nome ASC", conn)['nome'].tolist()
-    conn.close()
+    resp_atual = row['responsavel'] if pd.notna(row['responsavel']) else "Geral"
+    formas = ["Pix", "Boleto", "Dinheiro", "Débito", "Crédito"]
+    forma_atual = row['forma_pagto'] if row['forma_pagto'] in formas else "Pix"
+
+    # Categorias baseadas no tipo de movimento original
+    categorias = refs['categorias_receitas'] if row['tipo_mov'] == "Receita" else list(refs['categorias_despesas'])
 
     c1, c2 = st.columns(2)
     with c1:
         nova_data = st.date_input("Data", pd.to_datetime(row['data']))
         novo_valor = st.number_input("Valor R$", min_value=0.0, value=float(row['valor']), format="%.2f")
-        novo_resp = st.selectbox("Responsável", df_resp['nome'].tolist() if not df_resp.empty else ["Geral"], 
-                                 index=df_resp['nome'].tolist().index(resp_atual) if resp_atual in df_resp['nome'].tolist() else 0)
+        novo_resp = st.selectbox("Responsável", resps, index=resps.index(resp_atual) if resp_atual in resps else 0)
     
     with c2:
         nova_desc_base = st.text_input("Descrição", desc_limpa)
@@ -56,23 +74,45 @@ def popup_editar_item(row):
     st.divider()
     cd1, cd2 = st.columns(2)
     with cd1:
-        nova_forma = st.selectbox("Forma de Pagamento", ["Pix", "Boleto", "Dinheiro", "Débito", "Crédito"], 
-                                  index=["Pix", "Boleto", "Dinheiro", "Débito", "Crédito"].index(forma_atual))
+        nova_forma = st.selectbox("Forma de Pagamento", formas, index=formas.index(forma_atual))
     with cd2:
-        novo_status = st.selectbox("Status", ["Paga", "Pendente"], index=0 if "Paga" in row['descricao'] else 1)
+        novo_status = st.selectbox("Status", ["Paga", "Pendente"], index=0 if row['status'] != "Pendente" else 1)
 
-    if st.button("Salvar Alterações", use_container_width=True):
-        # Reconstrói os metadados
-        icon = "💰" if nova_forma != "Crédito" else "💳"
-        metadados = f" | 👤 {novo_resp} | {icon} {nova_forma} | {novo_status}"
+    plano_id = row.get('plano_id')
+    plano_id = int(plano_id) if pd.notna(plano_id) else None
+    em_todas = plano_id is not None and st.checkbox(
+        f"Aplicar descrição, categoria e valor a todas as parcelas pendentes ({row['parcela_total']}x)", key=f"plano_todas_{row['id']}")
+
+    if plano_id is not None and st.button("❌ Cancelar parcelamento", use_container_width=True):
+        cancelar_plano(plano_id)
+        st.toast("Parcelamento cancelado: parcelas pendentes removidas.", icon="❌")
+        st.rerun()
+
+    if em_todas and st.button("Salvar em todas as parcelas", use_container_width=True):
+        tipo_custo = "Receita" if row['tipo_mov'] == "Receita" else refs['categorias_despesas'].get(nova_cat, row['tipo_custo'])
+        alterar_plano(plano_id, re.sub(r" \(\d+/\d+\)$", "", nova_desc_base), nova_cat, tipo_custo, novo_valor)
+        st.toast("Parcelas atualizadas!", icon="📝")
+        st.rerun()
+
+    if not em_todas and st.button("Salvar Alterações", use_container_width=True):
+        # Reconstrói os metadados preservando cartão/conta já vinculados
+        cartao = row['cartao'] if nova_forma == "Crédito" and pd.notna(row['cartao']) else None
+        conta = row['conta'] if nova_forma != "Crédito" and pd.notna(row['conta']) else None
+        if nova_forma == "Crédito":
+            meio = f"💳 Crédito ({cartao})" if cartao else "💳 Crédito"
+        else:
+            meio = f"💰 {nova_forma} ({conta})" if conta else f"💰 {nova_forma}"
+        metadados = f" | 👤 {novo_resp} | {meio} | {novo_status}"
         desc_final = f"{nova_desc_base}{metadados}"
         
         conn = create_connection()
         conn.execute("""
             UPDATE lancamentos 
-            SET data = ?, descricao = ?, valor = ?, categoria = ? 
+            SET data = ?, descricao = ?, valor = ?, categoria = ?,
+                responsavel = ?, forma_pagto = ?, conta = ?, cartao = ?, status = ?
             WHERE id = ?
-        """, (str(nova_data), desc_final, novo_valor, nova_cat, row['id']))
+        """, (str(nova_data), desc_final, novo_valor, nova_cat,
+              novo_resp, nova_forma, conta, cartao, novo_status, row['id']))
         conn.commit()
         conn.close()
         st.toast("Alterado com sucesso!", icon="📝")
@@ -86,48 +126,45 @@ def popup_pagar_item(id_item, descricao, valor):
     
     if st.button("Confirmar e Atualizar", use_container_width=True):
         conn = create_connection()
-        nova_desc = descricao.replace("Pendente", "Paga")
-        conn.execute("UPDATE lancamentos SET descricao = ?, data = ? WHERE id = ?", (nova_desc, str(data_pagto), id_item))
-        
-        if "Dívida:" in descricao:
-            try:
-                nome_divida = descricao.split("|")[0].replace("Dívida:", "").split("(")[0].strip()
-                conn.execute("UPDATE dividas SET valor_pago = valor_pago + ? WHERE nome = ?", (valor, nome_divida))
-            except: pass
-        
+        _registrar_pagamento(conn, id_item, descricao, valor, data_pagto)
         conn.commit()
         conn.close()
         st.toast("Pagamento registrado!", icon="✅")
         st.rerun()
 
+@st.dialog("Confirmar Pagamentos")
+def popup_pagar_lote(itens):
+    st.markdown(f"### 💸 Quitar {len(itens)} lançamentos")
+    st.info(f"Total: **R$ {itens['valor'].sum():,.2f}**")
+    data_pagto = st.date_input("Data do Pagamento", date.today())
+
+    if st.button("Confirmar e Atualizar", use_container_width=True):
+        conn = create_connection()
+        with conn:
+            for _, row in itens.iterrows():
+                _registrar_pagamento(conn, row['id'], row['descricao'], row['valor'], data_pagto)
+        conn.close()
+        st.toast(f"{len(itens)} pagamentos registrados!", icon="✅")
+        st.rerun()
+
 @st.dialog("Novo Lançamento", width="medium")
 def popup_novo_lancamento():
     st.markdown("### 📝 Registrar Movimentação")
     tipo_mov = st.radio("", ["Despesa", "Receita", "Meta", "Investimento"], horizontal=True)
     
-    conn = create_connection()
-    df_metas = pd.read_sql_query("SELECT id, nome, icone FROM metas", conn)
-    df_invest_tipos = pd.read_sql_query("SELECT id, nome FROM tipos_investimentos", conn)
-    df_cartoes = pd.read_sql_query("SELECT nome, fechamento, vencimento FROM cartoes_credito", conn)
-    df_resp = pd.read_sql_query("SELECT nome FROM responsaveis ORDER BY nome ASC", conn)
-    
-    try:
-        df_contas = pd.read_sql_query("SELECT nome FROM contas ORDER BY nome ASC", conn)
-        contas = df_contas['nome'].tolist() if not df_contas.empty else ["Conta Principal"]
-    except: contas = ["Conta Principal"]
-    
-    categorias = []
-    try:
-        tabela_cat = "categorias_receitas" if tipo_mov == "Receita" else "categorias_despesas"
-        categorias = pd.read_sql_query(f"SELECT nome FROM {tabela_cat} ORDER BY nome ASC", conn)['nome'].tolist()
-    except: categorias = ["Geral"]
-    conn.close()
+    # Cadastros vêm do serviço de referências (em memória, sem consultas a cada tecla)
+    refs = carregar_referencias()
+    df_metas = refs['metas']
+    df_invest_tipos = refs['tipos_investimentos']
+    df_cartoes = refs['cartoes']
+    contas = refs['contas'] or ["Conta Principal"]
+    categorias = (refs['categorias_receitas'] if tipo_mov == "Receita" else list(refs['categorias_despesas'])) or ["Geral"]
 
     c1, c2 = st.columns(2)
     with c1:
         data_f = st.date_input("Data da Compra", date.today())
         valor_f = st.number_input("Valor Total R$", min_value=0.0, format="%.2f")
-        resps = df_resp['nome'].tolist() if not df_resp.empty else ["Geral"]
+        resps = refs['responsaveis'] or ["Geral"]
         responsavel_sel = st.selectbox("Responsável", resps)
     
     with c2:
@@ -141,6 +178,9 @@ def popup_novo_lancamento():
                 return
             sel_nome = st.selectbox(f"Selecione {tipo_mov}", list(opcoes.keys()))
             id_vinc = opcoes[sel_nome]
+            if tipo_mov == "Investimento":
+                cotas_f = st.number_input("Quantidade (cotas)", min_value=0.0, format="%.6f",
+                                          help="Deixe 0 para ativos sem cotação (renda fixa, poupança)")
             descricao = f"{tipo_mov}: {sel_nome}"
             cat_sel = tipo_mov
         else:
@@ -149,6 +189,7 @@ def popup_novo_lancamento():
 
     metadados = f" | 👤 {responsavel_sel}"
     qtd_parcelas, status, data_referencia = 1, "Paga", data_f
+    forma_pagto, conta_sel, cartao_sel = None, None, None
 
     if tipo_mov == "Despesa":
         st.divider()
@@ -165,9 +206,9 @@ def popup_novo_lancamento():
                 cartao_sel = st.selectbox("Cartão", df_cartoes['nome'].tolist())
                 regra = df_cartoes[df_cartoes['nome'] == cartao_sel].iloc[0]
                 
-                venc_base = date(data_f.year, data_f.month, int(regra['vencimento']))
-                data_referencia = venc_base + relativedelta(months=1) if data_f.day >= int(regra['fechamento']) else venc_base
+                data_referencia = data_vencimento_fatura(data_f, regra['fechamento'], regra['vencimento'])
                 metadados += f" | 💳 Crédito ({cartao_sel})"
+                conta_sel = None
                 
                 if st.checkbox("Parcelado?"):
                     qtd_parcelas = st.number_input("Nº Parcelas", min_value=2, value=2)
@@ -187,33 +228,176 @@ def popup_novo_lancamento():
             st.error("Preencha a descrição!")
             return
         
-        conn = create_connection()
         tipo_custo = tipo_mov
         if tipo_mov == "Despesa":
-            res = conn.execute("SELECT tipo FROM categorias_despesas WHERE nome = ?", (cat_sel,)).fetchone()
-            tipo_custo = res[0] if res else "Variável"
-        
-        valor_parc = valor_f / qtd_parcelas
-        for i in range(qtd_parcelas):
-            dt_p = data_referencia + relativedelta(months=i)
-            suf = f" ({i+1}/{qtd_parcelas})" if qtd_parcelas > 1 else ""
-            desc_final = f"{descricao}{suf}{metadados} | {status}"
-            
-            conn.execute("""
-                INSERT INTO lancamentos (data, descricao, categoria, valor, tipo_mov, tipo_custo) 
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (str(dt_p), desc_final, cat_sel, valor_parc, "Receita" if tipo_mov == "Receita" else "Despesa", tipo_custo))
+            tipo_custo = refs['categorias_despesas'].get(cat_sel) or "Variável"
         
-        if tipo_mov == "Meta": conn.execute("UPDATE metas SET valor_atual = valor_atual + ? WHERE id = ?", (valor_f, id_vinc))
-        elif tipo_mov == "Investimento": conn.execute("UPDATE carteira_investimentos SET valor_acumulado = valor_acumulado + ? WHERE tipo_id = ?", (valor_f, id_vinc))
-        
-        conn.commit()
-        conn.close()
+        colunas = dict(categoria=cat_sel, tipo_mov="Receita" if tipo_mov == "Receita" else "Despesa",
+                       tipo_custo=tipo_custo, responsavel=responsavel_sel, forma_pagto=forma_pagto,
+                       conta=conta_sel, cartao=cartao_sel)
+        ajustes = []
+        if tipo_mov == "Meta":
+            ajustes.append(("UPDATE metas SET valor_atual = valor_atual + ? WHERE id = ?", (valor_f, id_vinc)))
+            colunas["meta_id"] = id_vinc
+        elif tipo_mov == "Investimento":
+            ajustes.append(("UPDATE carteira_investimentos SET valor_acumulado = valor_acumulado + ? WHERE tipo_id = ?", (valor_f, id_vinc)))
+            # Posição na carteira ligada ao lançamento recém-inserido (mesma transação)
+            ajustes.append(("INSERT INTO posicoes_investimentos (tipo_id, data, quantidade, valor, lancamento_id) "
+                            "VALUES (?, ?, ?, ?, last_insert_rowid())", (id_vinc, data_f.isoformat(), cotas_f, valor_f)))
+        if qtd_parcelas > 1:
+            # Compra gravada uma vez; as parcelas entram em lancamentos mês a mês
+            criar_plano(descricao, data_referencia, qtd_parcelas, valor_f / qtd_parcelas, metadados, status,
+                        ajustes=ajustes, **colunas)
+        else:
+            gravar_lancamentos(montar_parcelas(descricao, data_referencia, 1, valor_f, metadados, status, **colunas), ajustes)
+
         st.toast("✅ Lançamento realizado!")
         st.rerun()
 
+@st.dialog("Importar Extrato", width="medium")
+def popup_importar_extrato():
+    st.markdown("### 📥 Importar CSV / OFX")
+    refs = carregar_referencias()
+    origem = st.radio("Origem", ["Conta", "Cartão"], horizontal=True)
+    if origem == "Conta":
+        destino = st.selectbox("Conta", refs['contas'])
+    else:
+        destino = st.selectbox("Cartão", refs['cartoes']['nome'].tolist())
+    responsavel = st.selectbox("Responsável", [None] + refs['responsaveis'], format_func=lambda r: r or "—")
+    arquivo = st.file_uploader("Arquivo do banco", type=["csv", "ofx", "qfx"])
+
+    if not destino:
+        st.warning(f"Cadastre uma {'conta' if origem == 'Conta' else 'cartão'} antes de importar.")
+    elif arquivo and st.button("Importar", use_container_width=True):
+        try:
+            with st.spinner("Importando..."):
+                resultado = importar_extrato(arquivo, nome_arquivo=arquivo.name, responsavel=responsavel,
+                                             conta=destino if origem == "Conta" else None,
+                                             cartao=destino if origem == "Cartão" else None)
+        except ValueError as erro:
+            st.error(str(erro))
+        else:
+            st.toast(f"{resultado['inseridas']} lançamentos importados, {resultado['duplicadas']} já existiam.", icon="📥")
+            st.rerun()
+
+def render_secao(dados, titulo, cor_borda, prefixo="", ordenar=True):
+    if not dados.empty:
+        st.markdown(f"#### {titulo}")
+        for _, row in (dados.sort_values(by='data') if ordenar else dados).iterrows():
+            is_pendente = row['status'] == "Pendente"
+            
+            with st.container():
+                st.markdown(f'''<div class="lista-item" style="border-left-color: {cor_borda};">''', unsafe_allow_html=True)
+                cols = st.columns([1, 3, 1.8, 1.8, 1.6]) 
+                cols[0].write(row['data'].strftime('%d/%m') if ordenar else row['data'].strftime('%d/%m/%y'))
+                cols[1].write(row['descricao'])
+                cols[2].write(f"`{row['categoria']}`")
+                cols[3].write(f"**R$ {row['valor']:,.2f}**")
+                
+                b_p, b_e, b_d = cols[4].columns(3)
+                if is_pendente and b_p.button("✅", key=f"{prefixo}p_{row['id']}"): popup_pagar_item(row['id'], row['descricao'], row['valor'])
+                if b_e.button("📝", key=f"{prefixo}e_{row['id']}"): popup_editar_item(row)
+                if b_d.button("🗑️", key=f"{prefixo}d_{row['id']}"): deletar_item(row['id'])
+                st.markdown('</div>', unsafe_allow_html=True)
+
+# --- GRADE PAGINADA ---
+
+def exibir_grade_lancamentos(inicio, fim, filtro):
+    """Grade única (st.dataframe) com paginação e ordenação feitas no SQLite.
+
+    O custo de renderização não cresce com o número de lançamentos do mês:
+    apenas a página atual é lida e as ações valem para as linhas selecionadas.
+    """
+    g1, g2, g3, g4 = st.columns([1.5, 1, 1, 1])
+    ordem = g1.selectbox("Ordenar por", ["data", "valor", "descricao", "categoria", "status", "responsavel"], key="grade_ordem")
+    decrescente = g2.toggle("Decrescente", key="grade_desc")
+    por_pagina = g3.selectbox("Por página", [25, 50, 100, 250], index=1, key="grade_limite")
+
+    total = contar_lancamentos(inicio, fim, filtro)
+    n_paginas = max((total - 1) // por_pagina + 1, 1)
+    pagina = g4.number_input(f"Página (de {n_paginas})", min_value=1, max_value=n_paginas, value=1, key="grade_pagina")
+
+    df_pag = pagina_lancamentos(inicio, fim, filtro, ordem, decrescente, por_pagina, pagina)
+    if df_pag.empty:
+        st.info("Nenhum lançamento para este filtro.")
+        return
+
+    evento = st.dataframe(
+        df_pag[['id', 'data', 'descricao', 'categoria', 'valor', 'status', 'responsavel', 'forma_pagto']],
+        hide_index=True, use_container_width=True, on_select="rerun", selection_mode="multi-row",
+        # A chave muda com a página/ordem para que a seleção não aponte para outras linhas
+        key=f"grade_{inicio}_{filtro}_{ordem}_{decrescente}_{por_pagina}_{pagina}",
+        column_config={
+            "id": None,
+            "data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+            "descricao": "Descrição",
+            "categoria": "Categoria",
+            "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+            "status": "Status",
+            "responsavel": "Responsável",
+            "forma_pagto": "Forma",
+        },
+    )
+    selecionados = df_pag.iloc[evento.selection.rows] if evento.selection.rows else df_pag.iloc[0:0]
+    st.caption(f"{total} lançamentos · {len(selecionados)} selecionados")
+
+    pendentes = selecionados[selecionados['status'] == 'Pendente']
+    a1, a2, a3 = st.columns(3)
+    if a1.button("✅ Pagar", disabled=pendentes.empty, use_container_width=True, key="grade_pagar"):
+        if len(pendentes) == 1:
+            row = pendentes.iloc[0]
+            popup_pagar_item(row['id'], row['descricao'], row['valor'])
+        else:
+            popup_pagar_lote(pendentes)
+    if a2.button("📝 Editar", disabled=len(selecionados) != 1, use_container_width=True, key="grade_editar"):
+        popup_editar_item(selecionados.iloc[0])
+    if a3.button("🗑️ Excluir", disabled=selecionados.empty, use_container_width=True, key="grade_excluir"):
+        deletar_itens(selecionados['id'].tolist())
+
 # --- EXIBIÇÃO PRINCIPAL ---
 
+def exibir_resumo_mes(ano, mes):
+    """Totais do mês a partir do resumo_mensal pré-agregado (sem ler os lançamentos)."""
+    res = carregar_resumo(ano, mes)
+    if res.empty:
+        return
+    total_receitas = res[res['tipo_mov'] == 'Receita']['total'].sum()
+    total_despesas_gerais = res[(res['tipo_mov'] == 'Despesa') & (~res['tipo_custo'].isin(['Meta', 'Investimento', 'Dívida']))]['total'].sum()
+    total_metas = res[res['tipo_custo'] == 'Meta']['total'].sum()
+    total_investido = res[res['tipo_custo'] == 'Investimento']['total'].sum()
+    total_dividas = res[res['tipo_custo'] == 'Dívida']['total'].sum()
+    saldo_liquido = total_receitas - (total_despesas_gerais + total_metas + total_investido + total_dividas)
+
+    st.markdown("### Resumo Mensal")
+    c1, c2, c3, c4, c5, c6 = st.columns(6)
+    c1.metric("Receitas", f"R$ {total_receitas:,.2f}")
+    c2.metric("Despesas", f"R$ {total_despesas_gerais:,.2f}")
+    c3.metric("Metas", f"R$ {total_metas:,.2f}")
+    c4.metric("Investido", f"R$ {total_investido:,.2f}")
+    c5.metric("Dívidas", f"R$ {total_dividas:,.2f}")
+    c6.metric("SALDO FINAL", f"R$ {saldo_liquido:,.2f}", delta=f"{saldo_liquido:,.2f}")
+
+    st.divider()
+
+def exibir_previstos(ano, mes):
+    """Recorrências e parcelas do mês que ainda não foram geradas, só para leitura."""
+    inicio, fim = intervalo_mes(ano, mes)
+    previstos = lancamentos_previstos(inicio, fim)
+    if previstos.empty:
+        return
+    receitas = previstos[previstos['tipo_mov'] == 'Receita']['valor'].sum()
+    despesas = previstos[previstos['tipo_mov'] == 'Despesa']['valor'].sum()
+    with st.expander(f"🔮 Previstos · {len(previstos)} itens · entradas R$ {receitas:,.2f} · saídas R$ {despesas:,.2f}",
+                     expanded=True):
+        st.caption("Recorrências e parcelas deste mês ainda não lançadas: serão geradas quando o mês se aproximar.")
+        st.dataframe(previstos[['data', 'descricao', 'categoria', 'tipo_mov', 'valor', 'origem']],
+                     hide_index=True, use_container_width=True, column_config={
+                         "data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+                         "descricao": "Descrição", "categoria": "Categoria", "tipo_mov": "Tipo",
+                         "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                         "origem": "Origem",
+                     })
+
 def exibir_lancamentos():
     st.markdown("<h2 style='color: white;'>Fluxo de Caixa</h2>", unsafe_allow_html=True)
     
@@ -222,58 +406,56 @@ def exibir_lancamentos():
         mes_sel = f1.selectbox("Mês", [f"{i:02d}" for i in range(1, 13)], index=date.today().month-1)
         ano_sel = f2.selectbox("Ano", [2025, 2026], index=1)
         visualizacao = f3.selectbox("Ver", ["Todos", "Receitas", "Despesas", "Pendentes", "Metas", "Investimentos", "Dívidas"])
+        modo = st.radio("Exibição", ["Lista", "Grade"], horizontal=True, key="modo_lancamentos")
         
         with f4:
             st.markdown("<div style='padding-top: 28px;'></div>", unsafe_allow_html=True)
             if st.button("➕ NOVO ITEM", use_container_width=True): 
                 popup_novo_lancamento()
+            if st.button("📥 IMPORTAR", use_container_width=True):
+                popup_importar_extrato()
 
-    conn = create_connection()
-    df = pd.read_sql_query("SELECT * FROM lancamentos", conn)
-    conn.close()
+    # Busca em todos os períodos (índice FTS5 sobre descrição e categoria)
+    termo = st.text_input("🔎 Buscar lançamentos", placeholder="ex.: mercado nubank", key="busca_lancamentos")
+    if termo.strip():
+        resultados = buscar_lancamentos(termo)
+        if resultados.empty:
+            st.info(f"Nenhum lançamento encontrado para '{termo}'.")
+        else:
+            render_secao(resultados, f"🔎 {len(resultados)} resultados para '{termo}'", "#58a6ff", prefixo="busca_", ordenar=False)
+        st.divider()
 
-    if not df.empty:
-        df['data'] = pd.to_datetime(df['data'])
-        df_f = df[(df['data'].dt.month == int(mes_sel)) & (df['data'].dt.year == int(ano_sel))].copy()
-        
-        # --- CÁLCULOS ---
-        total_receitas = df_f[df_f['tipo_mov'] == 'Receita']['valor'].sum()
-        total_despesas_gerais = df_f[(df_f['tipo_mov'] == 'Despesa') & (~df_f['tipo_custo'].isin(['Meta', 'Investimento', 'Dívida']))]['valor'].sum()
-        total_metas = df_f[df_f['tipo_custo'] == 'Meta']['valor'].sum()
-        total_investido = df_f[df_f['tipo_custo'] == 'Investimento']['valor'].sum()
-        total_dividas = df_f[df_f['tipo_custo'] == 'Dívida']['valor'].sum()
-        saldo_liquido = total_receitas - (total_despesas_gerais + total_metas + total_investido + total_dividas)
-
-        st.markdown("### Resumo Mensal")
-        c1, c2, c3, c4, c5, c6 = st.columns(6)
-        c1.metric("Receitas", f"R$ {total_receitas:,.2f}")
-        c2.metric("Despesas", f"R$ {total_despesas_gerais:,.2f}")
-        c3.metric("Metas", f"R$ {total_metas:,.2f}")
-        c4.metric("Investido", f"R$ {total_investido:,.2f}")
-        c5.metric("Dívidas", f"R$ {total_dividas:,.2f}")
-        c6.metric("SALDO FINAL", f"R$ {saldo_liquido:,.2f}", delta=f"{saldo_liquido:,.2f}")
+    restantes = parcelas_restantes()
+    if not restantes.empty:
+        with st.expander(f"💳 Parcelamentos em aberto · {int(restantes['restantes'].sum())} parcelas · "
+                         f"R$ {restantes['valor_restante'].sum():,.2f}"):
+            st.dataframe(restantes[['descricao', 'cartao', 'valor_proxima', 'restantes', 'quantidade', 'valor_restante', 'ultima_data']],
+                         hide_index=True, use_container_width=True, column_config={
+                             "descricao": "Descrição", "cartao": "Cartão",
+                             "valor_proxima": st.column_config.NumberColumn("Parcela", format="R$ %.2f"),
+                             "restantes": "Restantes", "quantidade": "Total",
+                             "valor_restante": st.column_config.NumberColumn("A pagar", format="R$ %.2f"),
+                             "ultima_data": st.column_config.DateColumn("Última", format="MM/YYYY"),
+                         })
 
-        st.divider()
+    # Apenas o mês exibido é lido do banco (índice em lancamentos.data). Recorrências e
+    # parcelas são geradas só até as faturas abertas; meses além delas mostram a previsão
+    inicio_mes, fim_mes = intervalo_mes(ano_sel, mes_sel)
+    fim_gerado = fim_das_faturas_abertas()
+    materializar_recorrencias(fim_gerado)
+    materializar_parcelas(fim_gerado)
+    if fim_mes > fim_gerado:
+        exibir_previstos(ano_sel, mes_sel)
+
+    if modo == "Grade":
+        # Só a página atual e a contagem saem do banco; o mês inteiro nunca é carregado
+        exibir_resumo_mes(ano_sel, mes_sel)
+        exibir_grade_lancamentos(inicio_mes, fim_mes, visualizacao)
+        return
 
-        def render_secao(dados, titulo, cor_borda):
-            if not dados.empty:
-                st.markdown(f"#### {titulo}")
-                for _, row in dados.sort_values(by='data').iterrows():
-                    is_pendente = "Pendente" in str(row['descricao'])
-                    
-                    with st.container():
-                        st.markdown(f'''<div class="lista-item" style="border-left-color: {cor_borda};">''', unsafe_allow_html=True)
-                        cols = st.columns([1, 3, 1.8, 1.8, 1.6]) 
-                        cols[0].write(row['data'].strftime('%d/%m'))
-                        cols[1].write(row['descricao'])
-                        cols[2].write(f"`{row['categoria']}`")
-                        cols[3].write(f"**R$ {row['valor']:,.2f}**")
-                        
-                        b_p, b_e, b_d = cols[4].columns(3)
-                        if is_pendente and b_p.button("✅", key=f"p_{row['id']}"): popup_pagar_item(row['id'], row['descricao'], row['valor'])
-                        if b_e.button("📝", key=f"e_{row['id']}"): popup_editar_item(row)
-                        if b_d.button("🗑️", key=f"d_{row['id']}"): deletar_item(row['id'])
-                        st.markdown('</div>', unsafe_allow_html=True)
+    df_f = carregar_lancamentos(inicio_mes, fim_mes)
+    if not df_f.empty:
+        exibir_resumo_mes(ano_sel, mes_sel)
 
         filtro_map = {
             "Receitas": (df_f[df_f['tipo_mov'] == 'Receita'], "💰 Receitas", "#3fb950"),
@@ -281,7 +463,7 @@ def exibir_lancamentos():
             "Metas": (df_f[df_f['tipo_custo'] == 'Meta'], "🎯 Metas", "#bc8cff"),
             "Dívidas": (df_f[df_f['tipo_custo'] == 'Dívida'], "📉 Dívidas", "#f85149"),
             "Despesas": (df_f[(df_f['tipo_mov'] == 'Despesa') & (~df_f['tipo_custo'].isin(['Meta', 'Investimento', 'Dívida']))], "🛒 Despesas Gerais", "#db6d28"),
-            "Pendentes": (df_f[df_f['descricao'].str.contains("Pendente", case=False, na=False)], "⏳ Lançamentos Pendentes", "#f1c40f")
+            "Pendentes": (df_f[df_f['status'] == 'Pendente'], "⏳ Lançamentos Pendentes", "#f1c40f")
         }
 
         if visualizacao == "Todos":
@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
+from datetime import date
 from database import create_connection
+from dados import MESES_PT, consultar, invalidar_referencias
+from projecao import projetar_metas
 
 def exibir_metas():
     st.markdown("<h2 style='color: white;'>🎯 Metas e Objetivos</h2>", unsafe_allow_html=True)
@@ -14,7 +17,7 @@ def exibir_metas():
             popup_nova_meta()
 
     # --- PROCESSAMENTO DE DADOS ---
-    df_metas = pd.read_sql_query("SELECT * FROM metas", conn)
+    df_metas = consultar("SELECT * FROM metas")
     
     if not df_metas.empty:
         # --- CARDS DE SOMATÓRIA ---
@@ -55,7 +58,8 @@ def exibir_metas():
                 r1, r2, r3, r4, r5 = st.columns([0.5, 2.5, 2, 2, 0.5])
                 
                 r1.markdown(f"### {row['icone']}")
-                r2.markdown(f"**{row['nome']}**<br><small style='color:#8b949e;'>Alvo: R$ {row['valor_objetivo']:,.2f}</small>", unsafe_allow_html=True)
+                prazo = f" até {pd.Timestamp(row['prazo']):%d/%m/%Y}" if row['prazo'] else ""
+                r2.markdown(f"**{row['nome']}**<br><small style='color:#8b949e;'>Alvo: R$ {row['valor_objetivo']:,.2f}{prazo}</small>", unsafe_allow_html=True)
                 
                 with r3:
                     st.write(f"Falta: R$ {max(valor_falta, 0):,.2f}")
@@ -66,13 +70,52 @@ def exibir_metas():
                 if r5.button("🗑️", key=f"del_meta_{row['id']}"):
                     conn.execute("DELETE FROM metas WHERE id = ?", (row['id'],))
                     conn.commit()
+                    invalidar_referencias()
                     st.rerun()
                 st.markdown('</div>', unsafe_allow_html=True)
+
+        st.divider()
+        exibir_projecao(df_metas)
     else:
         st.info("Nenhuma meta cadastrada.")
     
     conn.close()
 
+def _mes_ano(data):
+    return f"{MESES_PT[data.month]}/{data.year}" if pd.notna(data) else "—"
+
+# Fragmento: mudar as premissas refaz só a projeção, não a página inteira
+@st.fragment
+def exibir_projecao(df_metas):
+    st.markdown("#### 🔮 Projeção das Metas")
+    st.caption("Simulação de Monte Carlo: cada cenário sorteia aportes do histórico de cada meta "
+               "(últimos 12 meses) e um rendimento mensal aleatório.")
+    p1, p2, p3, p4 = st.columns(4)
+    retorno = p1.number_input("Rendimento (% a.a.)", value=8.0, step=0.5, key="proj_retorno")
+    volatilidade = p2.number_input("Volatilidade (% a.a.)", min_value=0.0, value=10.0, step=1.0, key="proj_vol")
+    prazo_padrao = p3.date_input("Prazo (metas sem data)", date(date.today().year + 1, 12, 31), key="proj_prazo")
+    cenarios = p4.selectbox("Cenários", [1000, 5000, 10000], index=1, key="proj_cenarios")
+
+    projecao = projetar_metas(prazo_padrao, retorno / 100, volatilidade / 100, cenarios)
+    tabela = df_metas[['id', 'icone', 'nome', 'prazo']].merge(projecao, on='id')
+    tabela['meta'] = tabela['icone'].fillna('') + " " + tabela['nome']
+    tabela['prazo'] = pd.to_datetime(tabela['prazo']).fillna(pd.Timestamp(prazo_padrao))
+    hoje = pd.Timestamp(date.today()).to_period("M").to_timestamp()
+    faixa = [f"{_mes_ano(hoje + pd.DateOffset(months=int(a)))} – {_mes_ano(hoje + pd.DateOffset(months=int(b)))}"
+             if pd.notna(a) and pd.notna(b) else "—" for a, b in zip(tabela['meses_p10'], tabela['meses_p90'])]
+    st.dataframe(pd.DataFrame({
+        "Meta": tabela['meta'],
+        "Prazo": tabela['prazo'].dt.date,
+        "Chance até o prazo": tabela['probabilidade'] * 100,
+        "Previsão (mediana)": [_mes_ano(d) for d in tabela['data_p50']],
+        "Faixa de 80%": faixa,
+        "Aporte médio/mês": tabela['aporte_medio'],
+    }), hide_index=True, use_container_width=True, column_config={
+        "Prazo": st.column_config.DateColumn(format="DD/MM/YYYY"),
+        "Chance até o prazo": st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=100),
+        "Aporte médio/mês": st.column_config.NumberColumn(format="R$ %.2f"),
+    })
+
 @st.dialog("Nova Meta")
 def popup_nova_meta():
     with st.form("f_nova_meta", clear_on_submit=True):
@@ -80,12 +123,14 @@ def popup_nova_meta():
         nome = col1.text_input("Nome da Meta")
         icone = col2.selectbox("Ícone", ["💰", "✈️", "🚗", "🏠", "💍", "🎓", "🏖️", "📱"])
         valor_obj = st.number_input("Valor Objetivo (R$)", min_value=0.0)
+        prazo = st.date_input("Prazo (opcional)", value=None, min_value=date.today())
         
         if st.form_submit_button("Salvar Meta", use_container_width=True):
             if nome and valor_obj > 0:
                 conn = create_connection()
-                conn.execute("INSERT INTO metas (nome, valor_objetivo, valor_atual, icone) VALUES (?,?,?,?)", 
-                             (nome, valor_obj, 0.0, icone))
+                conn.execute("INSERT INTO metas (nome, valor_objetivo, valor_atual, icone, prazo) VALUES (?,?,?,?,?)", 
+                             (nome, valor_obj, 0.0, icone, prazo.isoformat() if prazo else None))
                 conn.commit()
+                invalidar_referencias()
                 conn.close()
                 st.rerun()
\ No newline at end of file
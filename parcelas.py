@@ -0,0 +1,263 @@
+"""Cronogramas de parcelas e gravação de lançamentos em lote.
+
+Compras parceladas e planos de dívida são gravados uma vez em
+planos_parcelamento; as parcelas viram lançamentos só quando o seu mês é
+aberto (materializar_parcelas), do mesmo jeito que as recorrências.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from database import create_connection
+
+COLUNAS_LANCAMENTO = ["data", "descricao", "categoria", "valor", "tipo_mov", "tipo_custo",
+                      "responsavel", "forma_pagto", "conta", "cartao", "parcela_num", "parcela_total", "status",
+                      "hash_importacao", "recorrencia_id", "plano_id", "meta_id"]
+
+
+def datas_mensais(inicio, quantidade, dia=None):
+    """Mesmo dia de `inicio` nos próximos meses, limitado ao fim de cada mês.
+
+    Equivale a inicio + relativedelta(months=i) para i em range(quantidade),
+    mas calculado de uma vez com aritmética de datetime64. `dia` substitui o
+    dia de `inicio` (ex.: 31 vira 28/29 em fevereiro e 30 em abril).
+    """
+    inicio = pd.Timestamp(inicio)
+    meses = np.datetime64(inicio.strftime("%Y-%m"), "M") + np.arange(int(quantidade))
+    dias_no_mes = ((meses + 1).astype("datetime64[D]") - meses.astype("datetime64[D]")).astype(int)
+    dias = np.minimum(int(dia or inicio.day), dias_no_mes) - 1
+    return pd.DatetimeIndex(meses.astype("datetime64[D]") + dias.astype("timedelta64[D]"))
+
+
+def fim_do_periodo(ate=None):
+    """Primeiro dia (ISO) do mês seguinte ao período que termina em `ate` (exclusivo).
+
+    A materialização trabalha com meses inteiros: qualquer dia de um mês
+    libera o mês todo. Sem `ate`, considera o mês corrente.
+    """
+    ultimo_dia = pd.Timestamp(ate) - pd.Timedelta(days=1) if ate else pd.Timestamp(date.today())
+    return (ultimo_dia.to_period("M") + 1).start_time.date().isoformat()
+
+
+def fim_das_faturas_abertas(hoje=None):
+    """Fim (exclusivo) do mês seguinte, quando vence a fatura aberta mais distante de qualquer cartão."""
+    return (pd.Timestamp(hoje or date.today()).to_period("M") + 2).start_time.date().isoformat()
+
+
+def data_vencimento_fatura(data_compra, fechamento, vencimento):
+    """Data em que uma compra no crédito vence, pela regra de fechamento do cartão."""
+    # Compras a partir do dia de fechamento entram na fatura do mês seguinte
+    mes = datas_mensais(date(data_compra.year, data_compra.month, 1), 2)[1 if data_compra.day >= int(fechamento) else 0]
+    return date(mes.year, mes.month, min(int(vencimento), mes.days_in_month))
+
+
+def vencimentos_fatura(datas_compra, fechamento, vencimento):
+    """data_vencimento_fatura() para uma série inteira de datas de compra."""
+    datas_compra = pd.DatetimeIndex(datas_compra)
+    meses = datas_compra.values.astype("datetime64[M]") + (datas_compra.day >= int(fechamento)).astype(int)
+    dias_no_mes = ((meses + 1).astype("datetime64[D]") - meses.astype("datetime64[D]")).astype(int)
+    dias = np.minimum(int(vencimento), dias_no_mes) - 1
+    return pd.DatetimeIndex(meses.astype("datetime64[D]") + dias.astype("timedelta64[D]"))
+
+
+def montar_parcelas(descricao, primeira_data, quantidade, valor_parcela, metadados="", status="Pendente",
+                    numerar=None, **colunas):
+    """DataFrame com uma linha de lançamento por parcela, pronto para gravar_lancamentos().
+
+    `valor_parcela` é um valor único ou um por parcela. `colunas` preenche as demais colunas de lancamentos (categoria, tipo_mov,
+    responsavel, cartao...) com o mesmo valor em todas as linhas. Por padrão
+    só compras com mais de uma parcela recebem o sufixo "(i/n)".
+    """
+    quantidade = int(quantidade)
+    numeros = pd.Series(np.arange(1, quantidade + 1))
+    if numerar is None:
+        numerar = quantidade > 1
+    sufixo = (" (" + numeros.astype(str) + f"/{quantidade})") if numerar else ""
+    linhas = pd.DataFrame({
+        "data": datas_mensais(primeira_data, quantidade).strftime("%Y-%m-%d"),
+        "descricao": descricao + sufixo + f"{metadados} | {status}",
+        "valor": valor_parcela if np.ndim(valor_parcela) else float(valor_parcela),
+        "status": status,
+        "parcela_num": numeros if numerar else None,
+        "parcela_total": quantidade if numerar else None,
+    })
+    for coluna, valor in colunas.items():
+        linhas[coluna] = valor
+    return linhas
+
+
+def gravar_lancamentos(linhas, ajustes=(), conn=None, ignorar_duplicados=False):
+    """Insere as linhas com executemany e aplica `ajustes` na mesma transação.
+
+    `ajustes` é uma sequência de (sql, params) — atualizações de metas,
+    carteira ou dívidas que precisam acontecer junto com os lançamentos.
+    Em caso de erro nada é gravado. Com `ignorar_duplicados`, linhas cujo
+    hash_importacao já existe são descartadas pelo índice único. Retorna
+    quantas linhas foram de fato inseridas.
+    """
+    linhas = linhas.reindex(columns=COLUNAS_LANCAMENTO).astype(object)
+    linhas = linhas.where(linhas.notna(), None)
+    sql = (f"INSERT {'OR IGNORE ' if ignorar_duplicados else ''}INTO lancamentos ({', '.join(COLUNAS_LANCAMENTO)}) "
+           f"VALUES ({', '.join('?' * len(COLUNAS_LANCAMENTO))})")
+
+    propria = conn is None
+    conn = conn or create_connection()
+    try:
+        with conn:
+            inseridas = conn.executemany(sql, linhas.itertuples(index=False, name=None)).rowcount
+            for sql_ajuste, params in ajustes:
+                conn.execute(sql_ajuste, params)
+    finally:
+        if propria:
+            conn.close()
+    return inseridas
+
+
+# --- PLANOS DE PARCELAMENTO ---
+
+CAMPOS_PLANO = ["descricao", "metadados", "categoria", "tipo_mov", "tipo_custo", "responsavel", "forma_pagto",
+                "conta", "cartao", "divida_id", "valor_parcela", "quantidade", "status_parcela",
+                "variacao", "valor_ultima"]
+
+
+def valores_parcelas(valor_parcela, quantidade, variacao=None, valor_ultima=None):
+    """Valor de cada parcela: valor_parcela + (i - 1) * variacao, e a última em `valor_ultima` se houver."""
+    valores = np.round(float(valor_parcela) + np.arange(int(quantidade)) * float(variacao or 0), 2)
+    if valor_ultima is not None and len(valores):
+        valores[-1] = round(float(valor_ultima), 2)
+    return valores
+
+
+def regra_de_valores(pagamentos):
+    """(valor_parcela, variacao, valor_ultima) que reproduzem um cronograma de pagamentos.
+
+    Price e SAC, com ou sem amortização extra constante, variam o pagamento
+    em progressão aritmética; só a última parcela, que quita o saldo, pode
+    fugir da regra. Assim o plano guarda três números em vez das N parcelas.
+    """
+    pagamentos = np.asarray(pagamentos, dtype=float)
+    variacao = float(pagamentos[1] - pagamentos[0]) if len(pagamentos) > 1 else 0.0
+    regra = valores_parcelas(pagamentos[0], len(pagamentos), variacao)
+    if np.abs(regra[:-1] - pagamentos[:-1].round(2)).max(initial=0) > 0.01:
+        raise ValueError("As parcelas não seguem uma progressão aritmética.")
+    ultima = round(float(pagamentos[-1]), 2)
+    return float(pagamentos[0]), variacao, (ultima if abs(regra[-1] - ultima) >= 0.01 else None)
+
+
+def _parcelas_ate(plano, alvo):
+    """Parcelas do plano ainda não geradas com data antes de `alvo`, e o ajuste que avança a marca do plano."""
+    valores = valores_parcelas(plano["valor_parcela"], plano["quantidade"], plano["variacao"], plano["valor_ultima"])
+    todas = montar_parcelas(plano["descricao"], plano["primeira_data"], plano["quantidade"], valores,
+                            plano["metadados"] or "", plano["status_parcela"], numerar=True, plano_id=int(plano["id"]),
+                            **{c: plano[c] for c in ("categoria", "tipo_mov", "tipo_custo", "responsavel",
+                                                     "forma_pagto", "conta", "cartao")})
+    geradas = max(int(plano["geradas"]), int((todas["data"] < alvo).sum()))
+    proxima = todas["data"].iloc[geradas] if geradas < len(todas) else None
+    ajuste = ("UPDATE planos_parcelamento SET geradas = ?, proxima_data = ? WHERE id = ?",
+              (geradas, proxima, int(plano["id"])))
+    return todas.iloc[int(plano["geradas"]):geradas], ajuste
+
+
+def criar_plano(descricao, primeira_data, quantidade, valor_parcela, metadados="", status="Pendente",
+                avulsas=None, ajustes=(), conn=None, **colunas):
+    """Grava o plano e, na mesma transação, as parcelas que vencem até o mês corrente.
+
+    `colunas` preenche as demais colunas do plano (categoria, cartao,
+    divida_id, variacao e valor_ultima de um cronograma — ver
+    regra_de_valores()...); `avulsas` são lançamentos gravados junto, como a entrada
+    de uma dívida. Retorna o id do plano.
+    """
+    datas = datas_mensais(primeira_data, quantidade)
+    plano = {c: colunas.get(c) for c in CAMPOS_PLANO}
+    plano.update(descricao=descricao, metadados=metadados, valor_parcela=float(valor_parcela),
+                 quantidade=int(quantidade), status_parcela=status, geradas=0,
+                 primeira_data=datas[0].date().isoformat(), ultima_data=datas[-1].date().isoformat())
+    colunas_sql = CAMPOS_PLANO + ["primeira_data", "ultima_data"]
+    propria = conn is None
+    conn = conn or create_connection()
+    try:
+        try:
+            plano["id"] = conn.execute(
+                f"INSERT INTO planos_parcelamento ({', '.join(colunas_sql)}) VALUES ({', '.join('?' * len(colunas_sql))})",
+                [plano[c] for c in colunas_sql]).lastrowid
+            linhas, ajuste = _parcelas_ate(plano, fim_do_periodo())
+            if avulsas is not None:
+                linhas = pd.concat([avulsas, linhas], ignore_index=True)
+            gravar_lancamentos(linhas, [*ajustes, ajuste], conn=conn)
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+    finally:
+        if propria:
+            conn.close()
+    return plano["id"]
+
+
+def materializar_parcelas(ate=None, conn=None):
+    """Gera as parcelas de todos os planos que vencem antes de `ate` (ISO, exclusivo).
+
+    Sem `ate`, vai até o fim do mês corrente. Com tudo em dia o custo é uma
+    consulta no índice parcial de proxima_data. Retorna quantas parcelas foram criadas.
+    """
+    alvo = fim_do_periodo(ate)
+    propria = conn is None
+    conn = conn or create_connection()
+    try:
+        if conn.execute("SELECT 1 FROM planos_parcelamento WHERE proxima_data < ? LIMIT 1", (alvo,)).fetchone() is None:
+            return 0
+        # Relê os planos já com o lock de escrita (outra sessão pode ter gerado o mesmo mês)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            planos = pd.read_sql_query("SELECT * FROM planos_parcelamento WHERE proxima_data < ?", conn, params=(alvo,))
+            if planos.empty:
+                conn.rollback()
+                return 0
+            planos = planos.astype(object).where(planos.notna(), None)
+            blocos, ajustes = zip(*(_parcelas_ate(plano, alvo) for plano in planos.to_dict("records")))
+            return gravar_lancamentos(pd.concat(blocos, ignore_index=True), ajustes, conn=conn)
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+    finally:
+        if propria:
+            conn.close()
+
+
+def alterar_plano(plano_id, descricao, categoria, tipo_custo, valor_parcela, conn=None):
+    """Altera o plano e, numa transação, todas as suas parcelas ainda pendentes.
+
+    O valor informado passa a valer para todas as parcelas restantes: a
+    regra de um cronograma (variacao, valor_ultima) é descartada.
+    """
+    propria = conn is None
+    conn = conn or create_connection()
+    try:
+        with conn:
+            conn.execute("UPDATE planos_parcelamento SET descricao = ?, categoria = ?, tipo_custo = ?, valor_parcela = ?, "
+                         "variacao = 0, valor_ultima = NULL WHERE id = ?", (descricao, categoria, tipo_custo, float(valor_parcela), plano_id))
+            metadados = conn.execute("SELECT metadados FROM planos_parcelamento WHERE id = ?", (plano_id,)).fetchone()[0]
+            conn.execute("""
+                UPDATE lancamentos SET
+                    descricao = ? || ' (' || parcela_num || '/' || parcela_total || ')' || ? || ' | ' || status,
+                    categoria = ?, tipo_custo = ?, valor = ?
+                WHERE plano_id = ? AND status = 'Pendente'
+            """, (descricao, metadados, categoria, tipo_custo, float(valor_parcela), plano_id))
+    finally:
+        if propria:
+            conn.close()
+
+
+def cancelar_plano(plano_id, conn=None):
+    """Encerra o plano: parcelas pendentes são removidas e nenhuma nova é gerada."""
+    propria = conn is None
+    conn = conn or create_connection()
+    try:
+        with conn:
+            conn.execute("UPDATE planos_parcelamento SET ativo = 0, proxima_data = NULL WHERE id = ?", (plano_id,))
+            conn.execute("DELETE FROM lancamentos WHERE plano_id = ? AND status = 'Pendente'", (plano_id,))
+    finally:
+        if propria:
+            conn.close()
@@ -0,0 +1,62 @@
+"""Perfis: uma família (ou casa) por arquivo SQLite.
+
+Cada perfil é um arquivo .db em PASTA_PERFIS (variável FINANCEIRO_PERFIS,
+padrão "perfis/"), uma pasta só de perfis: bancos de teste ou rascunho
+fora dela não aparecem no seletor. O nome do perfil é o nome do arquivo, e
+o banco padrão (DB_PATH) é sempre um deles. Bancos da versão anterior
+copiados para a pasta são migrados ao serem abertos (migrações 13 e 14).
+O perfil escolhido fica em st.session_state e database.banco_atual() o
+devolve a todas as conexões daquela sessão.
+
+O pool de conexões, as migrações, a geração dos dados e as chaves dos
+caches de leitura já são por arquivo: cada família tem os seus, e uma
+escrita numa delas não invalida o cache das outras sessões.
+"""
+import os
+import re
+
+import streamlit as st
+
+import database
+
+PASTA_PERFIS = os.environ.get("FINANCEIRO_PERFIS", "perfis")
+
+
+def nome_perfil(caminho):
+    return os.path.splitext(os.path.basename(caminho))[0]
+
+
+def titulo_perfil(nome):
+    """'financas_casal' -> 'Financas Casal' (rótulo do seletor)."""
+    return nome.replace("_", " ").replace("-", " ").title()
+
+
+def listar_perfis(pasta=None):
+    """{nome: caminho} dos bancos da pasta, com o banco padrão sempre presente."""
+    pasta = pasta or PASTA_PERFIS
+    perfis = {}
+    if os.path.isdir(pasta):
+        for entrada in sorted(os.scandir(pasta), key=lambda e: e.name):
+            if entrada.is_file() and entrada.name.lower().endswith(".db"):
+                perfis[nome_perfil(entrada.name)] = os.path.abspath(entrada.path)
+    perfis.setdefault(nome_perfil(database.DB_PATH), os.path.abspath(database.DB_PATH))
+    return perfis
+
+
+def criar_perfil(nome, pasta=None):
+    """Cria o banco de um perfil novo, já com o esquema, e devolve (nome, caminho)."""
+    arquivo = re.sub(r"[^\w-]+", "_", nome.strip().lower()).strip("_")
+    if not arquivo:
+        raise ValueError("Informe um nome para o perfil.")
+    pasta = pasta or PASTA_PERFIS
+    caminho = os.path.abspath(os.path.join(pasta, f"{arquivo}.db"))
+    if os.path.exists(caminho) or arquivo == nome_perfil(database.DB_PATH):
+        raise ValueError(f"Já existe um perfil '{arquivo}'.")
+    os.makedirs(pasta, exist_ok=True)
+    database.create_tables(caminho)
+    return arquivo, caminho
+
+
+def usar_perfil(caminho):
+    """Direciona as conexões e os caches desta sessão para o banco do perfil."""
+    st.session_state[database.CHAVE_SESSAO] = os.path.abspath(caminho)
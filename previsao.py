@@ -0,0 +1,125 @@
+"""Previsão do fluxo de caixa para os próximos meses.
+
+Para cada mês, a partir do corrente, soma entradas e saídas de quatro origens,
+sem dupla contagem:
+
+- pendentes: lançamentos já gravados com status Pendente (inclui parcelas e
+  recorrências já materializadas e as pendências dos últimos meses ainda em
+  aberto, que entram no mês corrente);
+- parcelas: parcelas de planos (compras e dívidas) que ainda não viraram
+  lançamentos;
+- recorrências: ocorrências das regras ativas ainda não materializadas;
+- estimado: a média mensal dos lançamentos avulsos dos últimos meses, menos
+  o que já foi lançado de avulso no mês.
+
+Tudo sai de consultas por intervalo de data (índice idx_lancamentos_data) e
+de agregados sobre planos e regras; nenhuma leitura da tabela inteira.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dados import chave_banco, compromissos_parcelados, movimento_por_mes
+from database import fixar_banco
+from recorrencias import previsao_recorrencias
+
+MESES_MEDIA = 6
+ORIGENS = ["pendentes", "parcelas", "recorrencias", "estimado"]
+
+
+def _primeiro_dia(indice_mes):
+    return date(indice_mes // 12, indice_mes % 12 + 1, 1)
+
+
+def prever_fluxo(meses=12, saldo_inicial=0.0, hoje=None):
+    """Entradas, saídas e saldo projetado mês a mês, do mês corrente até `meses` à frente.
+
+    `saldo_inicial` é o saldo disponível hoje: o que já foi pago no mês
+    corrente não entra de novo. Retorna um DataFrame com uma linha por mês
+    (mes, receitas, despesas, o líquido de cada origem, liquido, saldo e
+    negativo).
+    """
+    hoje = pd.Timestamp(hoje or date.today())
+    atual = hoje.year * 12 + hoje.month - 1
+    indices = np.arange(atual, atual + meses)
+    fim = _primeiro_dia(atual + meses)
+    tipos = ["Receita", "Despesa"]
+    vazio = pd.DataFrame(0.0, index=pd.MultiIndex.from_product([indices, tipos], names=["m", "tipo_mov"]),
+                         columns=ORIGENS)
+
+    # Lançamentos gravados: histórico para a média e meses futuros, num só intervalo
+    movimento = movimento_por_mes(_primeiro_dia(atual - MESES_MEDIA), fim)
+    movimento = movimento[movimento["tipo_mov"].isin(tipos)]
+    passado = movimento[movimento["m"] < atual]
+    futuro = movimento[movimento["m"] >= atual].set_index(["m", "tipo_mov"])
+
+    origens = vazio.copy()
+    origens["pendentes"] = futuro["pendente"].reindex(origens.index).fillna(0)
+    # Pendências de meses anteriores ainda em aberto vencem agora
+    atrasado = passado.groupby("tipo_mov")["pendente"].sum()
+    for tipo, valor in atrasado.items():
+        origens.loc[(atual, tipo), "pendentes"] += valor
+
+    parcelas = compromissos_parcelados(_primeiro_dia(atual), fim, nao_geradas=True)
+    if not parcelas.empty:
+        parcelas["m"] = parcelas["ano"] * 12 + parcelas["mes"] - 1
+        origens["parcelas"] = parcelas.groupby(["m", "tipo_mov"])["total"].sum().reindex(origens.index).fillna(0)
+
+    recorrentes = previsao_recorrencias(fim)
+    if not recorrentes.empty:
+        datas = pd.to_datetime(recorrentes["data"])
+        recorrentes["m"] = datas.dt.year * 12 + datas.dt.month - 1
+        origens["recorrencias"] = (recorrentes.groupby(["m", "tipo_mov"])["valor"].sum().astype(float)
+                                   .reindex(origens.index).fillna(0))
+
+    # Avulsos: média dos meses fechados, descontado o que o mês já tem lançado
+    media = passado.groupby("tipo_mov")["avulso"].sum().reindex(tipos).fillna(0) / MESES_MEDIA
+    ja_lancado = futuro["avulso"].reindex(origens.index).fillna(0)
+    origens["estimado"] = np.maximum(media.reindex(origens.index.get_level_values("tipo_mov")).to_numpy()
+                                     - ja_lancado.to_numpy(), 0)
+
+    receitas = origens.xs("Receita", level="tipo_mov")
+    despesas = origens.xs("Despesa", level="tipo_mov")
+    fluxo = (receitas - despesas)
+    fluxo.insert(0, "despesas", despesas.sum(axis=1))
+    fluxo.insert(0, "receitas", receitas.sum(axis=1))
+    fluxo["liquido"] = fluxo["receitas"] - fluxo["despesas"]
+    fluxo["saldo"] = saldo_inicial + fluxo["liquido"].cumsum()
+    fluxo["negativo"] = fluxo["saldo"] < 0
+    fluxo.insert(0, "mes", [pd.Timestamp(_primeiro_dia(int(m))) for m in fluxo.index])
+    return fluxo.reset_index(drop=True)
+
+
+def lancamentos_previstos(inicio, fim):
+    """Recorrências e parcelas de [inicio, fim) que ainda não viraram lançamentos.
+
+    Não grava nada: é como as páginas mostram, só para leitura, um mês além
+    das faturas abertas, que não é materializado ao ser navegado. Retorna um
+    DataFrame (data, descricao, categoria, tipo_mov, tipo_custo, cartao,
+    valor, origem); parcelas não têm data, só o mês.
+    """
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    recorrentes = previsao_recorrencias(fim.date().isoformat())
+    datas = pd.to_datetime(recorrentes["data"])
+    recorrentes = recorrentes[(datas >= inicio) & (datas < fim)].assign(origem="🔁 Recorrência")
+    # A descrição gravada carrega os metadados (" | 👤 ... | status"): fica só o texto base
+    recorrentes["descricao"] = recorrentes["descricao"].str.split(" | ", regex=False).str[0]
+    parcelas = (compromissos_parcelados(inicio, fim, nao_geradas=True)
+                .rename(columns={"total": "valor"}).assign(data=None, origem="💳 Parcelamento"))
+    blocos = [b for b in (recorrentes, parcelas) if not b.empty]
+    colunas = [*recorrentes.columns]
+    return pd.concat(blocos, ignore_index=True)[colunas] if blocos else pd.DataFrame(columns=colunas)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _prever(caminho, geracao, hoje, meses, saldo_inicial):
+    with fixar_banco(caminho):
+        return prever_fluxo(meses, saldo_inicial, hoje)
+
+
+def previsao_fluxo(meses=12, saldo_inicial=0.0, hoje=None):
+    """prever_fluxo() em cache por geração dos dados, mês corrente e premissas."""
+    hoje = pd.Timestamp(hoje or date.today()).date().isoformat()
+    return _prever(*chave_banco(), hoje, int(meses), float(saldo_inicial))
@@ -0,0 +1,134 @@
+"""Projeção das metas por Monte Carlo.
+
+Cada meta parte do valor_atual e, mês a mês, rende um retorno aleatório
+(log-normal, com retorno e volatilidade anuais informados) e recebe um
+aporte sorteado do seu próprio histórico mensal de aportes (lançamentos
+com meta_id), meses sem aporte incluídos. Todas as metas e todos os
+cenários andam juntos numa matriz metas x cenários; o laço é só sobre os
+meses e para assim que todos os cenários atingem o alvo.
+
+O resultado de cada meta é a distribuição do mês em que o alvo é atingido:
+mediana, faixa de 80% e a probabilidade de chegar lá até o prazo.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dados import chave_banco, consultar
+from database import PERFIS_ATIVOS, fixar_banco
+
+MESES_HISTORICO = 12
+HORIZONTE_MESES = 360
+SEMENTE = 2024
+
+
+def _indice_mes(data):
+    data = pd.Timestamp(data)
+    return data.year * 12 + data.month - 1
+
+
+def historico_aportes(hoje=None, meses=MESES_HISTORICO):
+    """Matriz metas x meses com o total aportado em cada um dos últimos `meses` meses completos.
+
+    Cada meta só conta a partir do mês do seu primeiro aporte: uma meta
+    nova não é penalizada pelos meses em que ainda não existia.
+    """
+    hoje = pd.Timestamp(hoje or date.today())
+    fim = _indice_mes(hoje)  # mês corrente, ainda incompleto, fica de fora
+    inicio = fim - meses
+    de = date(inicio // 12, inicio % 12 + 1, 1).isoformat()
+    ate = date(fim // 12, fim % 12 + 1, 1).isoformat()
+    df = consultar("""
+        SELECT meta_id, CAST(strftime('%Y', data) AS INTEGER) * 12 + CAST(strftime('%m', data) AS INTEGER) - 1 AS mes,
+               SUM(valor) AS valor
+        FROM lancamentos WHERE meta_id IS NOT NULL AND data >= ? AND data < ?
+        GROUP BY meta_id, mes
+    """, (de, ate))
+    primeiro = consultar("""
+        SELECT meta_id, MIN(data) AS primeiro FROM lancamentos WHERE meta_id IS NOT NULL GROUP BY meta_id
+    """)
+    historico = (df.pivot_table(index="meta_id", columns="mes", values="valor", aggfunc="sum")
+                 .reindex(columns=range(inicio, fim)).fillna(0.0))
+    # Meses antes do primeiro aporte viram NaN (não entram no sorteio)
+    comeco = primeiro.set_index("meta_id")["primeiro"].map(_indice_mes).reindex(historico.index)
+    historico = historico.where(np.asarray(historico.columns)[None, :] >= comeco.to_numpy()[:, None])
+    return historico
+
+
+def simular_metas(saldos, alvos, historicos, prazos, retorno_anual=0.08, volatilidade_anual=0.10,
+                  cenarios=5000, horizonte=HORIZONTE_MESES, semente=SEMENTE):
+    """Simula o saldo de cada meta em `cenarios` caminhos.
+
+    `historicos` é uma lista (uma por meta) com os aportes mensais passados
+    a sortear (vazia = sem aportes); `prazos` é, por meta, o número de meses
+    até o prazo. Retorna um DataFrame com os meses até atingir o alvo
+    (p10/p50/p90; NaN se a maioria dos cenários não chega em `horizonte`) e
+    a probabilidade de atingir até o prazo.
+    """
+    saldos, alvos = np.asarray(saldos, float), np.asarray(alvos, float)
+    prazos = np.maximum(np.asarray(prazos, float), 0)
+    n = len(saldos)
+    rng = np.random.default_rng(semente)
+
+    # Aportes sorteáveis: uma linha por meta, completada com zeros; sorteio por índice
+    tamanhos = np.array([len(h) for h in historicos])
+    amostras = np.zeros((n, max(tamanhos.max(initial=0), 1)))
+    for i, h in enumerate(historicos):
+        amostras[i, :len(h)] = h
+    tamanhos = np.maximum(tamanhos, 1)  # sem histórico: sorteia sempre o 0 da coluna vazia
+    linhas = np.arange(n)[:, None]
+
+    # Log-normal: a média do fator mensal corresponde ao retorno anual informado
+    sigma = volatilidade_anual / np.sqrt(12)
+    mu = np.log1p(retorno_anual) / 12 - sigma ** 2 / 2
+
+    saldo = np.repeat(saldos[:, None], cenarios, axis=1)
+    atingido = np.where(saldo >= alvos[:, None], 0.0, np.inf)
+    for mes in range(1, horizonte + 1):
+        pendentes = np.isinf(atingido)
+        if not pendentes.any():
+            break
+        fator = np.exp(mu + sigma * rng.standard_normal((n, cenarios)))
+        sorteio = (rng.random((n, cenarios)) * tamanhos[:, None]).astype(int)
+        saldo = saldo * fator + amostras[linhas, sorteio]
+        atingido[pendentes & (saldo >= alvos[:, None])] = mes
+
+    # "nearest" evita interpolar entre um mês e infinito (cenário que não atinge)
+    percentis = np.percentile(atingido, [10, 50, 90], axis=1, method="nearest")
+    percentis[np.isinf(percentis)] = np.nan
+    return pd.DataFrame({
+        "meses_p10": percentis[0],
+        "meses_p50": percentis[1],
+        "meses_p90": percentis[2],
+        "probabilidade": (atingido <= prazos[:, None]).mean(axis=1),
+        "aporte_medio": amostras.sum(axis=1) / tamanhos,
+    })
+
+
+@st.cache_data(max_entries=4 * PERFIS_ATIVOS, show_spinner=False)
+def _projetar(caminho, geracao, hoje, prazo_padrao, retorno_anual, volatilidade_anual, cenarios):
+    with fixar_banco(caminho):
+        metas = consultar("SELECT id, nome, valor_objetivo, valor_atual, prazo FROM metas ORDER BY id")
+        if metas.empty:
+            return metas
+        historico = historico_aportes(hoje)
+    historicos = [historico.loc[i].dropna().to_numpy() if i in historico.index else np.array([])
+                  for i in metas["id"]]
+    mes_atual = _indice_mes(hoje)
+    prazos = metas["prazo"].fillna(prazo_padrao).map(_indice_mes) - mes_atual
+    resultado = simular_metas(metas["valor_atual"].fillna(0), metas["valor_objetivo"].fillna(0), historicos,
+                              prazos, retorno_anual, volatilidade_anual, cenarios)
+    resultado.insert(0, "id", metas["id"].to_numpy())
+    # Mês (1º dia) em que a mediana dos cenários atinge o alvo
+    resultado["data_p50"] = [None if pd.isna(m) else pd.Timestamp(hoje).to_period("M").to_timestamp()
+                             + pd.DateOffset(months=int(m)) for m in resultado["meses_p50"]]
+    return resultado
+
+
+def projetar_metas(prazo_padrao, retorno_anual=0.08, volatilidade_anual=0.10, cenarios=5000, hoje=None):
+    """Projeção de todas as metas, em cache por geração dos dados e premissas."""
+    hoje = pd.Timestamp(hoje or date.today()).date().isoformat()
+    return _projetar(*chave_banco(), hoje, pd.Timestamp(prazo_padrao).date().isoformat(),
+                     float(retorno_anual), float(volatilidade_anual), int(cenarios))
@@ -0,0 +1,230 @@
+"""Lançamentos recorrentes (salário, aluguel, assinaturas).
+
+Uma regra de `recorrencias` só vira linhas em `lancamentos` quando o seu
+período é aberto ou já passou: materializar_recorrencias(ate) gera, num
+único executemany, as ocorrências de todas as regras ativas entre o
+proximo_periodo de cada uma e `ate`, e avança proximo_periodo na mesma
+transação. Uma ocorrência apagada à mão não volta, e meses já gerados nunca
+são gerados de novo.
+
+Editar uma regra troca apenas as ocorrências futuras ainda pendentes; o
+histórico fica como foi lançado. Passado e futuro são separados pela data
+da compra (a mesma de proximo_periodo e gerar_apos), nunca pela data
+gravada em lancamentos: nas regras de cartão ela é o vencimento da fatura.
+"""
+from datetime import date
+
+import pandas as pd
+
+from dados import consultar
+from database import create_connection
+from parcelas import COLUNAS_LANCAMENTO, datas_mensais, fim_do_periodo, gravar_lancamentos, vencimentos_fatura
+
+FREQUENCIAS = {"Mensal": 1, "Bimestral": 2, "Trimestral": 3, "Semestral": 6, "Anual": 12}
+CAMPOS = ["descricao", "categoria", "valor", "tipo_mov", "tipo_custo", "responsavel", "forma_pagto", "conta",
+          "cartao", "status", "intervalo_meses", "dia", "inicio", "fim"]
+
+
+def _indice_mes(data):
+    data = pd.Timestamp(data)
+    return data.year * 12 + data.month - 1
+
+
+def _primeiro_dia(indice_mes):
+    return date(indice_mes // 12, indice_mes % 12 + 1, 1)
+
+
+def ocorrencias(regra, de, ate):
+    """Datas da regra nos meses de `de` (inclusive) até `ate` (exclusivo)."""
+    inicio, passo = pd.Timestamp(regra["inicio"]), int(regra["intervalo_meses"])
+    mes_inicio = _indice_mes(inicio)
+    # Índices (contados a partir do mês de início) das ocorrências dentro da janela
+    primeira = -(-(max(_indice_mes(de), mes_inicio) - mes_inicio) // passo)
+    ultima = -(-(_indice_mes(ate) - mes_inicio) // passo)
+    if ultima <= primeira:
+        return pd.DatetimeIndex([])
+    datas = datas_mensais(_primeiro_dia(mes_inicio + primeira * passo), (ultima - primeira - 1) * passo + 1,
+                          dia=regra["dia"])[::passo]
+    manter = datas >= inicio
+    if regra.get("fim"):
+        manter &= datas <= pd.Timestamp(regra["fim"])
+    if regra.get("gerar_apos"):
+        manter &= datas > pd.Timestamp(regra["gerar_apos"])
+    return datas[manter]
+
+
+def _linhas_da_regra(regra, datas):
+    metadados = f" | 👤 {regra['responsavel']}" if regra["responsavel"] else ""
+    if regra["cartao"]:
+        datas = vencimentos_fatura(datas, regra["fechamento"] or 1, regra["vencimento"] or 10)
+        metadados += f" | 💳 Crédito ({regra['cartao']})"
+    elif regra["forma_pagto"]:
+        metadados += f" | 💰 {regra['forma_pagto']} ({regra['conta']})"
+    status = regra["status"] or "Pendente"
+    return pd.DataFrame({
+        "data": datas.strftime("%Y-%m-%d"),
+        "descricao": f"{regra['descricao']}{metadados} | 🔁 Recorrente | {status}",
+        "categoria": regra["categoria"],
+        "valor": float(regra["valor"]),
+        "tipo_mov": regra["tipo_mov"],
+        "tipo_custo": regra["tipo_custo"],
+        "responsavel": regra["responsavel"],
+        "forma_pagto": "Crédito" if regra["cartao"] else regra["forma_pagto"],
+        "conta": None if regra["cartao"] else regra["conta"],
+        "cartao": regra["cartao"],
+        "status": status,
+        "recorrencia_id": int(regra["id"]),
+    })
+
+
+def materializar_recorrencias(ate=None, conn=None, id_regra=None):
+    """Gera as ocorrências de todos os meses anteriores a `ate` (ISO, exclusivo).
+
+    Sem `ate`, vai até o fim do mês corrente; com `id_regra`, só as daquela
+    regra. Quando não há nada pendente o custo é uma consulta indexada; por
+    isso pode ser chamada a cada rerun. Retorna quantos lançamentos foram criados.
+    """
+    alvo = fim_do_periodo(ate)
+    filtro, params = ("AND r.id = ?", (alvo, int(id_regra))) if id_regra is not None else ("", (alvo,))
+    propria = conn is None
+    conn = conn or create_connection()
+    try:
+        consulta = f"SELECT 1 FROM recorrencias r WHERE r.ativa = 1 AND r.proximo_periodo < ? {filtro} LIMIT 1"
+        if conn.execute(consulta, params).fetchone() is None:
+            return 0
+        # Outra sessão pode estar materializando o mesmo período: relê as regras já com o lock de escrita
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            regras = pd.read_sql_query(f"""
+                SELECT r.*, c.fechamento, c.vencimento FROM recorrencias r
+                LEFT JOIN cartoes_credito c ON c.nome = r.cartao
+                WHERE r.ativa = 1 AND r.proximo_periodo < ? {filtro}
+            """, conn, params=params)
+            regras = regras.astype(object).where(regras.notna(), None)
+            blocos = [_linhas_da_regra(regra, datas) for regra in regras.to_dict("records")
+                      if len(datas := ocorrencias(regra, regra["proximo_periodo"], alvo))]
+            linhas = pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame(columns=COLUNAS_LANCAMENTO)
+            ajustes = [("UPDATE recorrencias SET proximo_periodo = ? WHERE id = ?", (alvo, int(i)))
+                       for i in regras["id"]]
+            return gravar_lancamentos(linhas, ajustes, conn=conn)
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+    finally:
+        if propria:
+            conn.close()
+
+
+COLUNAS_PREVISAO = ["data", "descricao", "categoria", "tipo_mov", "tipo_custo", "cartao", "valor"]
+
+
+def previsao_recorrencias(ate):
+    """Ocorrências ainda não materializadas das regras ativas, até `ate` (ISO, exclusivo).
+
+    Não grava nada: é a parte das recorrências na previsão de fluxo de caixa
+    e nos meses futuros das páginas. Retorna um DataFrame (COLUNAS_PREVISAO),
+    com compras no cartão já na data de vencimento da fatura.
+    """
+    alvo = fim_do_periodo(ate)
+    regras = consultar("""
+        SELECT r.*, c.fechamento, c.vencimento FROM recorrencias r
+        LEFT JOIN cartoes_credito c ON c.nome = r.cartao
+        WHERE r.ativa = 1 AND r.proximo_periodo < ?
+    """, (alvo,))
+    regras = regras.astype(object).where(regras.notna(), None)
+    blocos = [_linhas_da_regra(regra, datas)[COLUNAS_PREVISAO] for regra in regras.to_dict("records")
+              if len(datas := ocorrencias(regra, regra["proximo_periodo"], alvo))]
+    return pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame(columns=COLUNAS_PREVISAO)
+
+
+def _futuras_geradas(conn, id_regra, hoje):
+    """Ocorrências já materializadas da regra com compra depois de `hoje`.
+
+    Retorna um DataFrame (compra, data): a data da ocorrência e a data com
+    que ela foi gravada em lancamentos (o vencimento da fatura, no cartão).
+    """
+    regra = pd.read_sql_query("""
+        SELECT r.*, c.fechamento, c.vencimento FROM recorrencias r
+        LEFT JOIN cartoes_credito c ON c.nome = r.cartao
+        WHERE r.id = ?
+    """, conn, params=(id_regra,))
+    if regra.empty:
+        return pd.DataFrame(columns=["compra", "data"])
+    regra = regra.astype(object).where(regra.notna(), None).iloc[0].to_dict()
+    compras = ocorrencias(regra, hoje, regra["proximo_periodo"])
+    compras = compras[compras > pd.Timestamp(hoje)]
+    datas = vencimentos_fatura(compras, regra["fechamento"] or 1, regra["vencimento"] or 10) if regra["cartao"] else compras
+    return pd.DataFrame({"compra": compras.strftime("%Y-%m-%d"), "data": datas.strftime("%Y-%m-%d")})
+
+
+def _apagar_futuras_pendentes(conn, id_regra, hoje):
+    """Remove as ocorrências pendentes com compra depois de `hoje` e devolve o corte (data da compra).
+
+    Uma ocorrência futura já paga fica, e o corte passa para ela: as
+    pendentes anteriores também ficam, para que nenhuma compra se perca ou
+    seja gerada duas vezes quando a regra voltar a ser materializada.
+    """
+    futuras = _futuras_geradas(conn, id_regra, hoje)
+    if futuras.empty:
+        return hoje
+    pagas = {linha[0] for linha in conn.execute(
+        f"SELECT data FROM lancamentos WHERE recorrencia_id = ? AND status <> 'Pendente' "
+        f"AND data IN ({', '.join('?' * len(futuras))})", [id_regra, *futuras["data"]])}
+    corte = max([hoje, *futuras.loc[futuras["data"].isin(pagas), "compra"]])
+    conn.executemany("DELETE FROM lancamentos WHERE recorrencia_id = ? AND data = ? AND status = 'Pendente'",
+                     [(id_regra, data) for data in futuras.loc[futuras["compra"] > corte, "data"]])
+    return corte
+
+
+def salvar_recorrencia(regra, id_regra=None, conn=None):
+    """Cria a regra ou, com `id_regra`, altera-a a partir de hoje.
+
+    Na edição, a regra antiga é antes materializada até o mês corrente, para
+    que nenhuma ocorrência passada ainda não gerada se perca; depois as
+    ocorrências futuras ainda pendentes são removidas e a regra volta a ser
+    materializada a partir do mês atual com os novos valores. O que já passou
+    (ou já foi pago) não muda.
+    """
+    regra = {campo: regra.get(campo) for campo in CAMPOS}
+    regra["inicio"] = pd.Timestamp(regra["inicio"]).date().isoformat()
+    regra["fim"] = pd.Timestamp(regra["fim"]).date().isoformat() if regra["fim"] else None
+    hoje = date.today().isoformat()
+    propria = conn is None
+    conn = conn or create_connection()
+    try:
+        if id_regra is not None:
+            materializar_recorrencias(conn=conn, id_regra=id_regra)
+        with conn:
+            if id_regra is None:
+                colunas = CAMPOS + ["proximo_periodo"]
+                conn.execute(f"INSERT INTO recorrencias ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})",
+                             [regra[c] for c in CAMPOS] + [_primeiro_dia(_indice_mes(regra["inicio"])).isoformat()])
+            else:
+                # A regra nova só gera compras depois do corte (hoje ou a última futura já paga)
+                gerar_apos = _apagar_futuras_pendentes(conn, id_regra, hoje)
+                conn.execute(f"""
+                    UPDATE recorrencias SET {', '.join(f'{c} = ?' for c in CAMPOS)},
+                        gerar_apos = ?, proximo_periodo = MIN(proximo_periodo, ?)
+                    WHERE id = ?
+                """, [regra[c] for c in CAMPOS] + [gerar_apos, _primeiro_dia(_indice_mes(hoje)).isoformat(), id_regra])
+    finally:
+        if propria:
+            conn.close()
+
+
+def encerrar_recorrencia(id_regra, conn=None):
+    """Desativa a regra e remove as ocorrências futuras ainda pendentes.
+
+    As ocorrências até o mês corrente que ainda não foram geradas são gravadas antes.
+    """
+    propria = conn is None
+    conn = conn or create_connection()
+    try:
+        materializar_recorrencias(conn=conn, id_regra=id_regra)
+        with conn:
+            _apagar_futuras_pendentes(conn, id_regra, date.today().isoformat())
+            conn.execute("UPDATE recorrencias SET ativa = 0 WHERE id = ?", (id_regra,))
+    finally:
+        if propria:
+            conn.close()
@@ -0,0 +1,160 @@
+"""Rentabilidade da carteira: TIR dos aportes (XIRR) e retorno ponderado pelo tempo (TWR).
+
+Tudo é calculado para todos os ativos de uma vez, sobre as matrizes dias x
+ativo de carteira.valores_por_ativo (a carteira inteira entra como mais uma
+coluna):
+
+- XIRR (retorno ponderado pelo dinheiro): a taxa anual que zera o valor
+  presente do valor inicial, dos aportes/resgates e do valor final da
+  janela. O solver é um Newton com intervalo de segurança (rtsafe) em
+  x = ln(1 + taxa), aplicado a todas as colunas em paralelo: quando o passo
+  de Newton sai do intervalo em que a função troca de sinal, usa-se a
+  bisseção.
+- TWR (retorno ponderado pelo tempo): o produto dos retornos diários
+  descontados os aportes do dia, que mede o ativo e não o momento dos aportes.
+
+A matriz de valores fica em cache por geração dos dados; trocar a janela só
+refaz as contas vetorizadas.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from carteira import arquivos_cotacoes, carteira_por_ativo
+from dados import chave_banco
+from database import fixar_banco
+
+DIAS_ANO = 365.25
+CARTEIRA = "Carteira"
+ITERACOES = 60
+
+
+# --- SOLVER ---
+
+def xirr(fluxos, anos, iteracoes=ITERACOES, tolerancia=1e-10):
+    """Taxa anual que zera sum(fluxo * (1 + taxa) ** -anos) em cada coluna.
+
+    `fluxos` é uma matriz (datas x séries), com aportes negativos e
+    resgates/valor final positivos; `anos` é o tempo de cada data desde o
+    início. Colunas sem troca de sinal nos fluxos (sem solução) dão NaN.
+    """
+    fluxos = np.asarray(fluxos, float)
+    anos = np.asarray(anos, float).reshape(-1, 1)
+    n = fluxos.shape[1]
+
+    def funcao(x):
+        desconto = np.exp(-anos * x)
+        return (fluxos * desconto).sum(axis=0), (-anos * fluxos * desconto).sum(axis=0)
+
+    # x = ln(1 + taxa) entre -99,99% ao ano e e^50 (sem limite prático)
+    baixo, alto = np.full(n, np.log(1e-4)), np.full(n, 50.0)
+    f_baixo, _ = funcao(baixo)
+    f_alto, _ = funcao(alto)
+    valido = np.sign(f_baixo) * np.sign(f_alto) < 0
+    # Orienta o intervalo para que f(baixo) < 0 < f(alto)
+    trocar = f_baixo > 0
+    baixo, alto = np.where(trocar, alto, baixo), np.where(trocar, baixo, alto)
+
+    x = np.full(n, np.log(1.1))
+    for _ in range(iteracoes):
+        f, derivada = funcao(x)
+        negativo = f < 0
+        baixo, alto = np.where(negativo, x, baixo), np.where(negativo, alto, x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = x - f / derivada
+        dentro = (newton - baixo) * (newton - alto) < 0
+        proximo = np.where(dentro & np.isfinite(newton), newton, (baixo + alto) / 2)
+        if np.all(np.abs(proximo - x) < tolerancia):
+            x = proximo
+            break
+        x = proximo
+    taxa = np.expm1(x)
+    taxa[np.abs(taxa) < 1e-9] = 0.0  # sem ganho: evita exibir "-0,00%"
+    return np.where(valido, taxa, np.nan)
+
+
+def twr(valores, aportes):
+    """Retorno ponderado pelo tempo de cada coluna entre a primeira e a última linha.
+
+    O aporte de um dia entra no valor do próprio dia: o retorno do dia é
+    (valor - aporte) / valor da véspera. Dias sem posição na véspera não contam.
+    """
+    valores = np.asarray(valores, float)
+    aportes = np.asarray(aportes, float)
+    anterior = valores[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fator = np.where(anterior > 0, (valores[1:] - aportes[1:]) / anterior, 1.0)
+    return np.prod(fator, axis=0) - 1
+
+
+# --- DESEMPENHO POR JANELA ---
+
+def desempenho(valores, aportes, inicio=None, fim=None):
+    """XIRR, TWR e resultado de cada ativo e da carteira na janela [inicio, fim].
+
+    `valores` e `aportes` são as matrizes dias x ativo de
+    carteira.valores_por_ativo. O valor na véspera de `inicio` entra como
+    aporte inicial; sem `inicio`, a janela começa no primeiro aporte.
+    """
+    colunas = ["ativo", "valor_inicial", "aportes", "valor_final", "ganho", "xirr", "twr", "twr_anual"]
+    if valores.empty:
+        return pd.DataFrame(columns=colunas)
+    valores = valores.assign(**{CARTEIRA: valores.sum(axis=1)})
+    aportes = aportes.assign(**{CARTEIRA: aportes.sum(axis=1)})
+    inicio = max(pd.Timestamp(inicio or valores.index[0]), valores.index[0])
+    fim = min(pd.Timestamp(fim or valores.index[-1]), valores.index[-1])
+    if fim < inicio:
+        return pd.DataFrame(columns=colunas)
+
+    vespera = valores.index.get_indexer([inicio - pd.Timedelta(days=1)])[0]
+    valor_inicial = valores.iloc[vespera].to_numpy() if vespera >= 0 else np.zeros(valores.shape[1])
+    janela_valores, janela_aportes = valores.loc[inicio:fim], aportes.loc[inicio:fim]
+    valor_final = janela_valores.iloc[-1].to_numpy()
+
+    # XIRR: só as datas com algum fluxo, mais o início e o fim da janela
+    com_fluxo = janela_aportes.to_numpy().any(axis=1)
+    com_fluxo[[0, -1]] = True
+    fluxos = -janela_aportes.to_numpy()[com_fluxo]
+    fluxos[0] -= valor_inicial
+    fluxos[-1] += valor_final
+    anos = (janela_aportes.index[com_fluxo] - inicio).days.to_numpy() / DIAS_ANO
+    taxa = xirr(fluxos, anos) if anos[-1] > 0 else np.full(len(valor_final), np.nan)
+
+    # TWR: a véspera entra como primeira linha para o retorno do primeiro dia
+    base_valores = np.vstack([valor_inicial, janela_valores.to_numpy()])
+    base_aportes = np.vstack([np.zeros(len(valor_inicial)), janela_aportes.to_numpy()])
+    retorno = twr(base_valores, base_aportes)
+    dias = (fim - inicio).days + 1
+
+    total_aportes = janela_aportes.sum().to_numpy()
+    resultado = pd.DataFrame({
+        "ativo": valores.columns,
+        "valor_inicial": valor_inicial,
+        "aportes": total_aportes,
+        "valor_final": valor_final,
+        "ganho": valor_final - valor_inicial - total_aportes,
+        "xirr": taxa,
+        "twr": retorno,
+        "twr_anual": (1 + retorno) ** (DIAS_ANO / dias) - 1 if dias >= DIAS_ANO else np.nan,
+    })
+    # Ativos sem nada investido na janela não têm rentabilidade
+    vazio = (valor_inicial == 0) & (total_aportes == 0)
+    resultado.loc[vazio, ["xirr", "twr", "twr_anual"]] = np.nan
+    return resultado
+
+
+# A matriz vem do cache de carteira_por_ativo, lida no banco da chave
+@st.cache_data(max_entries=32, show_spinner=False)
+def _desempenho(caminho, geracao, arquivos, ate, inicio, fim):
+    with fixar_banco(caminho):
+        valores, aportes = carteira_por_ativo(ate)
+    return desempenho(valores, aportes, inicio, fim)
+
+
+def desempenho_carteira(inicio=None, fim=None, hoje=None):
+    """desempenho() das posições gravadas, em cache por geração dos dados e janela."""
+    hoje = pd.Timestamp(hoje or date.today()).date().isoformat()
+    return _desempenho(*chave_banco(), arquivos_cotacoes(), hoje, inicio and pd.Timestamp(inicio).date().isoformat(),
+                       fim and pd.Timestamp(fim).date().isoformat())
@@ -0,0 +1,63 @@
+"""Cronogramas Price/SAC e simulação das estratégias de quitação."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amortizacao import cronograma, parcela_price, simular_quitacao  # noqa: E402
+
+
+def test_price_tem_parcela_constante_e_quita_o_saldo():
+    tabela = cronograma(1000, 0.01, 12, "Price")
+    assert len(tabela) == 12
+    assert tabela["pagamento"].to_numpy() == pytest.approx(np.full(12, parcela_price(1000, 0.01, 12)))
+    assert tabela["juros"].iloc[0] == pytest.approx(10.0)
+    assert tabela["amortizacao"].sum() == pytest.approx(1000.0)
+    assert tabela["saldo"].iloc[-1] == pytest.approx(0.0, abs=1e-9)
+
+
+def test_sac_tem_amortizacao_constante():
+    tabela = cronograma(1200, 0.02, 12, "SAC")
+    assert tabela["amortizacao"].to_numpy() == pytest.approx(np.full(12, 100.0))
+    assert tabela["pagamento"].iloc[0] == pytest.approx(124.0)
+    assert tabela["pagamento"].iloc[-1] == pytest.approx(102.0)
+    assert tabela["juros"].sum() == pytest.approx(156.0)
+
+
+def test_entrada_e_taxa_zero():
+    tabela = cronograma(1000, 0.0, 10, "SAC", entrada=200)
+    assert tabela["pagamento"].to_numpy() == pytest.approx(np.full(10, 80.0))
+    assert parcela_price(1000, 0.0, 4) == pytest.approx(250.0)
+
+
+def test_amortizacao_extra_encurta_o_prazo():
+    tabela = cronograma(1200, 0.0, 12, "SAC", extras={1: 600})
+    assert len(tabela) == 6
+    assert tabela["extra"].iloc[0] == pytest.approx(600.0)
+    assert tabela["pagamento"].sum() == pytest.approx(1200.0)
+
+
+def test_simular_quitacao_sem_juros():
+    r = simular_quitacao([300, 600], [0.0, 0.0], [100, 100], [0, 100])
+    assert r["meses"].tolist() == [5, 3]
+    assert r["juros"] == pytest.approx([0.0, 0.0])
+    assert r["pago"] == pytest.approx([900.0, 900.0])
+    # O mínimo da dívida quitada passa para a seguinte
+    assert r["quitacao"].tolist() == [[3, 5], [2, 3]]
+
+
+def test_avalanche_paga_menos_juros_que_bola_de_neve():
+    args = ([500, 2000], [0.01, 0.05], [50, 120], [300])
+    avalanche = simular_quitacao(*args, estrategia="Avalanche")
+    bola_de_neve = simular_quitacao(*args, estrategia="Bola de neve")
+    assert avalanche["juros"][0] < bola_de_neve["juros"][0]
+    # Bola de neve quita primeiro a menor dívida
+    assert bola_de_neve["quitacao"][0, 0] < avalanche["quitacao"][0, 0]
+
+
+def test_divida_que_nao_zera_no_prazo():
+    r = simular_quitacao([1000], [0.1], [50], [0], meses_max=24)
+    assert np.isnan(r["meses"][0])
@@ -0,0 +1,40 @@
+"""Carteira com posições gravadas e sem nenhum arquivo de cotação."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from carteira import carregar_cotacoes, carregar_posicoes, valores_por_ativo, valorizar  # noqa: E402
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "carteira.db")
+    monkeypatch.setattr(database, "DB_PATH", caminho)
+    database.create_tables(caminho)
+    conn = database.create_connection(caminho=caminho)
+    with conn:
+        conn.execute("INSERT INTO tipos_investimentos (id, nome) VALUES (1, 'CDB'), (2, 'PETR4')")
+        conn.executemany("INSERT INTO posicoes_investimentos (tipo_id, data, quantidade, valor) VALUES (?, ?, ?, ?)",
+                         [(1, "2025-01-02", 0, 1000.0), (2, "2025-01-10", 10, 300.0), (1, "2025-02-03", 0, 500.0)])
+    conn.close()
+    yield caminho
+    database.fechar_conexoes()
+
+
+def test_sem_arquivos_de_cotacao_avalia_pelo_investido(banco, tmp_path):
+    cotacoes = carregar_cotacoes(str(tmp_path / "sem_cotacoes"))
+    assert cotacoes.empty
+
+    diario, por_ativo = valorizar(carregar_posicoes(), cotacoes, "2025-03-01")
+    assert diario.index[0].isoformat()[:10] == "2025-01-02"
+    assert diario["valor_mercado"].iloc[-1] == pytest.approx(1800.0)
+    assert diario["investido"].iloc[-1] == pytest.approx(1800.0)
+    assert set(por_ativo["ativo"]) == {"CDB", "PETR4"}
+
+    valores, aportes = valores_por_ativo(carregar_posicoes(), cotacoes, "2025-03-01")
+    assert valores.iloc[-1].to_dict() == pytest.approx({"CDB": 1500.0, "PETR4": 300.0})
+    assert aportes.sum().sum() == pytest.approx(1800.0)
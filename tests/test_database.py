@@ -0,0 +1,66 @@
+"""Pool de conexões de database.create_connection."""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    caminho = str(tmp_path / "pool.db")
+    yield caminho
+    database.fechar_conexoes()
+
+
+def test_close_devolve_a_conexao_ao_pool(caminho):
+    c = database.create_connection(caminho=caminho)
+    c.close()
+    d = database.create_connection(caminho=caminho)
+    assert d is c
+    assert d.execute("SELECT 1").fetchone() == (1,)
+    d.close()
+
+
+def test_close_repetido_nao_fecha_conexao_do_pool(caminho):
+    c = database.create_connection(caminho=caminho)
+    c.close()
+    c.close()
+    assert len(database._pool[(os.path.abspath(caminho), False)]) == 1
+    d = database.create_connection(caminho=caminho)
+    assert d is c
+    assert d.execute("SELECT 1").fetchone() == (1,)
+    d.close()
+
+
+def test_bancos_alem_de_perfis_ativos_saem_do_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "PERFIS_ATIVOS", 2)
+    conexoes = []
+    for i in range(4):
+        conn = database.create_connection(caminho=str(tmp_path / f"b{i}.db"))
+        conexoes.append(conn)
+        conn.close()
+    try:
+        assert {os.path.basename(c) for c, _ in database._pool} == {"b2.db", "b3.db"}
+        assert conexoes[0]._chave_pool is None
+    finally:
+        database.fechar_conexoes()
+
+
+def test_geracao_muda_com_escrita_de_outro_processo(caminho):
+    conn = database.create_connection(caminho=caminho)
+    with conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.close()
+    antes = database.geracao(caminho)
+    # Outro processo: conexão fora do pool, que não incrementa o contador local
+    externa = sqlite3.connect(caminho)
+    with externa:
+        externa.execute("INSERT INTO t VALUES (1)")
+    externa.close()
+    assert database.geracao(caminho) != antes
+    assert database.geracao(caminho) == database.geracao(caminho)
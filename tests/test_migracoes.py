@@ -0,0 +1,75 @@
+"""Migrações aplicadas aos bancos da versão anterior que acompanham o projeto."""
+import os
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from migrations import MIGRACOES, aplicar_migracoes  # noqa: E402
+
+
+def _copia(tmp_path, nome):
+    caminho = str(tmp_path / nome)
+    shutil.copy(os.path.join(RAIZ, nome), caminho)
+    return sqlite3.connect(caminho)
+
+
+def _colunas(conn, tabela):
+    return {linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})")}
+
+
+@pytest.mark.parametrize("nome", ["financas.db", "financas_casal.db"])
+def test_bancos_legados_chegam_a_ultima_versao(tmp_path, nome):
+    conn = _copia(tmp_path, nome)
+    try:
+        assert aplicar_migracoes(conn) == MIGRACOES[-1][0]
+        assert {"status", "cartao", "plano_id", "data_pagamento"} <= _colunas(conn, "lancamentos")
+        assert "vencimento" in _colunas(conn, "cartoes_credito")
+        assert {"valor_objetivo", "valor_atual"} <= _colunas(conn, "metas")
+        assert {"variacao", "valor_ultima"} <= _colunas(conn, "planos_parcelamento")
+        # Reaplicar não faz nada
+        aplicadas = conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+        assert aplicar_migracoes(conn) == MIGRACOES[-1][0]
+        assert conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == aplicadas
+    finally:
+        conn.close()
+
+
+def test_lancamentos_antigos_entram_no_resumo(tmp_path):
+    conn = _copia(tmp_path, "financas.db")
+    try:
+        antes = conn.execute("SELECT COUNT(*), SUM(valor) FROM lancamentos").fetchone()
+        aplicar_migracoes(conn)
+        assert conn.execute("SELECT COUNT(*), SUM(valor) FROM lancamentos").fetchone() == antes
+        por_tipo = dict(conn.execute("SELECT tipo_mov, SUM(valor) FROM lancamentos GROUP BY tipo_mov"))
+        resumo = dict(conn.execute("SELECT tipo_mov, SUM(total) FROM resumo_mensal GROUP BY tipo_mov"))
+        assert resumo == pytest.approx(por_tipo)
+    finally:
+        conn.close()
+
+
+def test_receitas_e_despesas_antigas_viram_lancamentos(tmp_path):
+    conn = _copia(tmp_path, "financas_casal.db")
+    try:
+        with conn:
+            conn.execute("INSERT INTO categorias (nome) VALUES ('Mercado')")
+            conn.execute("INSERT INTO receitas (data, responsavel, valor, fonte) VALUES ('2025-03-05', 'Ana', 5000, 'Salário')")
+            conn.execute("INSERT INTO despesas (data, categoria, valor, descricao) VALUES ('2025-03-07 10:00:00', 'Mercado', 350, '')")
+            conn.execute("INSERT INTO cartoes_credito (nome, limite, fechamento) VALUES ('Nubank', 3000, 3)")
+        aplicar_migracoes(conn)
+        lancamentos = conn.execute(
+            "SELECT data, descricao, categoria, valor, tipo_mov, tipo_custo, status FROM lancamentos ORDER BY data").fetchall()
+        assert lancamentos == [
+            ("2025-03-05", "Salário", "Salário", 5000.0, "Receita", "Receita", "Paga"),
+            ("2025-03-07", "Mercado", "Mercado", 350.0, "Despesa", "Variável", "Paga"),
+        ]
+        assert conn.execute("SELECT nome FROM categorias_despesas").fetchall() == [("Mercado",)]
+        assert conn.execute("SELECT vencimento FROM cartoes_credito WHERE nome = 'Nubank'").fetchone() == (10,)
+        assert dict(conn.execute("SELECT tipo_mov, total FROM resumo_mensal WHERE ano = 2025 AND mes = 3")) == {
+            "Receita": 5000.0, "Despesa": 350.0}
+    finally:
+        conn.close()
@@ -0,0 +1,65 @@
+"""Datas das parcelas, vencimento das faturas e regra de valor dos planos."""
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amortizacao import cronograma  # noqa: E402
+from parcelas import (data_vencimento_fatura, datas_mensais, regra_de_valores, valores_parcelas,  # noqa: E402
+                      vencimentos_fatura)
+
+
+def _iso(datas):
+    return [d.date().isoformat() for d in datas]
+
+
+def test_datas_mensais_limita_o_dia_ao_fim_do_mes():
+    assert _iso(datas_mensais("2025-01-31", 4)) == ["2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30"]
+    assert _iso(datas_mensais("2024-01-31", 2)) == ["2024-01-31", "2024-02-29"]
+    assert _iso(datas_mensais("2025-11-15", 3)) == ["2025-11-15", "2025-12-15", "2026-01-15"]
+
+
+def test_datas_mensais_com_dia_fixo():
+    assert _iso(datas_mensais("2025-02-10", 3, dia=31)) == ["2025-02-28", "2025-03-31", "2025-04-30"]
+
+
+@pytest.mark.parametrize("inicio", ["2023-12-31", "2024-02-29", "2025-01-30", "2025-05-15"])
+def test_datas_mensais_equivale_a_relativedelta(inicio):
+    base = date.fromisoformat(inicio)
+    esperado = [(base + relativedelta(months=i)).isoformat() for i in range(26)]
+    assert _iso(datas_mensais(inicio, 26)) == esperado
+
+
+def test_vencimentos_fatura_pelo_dia_de_fechamento():
+    compras = ["2025-03-02", "2025-03-03", "2025-03-31", "2025-12-20"]
+    assert _iso(vencimentos_fatura(compras, 3, 10)) == ["2025-03-10", "2025-04-10", "2025-04-10", "2026-01-10"]
+
+
+def test_vencimentos_fatura_limita_o_vencimento_ao_fim_do_mes():
+    assert _iso(vencimentos_fatura(["2025-01-20", "2025-01-26"], 25, 31)) == ["2025-01-31", "2025-02-28"]
+
+
+def test_vencimentos_fatura_concorda_com_a_versao_escalar():
+    compras = pd.date_range("2025-01-01", "2025-12-31", freq="D")
+    vetorizado = vencimentos_fatura(compras, 28, 5)
+    assert [d.date() for d in vetorizado] == [data_vencimento_fatura(c.date(), 28, 5) for c in compras]
+
+
+@pytest.mark.parametrize("sistema", ["Price", "SAC"])
+@pytest.mark.parametrize("extra", [0.0, 150.0])
+def test_regra_de_valores_reproduz_o_cronograma(sistema, extra):
+    tabela = cronograma(10000, 0.02, 24, sistema, extras=np.full(24, extra))
+    valor_parcela, variacao, valor_ultima = regra_de_valores(tabela["pagamento"])
+    valores = valores_parcelas(valor_parcela, len(tabela), variacao, valor_ultima)
+    assert valores.tolist() == tabela["pagamento"].round(2).tolist()
+
+
+def test_regra_de_valores_recusa_parcelas_sem_progressao():
+    with pytest.raises(ValueError):
+        regra_de_valores([100.0, 120.0, 100.0, 90.0])
@@ -0,0 +1,40 @@
+"""Datas das ocorrências de uma regra de recorrência."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recorrencias import ocorrencias  # noqa: E402
+
+
+def _regra(**campos):
+    return {"inicio": "2025-01-15", "intervalo_meses": 1, "dia": 10, "fim": None, "gerar_apos": None, **campos}
+
+
+def _iso(datas):
+    return [d.date().isoformat() for d in datas]
+
+
+def test_mensal_comeca_depois_do_inicio():
+    # Dia 10 de janeiro é anterior ao início (15/01): a primeira ocorrência é em fevereiro
+    assert _iso(ocorrencias(_regra(), "2025-01-01", "2025-05-01")) == ["2025-02-10", "2025-03-10", "2025-04-10"]
+
+
+def test_dia_31_limitado_ao_fim_do_mes():
+    regra = _regra(inicio="2025-01-01", dia=31)
+    assert _iso(ocorrencias(regra, "2025-01-01", "2025-05-01")) == ["2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30"]
+
+
+def test_trimestral_respeita_o_passo_a_partir_do_inicio():
+    regra = _regra(inicio="2025-01-05", dia=5, intervalo_meses=3)
+    assert _iso(ocorrencias(regra, "2025-02-01", "2026-01-01")) == ["2025-04-05", "2025-07-05", "2025-10-05"]
+
+
+def test_fim_e_gerar_apos_cortam_a_janela():
+    assert _iso(ocorrencias(_regra(fim="2025-03-10"), "2025-01-01", "2025-06-01")) == ["2025-02-10", "2025-03-10"]
+    assert _iso(ocorrencias(_regra(gerar_apos="2025-03-10"), "2025-01-01", "2025-06-01")) == ["2025-04-10", "2025-05-10"]
+
+
+def test_janela_vazia():
+    assert len(ocorrencias(_regra(), "2025-05-01", "2025-05-01")) == 0
+    assert len(ocorrencias(_regra(), "2024-01-01", "2025-01-01")) == 0